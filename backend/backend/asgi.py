@@ -2,4 +2,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
-application = get_asgi_application() 
\ No newline at end of file
+application = get_asgi_application()
+
+# Load the autocomplete index before the first request comes in.
+from books.suggest import suggester  # noqa: E402
+suggester.warm()
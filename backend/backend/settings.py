@@ -35,11 +35,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'django_filters',
     'users.apps.UsersConfig',
     'models_new.apps.ModelsConfig',
+    'models.apps.ModelsConfig',
     'books.apps.BooksConfig',
 ]
 
@@ -123,6 +125,22 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Caches. 'responses' holds rendered anonymous catalog responses
+# (utils.response_cache). Every worker process must share it, or an
+# invalidation only reaches the worker that made the write: the default is
+# a file-based cache under var/ (shared by the workers of one host); use
+# memcached or redis when several hosts serve the API. Local memory is only
+# accepted with DEBUG on (system check shelftrack.E001).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': os.getenv('RESPONSE_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('RESPONSE_CACHE_LOCATION', os.path.join(BASE_DIR, 'var', 'responses')),
+    },
+}
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -133,6 +151,18 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson for JSON; MessagePack when the client asks for it in Accept.
+    'DEFAULT_RENDERER_CLASSES': [
+        'utils.renderers.ORJSONRenderer',
+        'utils.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'utils.renderers.ORJSONParser',
+        'utils.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
@@ -141,6 +171,58 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Default pg_trgm word-similarity cut-off for ?search_mode=fuzzy
+FUZZY_SEARCH_THRESHOLD = 0.5
+
+# Seconds between checks for book writes made by other worker processes
+SUGGEST_SYNC_INTERVAL = 30
+
+# Bulk book endpoint: rows accepted per request and rows per INSERT/UPDATE
+BULK_MAX_ROWS = 5000
+BULK_BATCH_SIZE = 500
+
+# Most rows one POST /api/students/import/ request may carry (manage.py
+# import_roster has no limit)
+ROSTER_IMPORT_MAX_ROWS = 20000
+
+# Rows fetched per server-side cursor round trip by the export endpoints
+EXPORT_CHUNK_SIZE = 2000
+
+# Seconds an anonymous catalog response stays in the 'responses' cache
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Default loan period when a loan is issued without a due date
+LOAN_PERIOD_DAYS = 14
+
+# Days a returned copy is kept for the next hold before passing it on
+HOLD_PICKUP_DAYS = 3
+
+# Overdue notices (manage.py send_overdue_notices): delivery backend, sender
+# and where the resumable progress file is kept
+NOTICE_EMAIL_BACKEND = os.getenv('NOTICE_EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+NOTICE_FROM_EMAIL = os.getenv('NOTICE_FROM_EMAIL', 'library@shelftrack.local')
+NOTICE_STATE_DIR = os.path.join(BASE_DIR, 'var')
+
+# Rendered barcode images (services.barcode_service), named by content hash
+BARCODE_CACHE_DIR = os.path.join(BASE_DIR, 'var', 'barcodes')
+
+# Label sheets: worker processes for manage.py print_labels (None = one per
+# CPU; /api/books/labels.pdf renders in the request's process) and the most
+# labels one API request may ask for
+LABEL_RENDER_WORKERS = None
+LABELS_MAX_PER_REQUEST = 3000
+
+# Processes decoding shelf photos in manage.py scan_shelves (None = one per CPU)
+SCAN_DECODE_WORKERS = None
+
+# Most barcodes one POST /api/stocktakes/{id}/scans/ request may carry
+STOCKTAKE_MAX_SCANS = 20000
+
+# Circulation roll-up: how far behind now() it stops (so loans still being
+# committed are not skipped) and how many days it folds per transaction
+ROLLUP_LAG_SECONDS = 300
+ROLLUP_BATCH_DAYS = 31
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
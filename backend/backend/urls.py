@@ -11,11 +11,20 @@ from rest_framework_simplejwt.views import (
 )
 from users.views import UserViewSet
 from books.views import BookViewSet
+from models.views import (
+    HoldViewSet, LoanViewSet, ReportViewSet, StatsViewSet, StocktakeViewSet, StudentViewSet,
+)
 
 # Create a router and register our viewsets with it
 router = routers.DefaultRouter()
 router.register(r'users', UserViewSet)
 router.register(r'books', BookViewSet)
+router.register(r'students', StudentViewSet)
+router.register(r'loans', LoanViewSet)
+router.register(r'holds', HoldViewSet)
+router.register(r'stocktakes', StocktakeViewSet)
+router.register(r'stats', StatsViewSet, basename='stats')
+router.register(r'reports', ReportViewSet, basename='reports')
 
 def api_root(request):
     return JsonResponse({
@@ -27,6 +36,12 @@ def api_root(request):
             'token': '/api/token/',
             'token_refresh': '/api/token/refresh/',
             'books': '/api/books/',
+            'students': '/api/students/',
+            'loans': '/api/loans/',
+            'holds': '/api/holds/',
+            'stocktakes': '/api/stocktakes/',
+            'stats': '/api/stats/',
+            'reports': '/api/reports/',
         }
     })
 
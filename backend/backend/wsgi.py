@@ -2,4 +2,8 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
-application = get_wsgi_application() 
\ No newline at end of file
+application = get_wsgi_application()
+
+# Load the autocomplete index before the first request comes in.
+from books.suggest import suggester  # noqa: E402
+suggester.warm()
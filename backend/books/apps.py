@@ -2,4 +2,11 @@ from django.apps import AppConfig
 
 class BooksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'books' 
\ No newline at end of file
+    name = 'books'
+
+    def ready(self):
+        from django.core import checks
+        from utils.response_cache import check_shared_cache
+        from . import signals  # noqa: F401
+
+        checks.register(check_shared_cache, checks.Tags.caches)
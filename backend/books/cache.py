@@ -0,0 +1,6 @@
+from utils.response_cache import ResponseCache
+
+# Anonymous list/retrieve responses of BookViewSet. Invalidated on every
+# Book write: model signals (books.signals) and the bulk paths that bypass
+# them (services.book_service, import_catalog).
+book_cache = ResponseCache('books')
@@ -0,0 +1 @@
+# This file is intentionally empty to make the directory a Python package. 
\ No newline at end of file
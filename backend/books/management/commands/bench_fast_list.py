@@ -0,0 +1,92 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from books.views import BookViewSet
+from models.views import StudentViewSet
+from users.models import User
+
+SEED_STUDENTS_SQL = """
+INSERT INTO models_student
+    (first_name, last_name, student_id, date_of_birth, gender, grade, section,
+     admission_date, parent_name, parent_phone, parent_email, address,
+     profile_picture, is_active, created_at, updated_at)
+SELECT
+    'First' || g, 'Last' || g, 'FAST' || g, date '2008-02-29' + g %% 4000,
+    (ARRAY['M', 'F', 'O'])[1 + g %% 3], 1 + g %% 12, chr(65 + g %% 4),
+    date '2020-09-01', 'Parent ' || g, '555' || g, 'parent' || g || '@example.com',
+    'Street ' || g, CASE WHEN g %% 3 = 0 THEN 'student_profiles/' || g || '.jpg' END,
+    g %% 7 <> 0, now() - g * interval '1 minute', now()
+FROM generate_series(1, %s) AS g
+"""
+
+# Query strings checked for identical output, per endpoint.
+CONFORMANCE = {
+    'books': [
+        '', 'page=3', 'pagination=cursor&page_size=1000', 'publisher=Penguin',
+        'search=book', 'fields=title,isbn,created_at', 'exclude=title',
+    ],
+    'students': [
+        '', 'grade=3&section=B', 'pagination=cursor&page_size=1000', 'is_active=false',
+        'ordering=-admission_date', 'fields=first_name,age,profile_picture', 'search=first12',
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Check that the values_list() fast list path renders byte-identical '
+        'responses to BookSerializer/StudentSerializer, then time both at '
+        '--page-size rows per page. Seeds students inside a transaction '
+        'that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20000)
+        parser.add_argument('--page-size', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=30)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        viewsets = {'books': ('/api/books/', BookViewSet), 'students': ('/api/students/', StudentViewSet)}
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(SEED_STUDENTS_SQL, [options['students']])
+                cursor.execute('ANALYZE models_student')
+            user = User.objects.create(username='bench-fast-list', is_staff=True)
+
+            def get(name, query, fast):
+                path, viewset = viewsets[name]
+                request = factory.get('{}?{}'.format(path, query))
+                force_authenticate(request, user)
+                response = viewset.as_view({'get': 'list'}, fast_list=fast)(request)
+                return response.render()
+
+            failures = 0
+            for name, queries in CONFORMANCE.items():
+                for query in queries:
+                    slow, fast = get(name, query, False), get(name, query, True)
+                    same = slow.status_code == fast.status_code == 200 and slow.content == fast.content
+                    failures += not same
+                    self.stdout.write('{:<9} {:<45} {}'.format(name, query or '(default)', 'identical' if same else 'DIFFERENT'))
+            if failures:
+                raise CommandError('{} responses differ from the serializer output.'.format(failures))
+
+            self.stdout.write('\n{:<9} {:<11} {:>9} {:>9}'.format('list', 'path', 'p50 ms', 'p95 ms'))
+            query = 'pagination=cursor&page_size={}'.format(options['page_size'])
+            for name in viewsets:
+                for label, fast in (('serializer', False), ('fast', True)):
+                    timings = []
+                    for _ in range(options['requests']):
+                        start = time.perf_counter()
+                        get(name, query, fast)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    timings.sort()
+                    self.stdout.write('{:<9} {:<11} {:>9.2f} {:>9.2f}'.format(
+                        name, label, statistics.median(timings), timings[int(len(timings) * 0.95) - 1],
+                    ))
+            transaction.set_rollback(True)
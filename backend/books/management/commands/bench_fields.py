@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from users.models import User
+
+SEED_STUDENTS_SQL = """
+INSERT INTO models_student
+    (first_name, last_name, student_id, date_of_birth, gender, grade, section,
+     admission_date, parent_name, parent_phone, parent_email, address,
+     profile_picture, is_active, created_at, updated_at)
+SELECT
+    'First' || g, 'Last' || g, 'BENCH' || g, date '2010-01-01' + g %% 3000, 'F',
+    1 + g %% 12, chr(65 + g %% 4), date '2020-09-01', 'Parent ' || g,
+    '555' || g, 'parent' || g || '@example.com', repeat('Street ' || g || ', ', 40),
+    'student_profiles/' || g || '.jpg', true, now(), now()
+FROM generate_series(1, %s) AS g
+"""
+
+# What the desktop tables actually show.
+CASES = [
+    ('/api/students/', 'first_name,last_name,student_id,grade,section'),
+    ('/api/books/', 'title,author,isbn,publisher,available'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare payload size and latency of full list pages against '
+        '?fields= sparse fieldsets. Seeds synthetic students inside a '
+        'transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20000)
+        parser.add_argument('--page-size', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=30)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(SEED_STUDENTS_SQL, [options['students']])
+                cursor.execute('ANALYZE models_student')
+            client = APIClient()
+            client.force_authenticate(User.objects.create(username='bench-fields', is_staff=True))
+
+            self.stdout.write('{:<16} {:<8} {:>10} {:>9} {:>9}'.format('endpoint', 'fields', 'bytes', 'p50 ms', 'max ms'))
+            for path, fields in CASES:
+                base = '{}?pagination=cursor&page_size={}'.format(path, options['page_size'])
+                for label, url in (('all', base), ('sparse', '{}&fields={}'.format(base, fields))):
+                    size, timings = self._measure(client, url, options['requests'])
+                    self.stdout.write('{:<16} {:<8} {:>10} {:>9.2f} {:>9.2f}'.format(
+                        path, label, size, statistics.median(timings), max(timings),
+                    ))
+            transaction.set_rollback(True)
+
+    def _measure(self, client, url, requests):
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.content[:200]
+        return len(response.content), timings
@@ -0,0 +1,53 @@
+import gzip
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from books.models import Book
+from books.serializers import BookSerializer
+from models.serializers import StudentSerializer
+from models.student import Student
+from utils.renderers import MessagePackRenderer, ORJSONRenderer
+
+RENDERERS = [
+    ('json (drf)', JSONRenderer()),
+    ('orjson', ORJSONRenderer()),
+    ('msgpack', MessagePackRenderer()),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare encode time and payload size of the DRF JSON, orjson and '
+        'MessagePack renderers on a page of books and a page of students.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        size = options['page_size']
+        pages = [
+            ('books', BookSerializer, Book.objects.defer('search_vector')[:size]),
+            ('students', StudentSerializer, Student.objects.all()[:size]),
+        ]
+        self.stdout.write('{:<9} {:<11} {:>7} {:>10} {:>9} {:>9}'.format(
+            'list', 'renderer', 'rows', 'bytes', 'gzip', 'p50 ms'))
+        for name, serializer_class, queryset in pages:
+            start = time.perf_counter()
+            data = {'count': len(queryset), 'results': serializer_class(queryset, many=True).data}
+            self.stdout.write('{:<9} {:<11} {:>7} {:>10} {:>9} {:>9.2f}'.format(
+                name, '(serialize)', len(data['results']), '', '', (time.perf_counter() - start) * 1000))
+            for label, renderer in RENDERERS:
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    body = renderer.render(data, renderer.media_type)
+                    timings.append((time.perf_counter() - start) * 1000)
+                self.stdout.write('{:<9} {:<11} {:>7} {:>10} {:>9} {:>9.2f}'.format(
+                    name, label, len(data['results']), len(body), len(gzip.compress(body)),
+                    statistics.median(timings),
+                ))
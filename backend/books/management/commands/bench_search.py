@@ -0,0 +1,86 @@
+import operator
+import random
+import statistics
+import time
+from functools import reduce
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from books.models import Book
+from utils.search import full_text_search
+
+SEARCH_FIELDS = ['title', 'author', 'isbn', 'publisher']
+
+SEED_SQL = """
+INSERT INTO books_book
+    (title, author, isbn, publication_year, publisher, quantity, available,
+     created_at, updated_at)
+SELECT
+    w[1 + (g * 7) %% n] || ' ' || w[1 + (g * 13) %% n] || ' ' || w[1 + (g * 31) %% n],
+    w[1 + (g * 17) %% n] || ' ' || w[1 + (g * 19) %% n],
+    (9790000000000 + g)::text,
+    1950 + g %% 75,
+    'Press ' || w[1 + g %% 50],
+    1, 1, now() - g * interval '1 second', now()
+FROM generate_series(1, %s) AS g, (SELECT %s::text[] AS w, %s AS n) AS vocab
+ON CONFLICT (isbn) DO NOTHING
+"""
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark catalog search: DRF icontains SearchFilter against the '
+        'tsvector/GIN full-text backend. Seeds synthetic books inside a '
+        'transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000, 1000000])
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        vocab = sorted({
+            ''.join(rng.choice(letters) for _ in range(rng.randint(4, 9)))
+            for _ in range(5000)
+        })
+        terms = [rng.choice(vocab)[:rng.randint(3, 6)] for _ in range(options['queries'])]
+
+        self.stdout.write('{:>9}  {:<10} {:>9} {:>9}'.format('books', 'backend', 'p50 ms', 'p95 ms'))
+        for size in options['sizes']:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(SEED_SQL, [size, vocab, len(vocab)])
+                    cursor.execute('ANALYZE books_book')
+
+                for name, search in (('icontains', self._icontains), ('fulltext', self._full_text)):
+                    timings = [self._time(search, term, options['page_size']) for term in terms]
+                    self.stdout.write('{:>9}  {:<10} {:>9.2f} {:>9.2f}'.format(
+                        size, name, statistics.median(timings), _percentile(timings, 95),
+                    ))
+                transaction.set_rollback(True)
+
+    def _icontains(self, term):
+        return Book.objects.filter(
+            reduce(operator.or_, (Q(**{field + '__icontains': term}) for field in SEARCH_FIELDS))
+        )
+
+    def _full_text(self, term):
+        return full_text_search(Book.objects.all(), [term])
+
+    def _time(self, search, term, page_size):
+        # Mirror a paginated list request: one COUNT(*) plus the first page.
+        start = time.perf_counter()
+        queryset = search(term)
+        queryset.count()
+        list(queryset.defer('search_vector')[:page_size])
+        return (time.perf_counter() - start) * 1000
@@ -0,0 +1,69 @@
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from books.suggest import BookSuggester
+
+
+class Command(BaseCommand):
+    help = (
+        'Report memory use and lookup latency of the autocomplete prefix '
+        'index for a synthetic catalog. Does not touch the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--limit', type=int, default=8)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        letters = 'abcdefghijklmnopqrstuvwxyz'
+        words = [
+            ''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))).capitalize()
+            for _ in range(20000)
+        ]
+        rows = [
+            (
+                book_id,
+                ' '.join(rng.choice(words) for _ in range(rng.randint(2, 6))),
+                '{} {}'.format(rng.choice(words), rng.choice(words)),
+                str(9780000000000 + book_id),
+            )
+            for book_id in range(1, options['size'] + 1)
+        ]
+
+        start = time.perf_counter()
+        BookSuggester().load(rows)
+        build_seconds = time.perf_counter() - start
+
+        suggester = BookSuggester()
+        gc.collect()
+        tracemalloc.start()
+        suggester.load(rows)
+        gc.collect()
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        prefixes = [rng.choice(words).lower()[:rng.randint(1, 5)] for _ in range(options['queries'])]
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            suggester.complete(prefix, options['limit'])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+
+        size = options['size']
+        self.stdout.write('books:            {}'.format(size))
+        self.stdout.write('build:            {:.2f} s'.format(build_seconds))
+        self.stdout.write('index structures: {:.1f} MiB'.format(suggester.memory_usage() / 2 ** 20))
+        self.stdout.write('total allocated:  {:.1f} MiB ({:.1f} MiB per 100k books)'.format(
+            traced / 2 ** 20, traced / 2 ** 20 * 100000 / size,
+        ))
+        self.stdout.write('lookup p50/p95:   {:.3f} / {:.3f} ms'.format(
+            statistics.median(timings), timings[int(len(timings) * 0.95)],
+        ))
@@ -0,0 +1,87 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.cache import book_cache
+from books.models import Book
+from services.catalog_import import TARGETS, CatalogImporter, ImportState, read_csv, read_marc
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a CSV or MARC21 catalog into books.Book or models_new.Book. '
+        'Rows are validated in chunks, loaded with COPY into a staging table '
+        'and merged on ISBN. Re-running the same command resumes an '
+        'interrupted import.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row, or a MARC21 (.mrc) file')
+        parser.add_argument('--target', choices=sorted(TARGETS), default='books')
+        parser.add_argument('--format', choices=['csv', 'marc'], help='Default: guessed from the file extension')
+        parser.add_argument('--delimiter', default=',')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--rejects', help='Write rejected rows (line, reason) to this CSV file')
+        parser.add_argument('--restart', action='store_true', help='Ignore saved progress and start over')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('marc' if path.lower().endswith(('.mrc', '.marc')) else 'csv')
+        rows = read_marc(path) if file_format == 'marc' else read_csv(path, options['delimiter'])
+
+        try:
+            state = ImportState('{}.{}.import-state'.format(path, options['target']), path)
+        except OSError as error:
+            raise CommandError('Cannot read {}: {}'.format(path, error.strerror))
+        if options['restart']:
+            state.clear()
+        try:
+            if state.load():
+                self.stdout.write('Resuming after row {}'.format(state.lines_done))
+        except ValueError as error:
+            raise CommandError('{} Use --restart to import from the beginning.'.format(error))
+
+        try:
+            rejects = open(options['rejects'], 'a', newline='') if options['rejects'] else None
+        except OSError as error:
+            raise CommandError('Cannot write {}: {}'.format(options['rejects'], error.strerror))
+        reject_writer = csv.writer(rejects) if rejects else None
+        shown = []
+
+        def on_reject(line, message):
+            if reject_writer:
+                reject_writer.writerow([line, message])
+            elif len(shown) < 20:
+                shown.append(line)
+                self.stderr.write('Row {}: {}'.format(line, message))
+
+        def on_progress(stats):
+            if TARGETS[options['target']].model is Book:
+                book_cache.invalidate()
+            self.stdout.write('{read} rows read, {inserted} inserted, {updated} updated, '
+                              '{rejected} rejected - {rate:.0f} rows/s'.format(rate=importer.rows_per_second(), **stats))
+            sys.stdout.flush()
+
+        importer = CatalogImporter(
+            TARGETS[options['target']],
+            chunk_size=options['chunk_size'],
+            state=state,
+            on_reject=on_reject,
+            on_progress=on_progress,
+        )
+        try:
+            stats = importer.run(rows)
+        except OSError as error:
+            raise CommandError('Cannot read {}: {}'.format(path, error.strerror))
+        finally:
+            if rejects:
+                rejects.close()
+
+        state.clear()
+        self.stdout.write(self.style.SUCCESS(
+            'Imported {} rows ({} new, {} updated, {} rejected) at {:.0f} rows/s'.format(
+                stats['inserted'] + stats['updated'], stats['inserted'], stats['updated'],
+                stats['rejected'], importer.rows_per_second(),
+            )
+        ))
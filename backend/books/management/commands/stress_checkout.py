@@ -0,0 +1,108 @@
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from books.models import Book
+from models_new.models import Book as CatalogBook
+from services import circulation_service
+
+TARGETS = {'books': Book, 'models_new': CatalogBook}
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer one title with parallel checkouts and returns from many '
+        'worker threads (one database connection each) and verify the '
+        'available count never leaves 0..quantity and matches the ledger '
+        'of successful operations. --naive runs the old read-modify-save '
+        'code path for comparison. The test title is deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(TARGETS), default='books')
+        parser.add_argument('--workers', type=int, default=32)
+        parser.add_argument('--operations', type=int, default=200, help='Per worker')
+        parser.add_argument('--copies', type=int, default=5)
+        parser.add_argument('--naive', action='store_true')
+
+    def handle(self, *args, **options):
+        model = TARGETS[options['target']]
+        available_field = circulation_service.STOCK_FIELDS[model][0]
+        book = self._create(model, options['copies'])
+        ledger = {'out': 0, 'in': 0, 'refused': 0}
+        seen = set()
+        lock = threading.Lock()
+        start_gate = threading.Barrier(options['workers'])
+
+        def worker(seed):
+            rng = random.Random(seed)
+            start_gate.wait()
+            try:
+                for _ in range(options['operations']):
+                    lend = rng.random() < 0.5
+                    if options['naive']:
+                        result = self._naive(model, book.pk, available_field, lend)
+                    else:
+                        try:
+                            change = circulation_service.checkout if lend else circulation_service.checkin
+                            result = change(model, book.pk)[0]
+                        except circulation_service.StockError:
+                            result = None
+                    with lock:
+                        if result is None:
+                            ledger['refused'] += 1
+                        else:
+                            ledger['out' if lend else 'in'] += 1
+                            seen.add(result)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(options['workers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            final = getattr(model.objects.get(pk=book.pk), available_field)
+        finally:
+            model.objects.filter(pk=book.pk).delete()
+
+        expected = options['copies'] - ledger['out'] + ledger['in']
+        operations = options['workers'] * options['operations']
+        self.stdout.write('{} operations by {} workers in {:.2f}s ({:.0f} ops/s)'.format(
+            operations, options['workers'], elapsed, operations / elapsed))
+        self.stdout.write('checkouts {out}, returns {in}, refused {refused}'.format(**ledger))
+        self.stdout.write('observed counts {}..{}, final {}, expected from ledger {}'.format(
+            min(seen, default=None), max(seen, default=None), final, expected))
+        if final != expected or min(seen, default=0) < 0 or max(seen, default=0) > options['copies']:
+            raise CommandError('Availability drifted.')
+        self.stdout.write(self.style.SUCCESS('No lost updates.'))
+
+    def _create(self, model, copies):
+        fields = {
+            'title': 'Stress test', 'author': 'Stress test', 'publisher': 'Stress test',
+            'isbn': '9' + str(time.time_ns())[-12:], 'publication_year': 2000, 'quantity': copies,
+        }
+        if model is CatalogBook:
+            fields.update(book_type='other', price=Decimal('0'), condition='new', location='-',
+                          available_quantity=copies)
+        else:
+            fields.update(available=copies)
+        return model.objects.create(**fields)
+
+    def _naive(self, model, pk, available_field, lend):
+        # What a PUT of the whole record amounts to: read, change, save.
+        book = model.objects.get(pk=pk)
+        available = getattr(book, available_field)
+        if lend and available <= 0 or not lend and available >= book.quantity:
+            return None
+        setattr(book, available_field, available + (-1 if lend else 1))
+        book.save()
+        return getattr(book, available_field)
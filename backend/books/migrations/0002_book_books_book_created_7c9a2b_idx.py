@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="books_book_created_7c9a2b_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:59
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce(%(row)s.title, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(%(row)s.author, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(%(row)s.publisher, '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce(%(row)s.isbn, '')), 'D')
+"""
+
+CREATE_TRIGGER = """
+CREATE FUNCTION books_book_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := %(new)s;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER books_book_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, author, publisher, isbn ON books_book
+    FOR EACH ROW EXECUTE FUNCTION books_book_search_vector_update();
+
+UPDATE books_book SET search_vector = %(existing)s;
+""" % {
+    "new": SEARCH_VECTOR_SQL % {"row": "NEW"},
+    "existing": SEARCH_VECTOR_SQL % {"row": "books_book"},
+}
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS books_book_search_vector_trigger ON books_book;
+DROP FUNCTION IF EXISTS books_book_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0002_book_books_book_created_7c9a2b_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="books_book_search__c24b82_gin"
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0004_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["updated_at"], name="books_book_updated_f9663f_idx"
+            ),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 class Book(models.Model):
     title = models.CharField(max_length=200)
@@ -11,9 +13,22 @@ class Book(models.Model):
     available = models.IntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Weighted title/author/publisher/isbn vector, kept current by a database
+    # trigger (see migration 0003) so bulk writes are covered too.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination seeks on (created_at, id); see utils.pagination.
+            models.Index(fields=['-created_at', '-id']),
+            # max(updated_at) behind the list ETag; see utils.conditional.
+            models.Index(fields=['updated_at']),
+            GinIndex(fields=['search_vector']),
+            # Trigram indexes behind ?search_mode=fuzzy; see utils.search.
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='books_book_title_trgm'),
+            GinIndex(fields=['author'], opclasses=['gin_trgm_ops'], name='books_book_author_trgm'),
+        ]
 
     def __str__(self):
         return self.title 
\ No newline at end of file
@@ -6,4 +6,13 @@ class BookSerializer(serializers.ModelSerializer):
         model = Book
         fields = ['id', 'title', 'author', 'isbn', 'publication_year', 
                  'publisher', 'quantity', 'available', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at'] 
\ No newline at end of file
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+class BookBulkSerializer(BookSerializer):
+    """
+    Row validation for the bulk endpoint. ISBN uniqueness is checked for
+    the whole batch in one query (services.book_service) instead of one
+    UniqueValidator query per row.
+    """
+    class Meta(BookSerializer.Meta):
+        extra_kwargs = {'isbn': {'validators': []}}
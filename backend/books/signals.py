@@ -0,0 +1,28 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import book_cache
+from .models import Book
+from .suggest import suggester
+
+
+# The suggest index only ever sees committed rows: a rolled-back write
+# must not leave entries behind.
+@receiver(post_save, sender=Book)
+def update_suggestions(sender, instance, **kwargs):
+    transaction.on_commit(partial(suggester.update, instance))
+
+
+@receiver(post_delete, sender=Book)
+def remove_suggestions(sender, instance, **kwargs):
+    transaction.on_commit(partial(suggester.remove, instance.pk))
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_responses(sender, **kwargs):
+    # After commit, so a concurrent read can't re-cache the old rows.
+    transaction.on_commit(book_cache.invalidate)
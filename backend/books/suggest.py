@@ -0,0 +1,183 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import Count, Max
+
+from utils.prefix_index import PrefixIndex
+from .models import Book
+
+SUGGEST_FIELDS = ('title', 'author', 'isbn')
+
+
+def normalize(value):
+    return ' '.join(value.casefold().split())
+
+
+def index_keys(field, value):
+    """
+    Keys a value is reachable under. Titles and authors can be completed
+    from any word ("potter" -> "Harry Potter"); ISBNs only from the start.
+    """
+    value = normalize(value)
+    if not value:
+        return []
+    if field == 'isbn':
+        return [value.replace('-', '')]
+    words = value.split(' ')
+    return [' '.join(words[position:]) for position in range(len(words))]
+
+
+class BookSuggester:
+    """
+    Per-process autocomplete index over Book titles, authors and ISBNs.
+
+    Built from the database on first use and kept current incrementally:
+    committed saves and deletes in this process arrive through signals
+    (see ``books.signals``), and every ``SUGGEST_SYNC_INTERVAL`` seconds a
+    ``count``/``max(updated_at)`` probe picks up writes made by other
+    worker processes. Rows changed since the last probe are applied in
+    place; if the row count still differs afterwards, rows were deleted
+    elsewhere and a fresh index is built on a background thread, then
+    swapped in. Lookups keep using the old index meanwhile, and the lock
+    is never held across a query.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._built = False
+        self._books = {}
+        self._indexes = {field: PrefixIndex() for field in SUGGEST_FIELDS}
+        self._synced_at = 0.0
+        self._high_water = None
+        self._rebuilding = None
+
+    def build(self):
+        high_water = Book.objects.aggregate(Max('updated_at'))['updated_at__max']
+        self.load(Book.objects.values_list('id', *SUGGEST_FIELDS).iterator(chunk_size=5000), high_water)
+
+    def load(self, rows, high_water=None):
+        """Replace the index with ``(id, title, author, isbn)`` rows."""
+        books = {}
+        pairs = {field: [] for field in SUGGEST_FIELDS}
+        for book_id, *values in rows:
+            books[book_id] = tuple(values)
+            for field, value in zip(SUGGEST_FIELDS, values):
+                pairs[field].extend((key, book_id) for key in index_keys(field, value))
+        indexes = {field: PrefixIndex(pairs[field]) for field in SUGGEST_FIELDS}
+        with self._lock:
+            self._books = books
+            self._indexes = indexes
+            self._high_water = high_water
+            self._synced_at = time.monotonic()
+            self._built = True
+
+    def warm(self):
+        """Build at worker start; fall back to building on first use."""
+        try:
+            self.build()
+        except DatabaseError:
+            pass
+
+    def rebuild_in_background(self):
+        """Start building a fresh index on a daemon thread, unless one is already running."""
+        with self._lock:
+            if self._rebuilding is not None and self._rebuilding.is_alive():
+                return self._rebuilding
+            self._rebuilding = threading.Thread(target=self._rebuild, name='book-suggest-rebuild', daemon=True)
+            self._rebuilding.start()
+            return self._rebuilding
+
+    def _rebuild(self):
+        try:
+            self.build()
+        except DatabaseError:
+            pass
+        finally:
+            # The thread's own connection; nothing else will close it.
+            connections.close_all()
+
+    def update(self, book):
+        self._put(book.pk, tuple(getattr(book, field) for field in SUGGEST_FIELDS))
+
+    def _put(self, book_id, values):
+        with self._lock:
+            if not self._built:
+                return
+            self._discard(book_id)
+            self._books[book_id] = values
+            for field, value in zip(SUGGEST_FIELDS, values):
+                for key in index_keys(field, value):
+                    self._indexes[field].add(key, book_id)
+
+    def remove(self, book_id):
+        with self._lock:
+            if self._built:
+                self._discard(book_id)
+
+    def _discard(self, book_id):
+        values = self._books.pop(book_id, None)
+        if values is None:
+            return
+        for field, value in zip(SUGGEST_FIELDS, values):
+            for key in index_keys(field, value):
+                self._indexes[field].remove(key, book_id)
+
+    def sync(self):
+        """Catch up with writes from other processes."""
+        interval = getattr(settings, 'SUGGEST_SYNC_INTERVAL', 30)
+        if time.monotonic() - self._synced_at < interval:
+            return
+        self._synced_at = time.monotonic()
+        state = Book.objects.aggregate(count=Count('id'), high_water=Max('updated_at'))
+        high_water = self._high_water
+        if state['high_water'] is not None and (high_water is None or state['high_water'] > high_water):
+            changed = Book.objects.values_list('id', 'updated_at', *SUGGEST_FIELDS)
+            if high_water is not None:
+                changed = changed.filter(updated_at__gt=high_water)
+            for book_id, updated_at, *values in changed:
+                self._put(book_id, tuple(values))
+            with self._lock:
+                if self._high_water == high_water:
+                    self._high_water = state['high_water']
+        if state['count'] != len(self._books):
+            # Rows were deleted elsewhere (maybe alongside inserts, which
+            # the count alone would miss); only a fresh load finds them.
+            self.rebuild_in_background()
+
+    def suggest(self, query, limit=8):
+        """Return up to ``limit`` distinct completions per field."""
+        if not self._built:
+            with self._build_lock:
+                if not self._built:
+                    self.build()
+        else:
+            self.sync()
+        return self.complete(query, limit)
+
+    def complete(self, query, limit=8):
+        prefix = normalize(query)
+        suggestions = {field: [] for field in SUGGEST_FIELDS}
+        if not prefix:
+            return suggestions
+        with self._lock:
+            for position, field in enumerate(SUGGEST_FIELDS):
+                key_prefix = prefix.replace('-', '') if field == 'isbn' else prefix
+                seen = set()
+                for _, book_id in self._indexes[field].search(key_prefix):
+                    value = self._books[book_id][position]
+                    if value not in seen:
+                        seen.add(value)
+                        suggestions[field].append(value)
+                        if len(seen) >= limit:
+                            break
+        return suggestions
+
+    def memory_usage(self):
+        with self._lock:
+            return sum(index.memory_usage() for index in self._indexes.values())
+
+
+suggester = BookSuggester()
@@ -0,0 +1,551 @@
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from models_new.models import Book as CatalogBook
+from services import book_service, catalog_import, circulation_service, label_service
+from users.models import User
+from utils import fast_list
+from utils.renderers import ORJSONRenderer
+from utils.response_cache import check_shared_cache
+from utils.search import TrigramSearchFilter
+from .models import Book
+from .suggest import BookSuggester, suggester
+from .views import BookViewSet
+
+# The tests clear and write the 'responses' cache, so they get their own
+# file-based one (shelftrack.E001 still passes) instead of the directory a
+# server running from this checkout uses.
+_response_cache_dir = tempfile.TemporaryDirectory(prefix='shelftrack-test-responses-')
+throwaway_response_cache = override_settings(CACHES={
+    **settings.CACHES,
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': _response_cache_dir.name,
+    },
+})
+
+
+def make_book(isbn='9780000000001', **fields):
+    defaults = {'title': 'Test Book', 'author': 'Author', 'isbn': isbn, 'publication_year': 2000,
+                'publisher': 'Press'}
+    defaults.update(fields)
+    return Book.objects.create(**defaults)
+
+
+@throwaway_response_cache
+class BookTestCase(TestCase):
+    def setUp(self):
+        caches['responses'].clear()
+        self.client = APIClient()
+
+
+class ConditionalGetTests(BookTestCase):
+    def test_retrieve_with_malformed_pk_is_404(self):
+        response = self.client.get('/api/books/abc/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_retrieve_unknown_pk_is_404(self):
+        response = self.client.get('/api/books/999999/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_retrieve_revalidates_with_etag(self):
+        book = make_book()
+        response = self.client.get(f'/api/books/{book.pk}/')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/books/{book.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(f'/api/books/{book.pk}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_has_no_last_modified(self):
+        make_book(isbn='9780000000001')
+        older = make_book(isbn='9780000000002')
+        Book.objects.filter(pk=older.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        response = self.client.get('/api/books/')
+        self.assertNotIn('Last-Modified', response)
+
+        # Deleting a row other than the newest leaves max(updated_at) unchanged.
+        with self.captureOnCommitCallbacks(execute=True):
+            older.delete()
+        response = self.client.get('/api/books/', HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+
+def claim_after_race(real=book_service._claim_isbns):
+    """_claim_isbns that misses every clash on its first call, as if the ISBN was taken just after."""
+    calls = []
+
+    def claim(rows, errors):
+        calls.append(rows)
+        if len(calls) == 1:
+            return {index for index, _, _ in rows}
+        return real(rows, errors)
+    return claim
+
+
+def claim_blind(rows, errors):
+    """_claim_isbns that never sees a clash, as if the ISBN was taken again after every check."""
+    return {index for index, _, _ in rows}
+
+
+class BulkBookTests(BookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(User.objects.create_user('librarian', password='secret'))
+
+    def bulk(self, method, data):
+        return getattr(self.client, method)('/api/books/bulk/', data, format='json')
+
+    def test_create_reports_bad_and_duplicate_rows(self):
+        make_book(isbn='9780000000001')
+        response = self.bulk('post', [
+            {'title': 'A', 'author': 'X', 'isbn': '9780000000002', 'publication_year': 2001, 'publisher': 'P'},
+            {'title': 'B', 'author': 'X', 'isbn': '9780000000001', 'publication_year': 2001, 'publisher': 'P'},
+            {'title': 'C', 'author': 'X', 'isbn': '9780000000002', 'publication_year': 2001, 'publisher': 'P'},
+            {'title': 'D'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [1, 2, 3])
+        self.assertIn('isbn', response.json()['errors'][0]['errors'])
+
+    def test_create_reports_isbn_taken_concurrently(self):
+        make_book(isbn='9780000000001')
+        with mock.patch.object(book_service, '_claim_isbns', claim_after_race()):
+            response = self.bulk('post', [
+                {'title': 'A', 'author': 'X', 'isbn': '9780000000001', 'publication_year': 2001, 'publisher': 'P'},
+                {'title': 'B', 'author': 'X', 'isbn': '9780000000002', 'publication_year': 2001, 'publisher': 'P'},
+            ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(response.json()['errors'][0]['index'], 0)
+
+    def test_update_reports_isbn_taken_concurrently(self):
+        first, second = make_book(isbn='9780000000001'), make_book(isbn='9780000000002')
+        with mock.patch.object(book_service, '_claim_isbns', claim_after_race()):
+            response = self.bulk('patch', [
+                {'id': second.pk, 'isbn': '9780000000001'},
+                {'id': first.pk, 'title': 'Renamed'},
+            ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(response.json()['errors'][0]['index'], 0)
+        self.assertEqual(Book.objects.get(pk=first.pk).title, 'Renamed')
+        self.assertEqual(Book.objects.get(pk=second.pk).isbn, '9780000000002')
+
+    def test_create_reports_rows_that_clash_twice(self):
+        make_book(isbn='9780000000001')
+        with mock.patch.object(book_service, '_claim_isbns', claim_blind):
+            response = self.bulk('post', [
+                {'title': 'A', 'author': 'X', 'isbn': '9780000000001', 'publication_year': 2001, 'publisher': 'P'},
+                {'title': 'B', 'author': 'X', 'isbn': '9780000000002', 'publication_year': 2001, 'publisher': 'P'},
+            ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 0)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [0, 1])
+        self.assertFalse(Book.objects.filter(isbn='9780000000002').exists())
+
+    def test_update_reports_rows_that_clash_twice(self):
+        first, second = make_book(isbn='9780000000001'), make_book(isbn='9780000000002')
+        with mock.patch.object(book_service, '_claim_isbns', claim_blind):
+            response = self.bulk('patch', [
+                {'id': second.pk, 'isbn': '9780000000001'},
+                {'id': first.pk, 'title': 'Renamed'},
+            ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 0)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [0, 1])
+        self.assertNotEqual(Book.objects.get(pk=first.pk).title, 'Renamed')
+
+    def test_update_reports_bad_ids(self):
+        book = make_book()
+        response = self.bulk('patch', [{'id': 'x', 'title': 'A'}, {'id': 999999, 'title': 'B'}, 'row',
+                                       {'id': str(book.pk), 'title': 'C'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 1)
+        self.assertEqual(response.json()['errors'], [
+            {'index': 0, 'errors': {'id': ['A valid integer is required.']}},
+            {'index': 1, 'errors': {'id': ['Book not found.']}},
+            {'index': 2, 'errors': {'non_field_errors': ['Expected an object.']}},
+        ])
+
+    def test_delete_reports_bad_ids(self):
+        book = make_book()
+        response = self.bulk('delete', {'ids': ['x', book.pk, 999999, None]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['ids'], [book.pk])
+        self.assertEqual(response.json()['errors'], [
+            {'index': 0, 'errors': {'id': ['A valid integer is required.']}},
+            {'index': 2, 'errors': {'id': ['Book not found.']}},
+            {'index': 3, 'errors': {'id': ['A valid integer is required.']}},
+        ])
+        self.assertFalse(Book.objects.filter(pk=book.pk).exists())
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    data = {'title': 'Line\u2028and\u2029paragraph', 'author': 'Gabriel García Márquez', 'price': Decimal('9.50'),
+            'copies': [1, 2.5, None, True], 'id': 2 ** 70}
+
+    def test_matches_json_renderer(self):
+        for media_type in ['application/json', 'application/json; indent=4', 'application/json; indent=0']:
+            with self.subTest(media_type=media_type):
+                self.assertEqual(ORJSONRenderer().render(self.data, media_type),
+                                 JSONRenderer().render(self.data, media_type))
+        self.assertIn(b'\\u2028', ORJSONRenderer().render(self.data))
+        self.assertIn(b'\n    "title"', ORJSONRenderer().render(self.data, 'application/json; indent=4'))
+
+
+class FuzzyThresholdTests(SimpleTestCase):
+    def threshold(self, value):
+        request = Request(APIRequestFactory().get('/api/books/', {'similarity': value}))
+        return TrigramSearchFilter().get_threshold(request)
+
+    def test_threshold_is_clamped(self):
+        self.assertEqual(self.threshold('0.3'), 0.3)
+        self.assertEqual(self.threshold('0'), 0.1)
+        self.assertEqual(self.threshold('7'), 1.0)
+
+    def test_non_finite_threshold_falls_back_to_default(self):
+        with self.settings(FUZZY_SEARCH_THRESHOLD=0.5):
+            for value in ('nan', 'inf', '-inf', 'abc'):
+                self.assertEqual(self.threshold(value), 0.5)
+
+
+@throwaway_response_cache
+class FuzzySearchTests(TransactionTestCase):
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                self.skipTest('pg_trgm is not installed')
+        caches['responses'].clear()
+
+    def test_threshold_does_not_outlive_the_request(self):
+        make_book(title='Harry Potter')
+        response = APIClient().get('/api/books/', {'search': 'hary poter', 'search_mode': 'fuzzy',
+                                                   'similarity': '0.35'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([book['title'] for book in response.json()['results']], ['Harry Potter'])
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_setting('pg_trgm.word_similarity_threshold', true)")
+            self.assertNotEqual(cursor.fetchone()[0], '0.35')
+
+
+@throwaway_response_cache
+class FastListTests(TestCase):
+    """The values_list() fast path must render exactly what BookSerializer does."""
+    queries = ['', 'page=2', 'pagination=cursor&page_size=3', 'publisher=Penguin', 'search=book',
+               'fields=title,isbn,created_at', 'exclude=title']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='secret')
+        for number in range(15):
+            make_book(isbn=f'97800000001{number:02d}', title=f'Book {number}',
+                      publisher='Penguin' if number % 3 else 'Puffin', quantity=number, available=number // 2)
+
+    def setUp(self):
+        caches['responses'].clear()
+
+    def get(self, query, fast):
+        request = APIRequestFactory().get(f'/api/books/?{query}')
+        force_authenticate(request, self.user)
+        return BookViewSet.as_view({'get': 'list'}, fast_list=fast)(request).render()
+
+    def test_fast_list_matches_serializer(self):
+        for query in self.queries:
+            with self.subTest(query=query):
+                slow, fast = self.get(query, False), self.get(query, True)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.content, slow.content)
+
+    def test_mapper_is_compiled_once(self):
+        fast_list._row_mappers.clear()
+        with mock.patch.object(fast_list, 'compile_row_mapper', wraps=fast_list.compile_row_mapper) as compile:
+            for _ in range(3):
+                self.get('', True)
+            self.get('fields=title', True)
+        self.assertEqual(compile.call_count, 2)
+
+
+@throwaway_response_cache
+class SuggestSignalTests(TestCase):
+    def setUp(self):
+        suggester.load([])
+
+    def test_index_only_sees_committed_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book = make_book(title='Committed Title')
+            try:
+                with transaction.atomic():
+                    make_book(isbn='9780000000002', title='Phantom Title')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.assertEqual(suggester.complete('committed')['title'], [])
+        self.assertEqual(suggester.complete('committed')['title'], ['Committed Title'])
+        self.assertEqual(suggester.complete('phantom')['title'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+        self.assertEqual(suggester.complete('committed')['title'], [])
+
+
+@mock.patch('books.signals.suggester', BookSuggester())
+@throwaway_response_cache
+class SuggestSyncTests(TransactionTestCase):
+    """Syncing with writes made by other processes (signals here go to a throwaway index)."""
+
+    def setUp(self):
+        self.suggester = BookSuggester()
+        self.gone = make_book(isbn='9780000000001', title='Gone Girl')
+        make_book(isbn='9780000000002', title='Good Omens')
+        self.suggester.build()
+
+    def sync(self):
+        with self.settings(SUGGEST_SYNC_INTERVAL=0):
+            self.suggester.sync()
+
+    def test_sync_applies_updates_in_place(self):
+        Book.objects.filter(title='Good Omens').update(title='Great Expectations', updated_at=timezone.now())
+        with mock.patch.object(self.suggester, 'rebuild_in_background') as rebuild:
+            self.sync()
+        rebuild.assert_not_called()
+        self.assertEqual(self.suggester.complete('g')['title'], ['Gone Girl', 'Great Expectations'])
+
+    def test_delete_paired_with_insert_rebuilds_without_blocking_lookups(self):
+        self.gone.delete()
+        make_book(isbn='9780000000003', title='Gulliver')
+        started, release = threading.Event(), threading.Event()
+        load = self.suggester.load
+
+        def slow_load(rows, high_water):
+            rows = list(rows)
+            started.set()
+            release.wait(5)
+            load(rows, high_water)
+
+        with mock.patch.object(self.suggester, 'load', side_effect=slow_load):
+            self.sync()
+            self.assertTrue(started.wait(5))
+            # Mid-rebuild: the old index (plus the in-place insert) still answers.
+            self.assertEqual(self.suggester.complete('g')['title'], ['Gone Girl', 'Good Omens', 'Gulliver'])
+            release.set()
+            self.suggester._rebuilding.join(5)
+        self.assertEqual(self.suggester.complete('g')['title'], ['Good Omens', 'Gulliver'])
+
+
+class ResponseCacheTests(BookTestCase):
+    def test_write_invalidates_cached_list(self):
+        make_book(title='First')
+        self.assertEqual(self.client.get('/api/books/')['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/books/')['X-Cache'], 'HIT')
+
+        writer = APIClient()
+        writer.force_authenticate(User.objects.create_user('librarian', password='secret'))
+        with self.captureOnCommitCallbacks(execute=True):
+            writer.post('/api/books/', {'title': 'Second', 'author': 'X', 'isbn': '9780000000002',
+                                        'publication_year': 2001, 'publisher': 'P'}, format='json')
+        response = self.client.get('/api/books/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_local_memory_cache_needs_debug(self):
+        caches_setting = {'responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with self.settings(CACHES=caches_setting, DEBUG=False):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['shelftrack.E001'])
+        with self.settings(CACHES=caches_setting, DEBUG=True):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_default_cache_is_shared(self):
+        with self.settings(DEBUG=False):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_tests_use_a_throwaway_cache(self):
+        self.assertEqual(caches['responses']._dir, _response_cache_dir.name)
+
+
+class BarcodeImageTests(BookTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(self.settings(BARCODE_CACHE_DIR=directory.name))
+
+    def test_image_is_revalidated_when_the_code_changes(self):
+        book = make_book()
+        url = f'/api/books/{book.pk}/barcode.svg'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('max-age', response['Cache-Control'])
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A catalog copy replaces the ISBN fallback at the same URL.
+        CatalogBook.objects.create(
+            title='Test Book', author='Author', isbn=book.isbn, barcode='BC0001', book_type='novel',
+            publisher='Press', publication_year=2000, price=10, condition='good', location='A1',
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@throwaway_response_cache
+class LabelTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(self.settings(BARCODE_CACHE_DIR=directory.name))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('librarian', password='secret'))
+        for number in range(30):
+            isbn = f'97800000002{number:02d}'
+            make_book(isbn=isbn, title=f'Label {number}')
+            CatalogBook.objects.create(
+                title=f'Label {number}', author='Author', isbn=isbn, barcode=f'LB{number:04d}', book_type='novel',
+                publisher='Press', publication_year=2000, price=10, condition='good', location=f'A{number}',
+            )
+
+    def test_labels_stream_in_process(self):
+        with mock.patch.object(label_service, 'ProcessPoolExecutor') as pool:
+            response = self.client.get('/api/books/labels.pdf')
+            content = b''.join(response.streaming_content)
+        pool.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF-1.4'))
+        self.assertTrue(content.endswith(b'%%EOF\n'))
+        # 30 labels at 24 per sheet.
+        self.assertIn(b'/Count 2 >>', content)
+
+    def test_labels_limit(self):
+        with self.settings(LABELS_MAX_PER_REQUEST=10):
+            response = self.client.get('/api/books/labels.pdf')
+        self.assertEqual(response.status_code, 400)
+
+
+def valid_isbn(number):
+    first12 = '978{:09d}'.format(number)
+    return first12 + catalog_import._isbn13_check_digit(first12)
+
+
+@throwaway_response_cache
+class CatalogImportTests(TestCase):
+    def run_import(self, rows):
+        rejected = []
+        importer = catalog_import.CatalogImporter(
+            catalog_import.TARGETS['models_new'], on_reject=lambda line, message: rejected.append((line, message)),
+        )
+        stats = importer.run(enumerate(rows, start=1))
+        return stats, rejected
+
+    def row(self, number, barcode=''):
+        return {'title': 'Title {}'.format(number), 'author': 'Author', 'isbn': valid_isbn(number),
+                'barcode': barcode, 'quantity': '2', 'publication_year': '2000'}
+
+    def test_barcode_clashes_in_one_chunk_are_row_errors(self):
+        CatalogBook.objects.create(
+            title='Shelved', author='Author', isbn=valid_isbn(9), barcode='TAKEN', book_type='other',
+            publisher='Press', publication_year=2000, price=0, condition='good', location='A1',
+        )
+        stats, rejected = self.run_import([
+            self.row(1, 'DUP'),
+            self.row(2, 'DUP'),
+            self.row(3, 'TAKEN'),
+            self.row(4, 'SAME'),
+            self.row(4, 'SAME'),
+            self.row(5),
+        ])
+
+        self.assertEqual(rejected, [
+            (2, 'Barcode is used by an earlier row for another ISBN.'),
+            (3, 'Barcode already belongs to another ISBN.'),
+        ])
+        self.assertEqual((stats['inserted'], stats['rejected']), (3, 2))
+        self.assertEqual(CatalogBook.objects.get(barcode='DUP').isbn, valid_isbn(1))
+        self.assertEqual(CatalogBook.objects.get(isbn=valid_isbn(4)).barcode, 'SAME')
+        self.assertTrue(CatalogBook.objects.get(isbn=valid_isbn(5)).barcode)
+
+
+@throwaway_response_cache
+class ImportCatalogCommandTests(TestCase):
+    def test_unreadable_paths_are_command_errors(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaisesMessage(CommandError, 'No such file or directory'):
+                call_command('import_catalog', directory + '/missing.csv')
+            with self.assertRaisesMessage(CommandError, 'Is a directory'):
+                call_command('import_catalog', directory)
+
+
+class CheckoutTests(BookTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(User.objects.create_user('desk', password='secret'))
+        self.book = make_book(quantity=2, available=2)
+
+    def post(self, action, pk=None):
+        return self.client.post('/api/books/{}/{}/'.format(pk or self.book.pk, action))
+
+    def test_checkout_and_return_stay_within_stock(self):
+        self.assertEqual(self.post('checkout').json(), {'id': self.book.pk, 'available': 1, 'quantity': 2})
+        self.assertEqual(self.post('checkout').json()['available'], 0)
+        response = self.post('checkout')
+        self.assertEqual((response.status_code, response.json()), (409, {'detail': 'No copies available.'}))
+
+        self.assertEqual(self.post('return').json()['available'], 1)
+        self.assertEqual(self.post('return').json()['available'], 2)
+        response = self.post('return')
+        self.assertEqual((response.status_code, response.json()), (409, {'detail': 'All copies are already returned.'}))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available, 2)
+
+    def test_unknown_book_is_404(self):
+        self.assertEqual(self.post('checkout', 'abc').status_code, 404)
+        self.assertEqual(self.post('return', self.book.pk + 1000).status_code, 404)
+
+
+@throwaway_response_cache
+class CheckoutConcurrencyTests(TransactionTestCase):
+    def test_concurrent_checkouts_never_oversell(self):
+        book = make_book(quantity=5, available=5)
+        barrier = threading.Barrier(12)
+        results = []
+
+        def desk():
+            try:
+                barrier.wait()
+                try:
+                    circulation_service.checkout(Book, book.pk)
+                    results.append(True)
+                except circulation_service.StockError:
+                    results.append(False)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=desk) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual((results.count(True), results.count(False)), (5, 7))
+        book.refresh_from_db()
+        self.assertEqual(book.available, 0)
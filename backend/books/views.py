@@ -1,23 +1,51 @@
-from rest_framework import viewsets, permissions
-from rest_framework.filters import SearchFilter
+from itertools import islice
+
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
+from utils.conditional import ConditionalGetMixin
+from utils.export import ExportMixin
+from utils.fast_list import FastListMixin
+from utils.fields import SparseFieldsetMixin
+from utils.pagination import CursorPaginationMixin
+from utils.renderers import PDFRenderer, PNGRenderer, SVGRenderer
+from utils.response_cache import CachedResponseMixin
+from utils.search import FuzzySearchMixin, TrigramSearchFilter
+from services import barcode_service, book_service, circulation_service, label_service
+from .cache import book_cache
 from .models import Book
 from .serializers import BookSerializer
+from .suggest import suggester
 
-class BookViewSet(viewsets.ModelViewSet):
-    queryset = Book.objects.all()
+class BookViewSet(FuzzySearchMixin, ExportMixin, CachedResponseMixin, ConditionalGetMixin, SparseFieldsetMixin,
+                  FastListMixin, CursorPaginationMixin, viewsets.ModelViewSet):
+    queryset = Book.objects.defer('search_vector')
     serializer_class = BookSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter]
     filterset_fields = ['title', 'author', 'isbn', 'publisher']
     search_fields = ['title', 'author', 'isbn', 'publisher']
+    search_vector_field = 'search_vector'
+    fuzzy_search_fields = ['title', 'author']
+    cursor_ordering = ['-created_at', '-id']
+    export_fields = BookSerializer.Meta.fields
+    response_cache = book_cache
+    fast_list = True
 
     def get_permissions(self):
         """
         Allow unauthenticated users to view books,
         but require authentication for create/update/delete operations.
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'suggest', 'export', 'barcode']:
             permission_classes = [permissions.AllowAny]
+        elif self.action == 'cache_stats':
+            permission_classes = [permissions.IsAdminUser]
         else:
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
@@ -29,4 +57,131 @@ class BookViewSet(viewsets.ModelViewSet):
         serializer.save()
 
     def perform_destroy(self, instance):
-        instance.delete() 
\ No newline at end of file
+        instance.delete()
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Search-as-you-type completions for titles, authors and ISBNs,
+        served from the in-process prefix index in books.suggest.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 25)
+        except ValueError:
+            limit = 8
+        query = request.query_params.get('q', '')
+        return Response({'query': query, **suggester.suggest(query, limit=limit)})
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        Create (POST a list of books), update (PATCH a list of partial books
+        with ``id``) or delete (DELETE ``{"ids": [...]}``) many books in one
+        request. Valid rows are written even when others fail; failures come
+        back in ``errors`` with the row index.
+        """
+        max_rows = getattr(settings, 'BULK_MAX_ROWS', 5000)
+        if request.method == 'DELETE':
+            rows = request.data.get('ids') if isinstance(request.data, dict) else None
+        else:
+            rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError('Expected a list of rows.')
+        if len(rows) > max_rows:
+            raise ValidationError(f'At most {max_rows} rows per request.')
+
+        if request.method == 'POST':
+            books, errors = book_service.bulk_create_books(rows)
+            return Response({
+                'created': len(books),
+                'results': BookSerializer(books, many=True).data,
+                'errors': errors,
+            }, status=status.HTTP_201_CREATED)
+        if request.method == 'PATCH':
+            books, errors = book_service.bulk_update_books(rows)
+            return Response({
+                'updated': len(books),
+                'results': BookSerializer(books, many=True).data,
+                'errors': errors,
+            })
+        deleted, errors = book_service.bulk_delete_books(rows)
+        return Response({'deleted': len(deleted), 'ids': deleted, 'errors': errors})
+
+    @action(detail=False, methods=['get', 'delete'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """
+        Hit ratio and average latency of the anonymous response cache.
+        DELETE resets the counters.
+        """
+        if request.method == 'DELETE':
+            book_cache.reset_stats()
+        return Response(book_cache.stats())
+
+    @action(detail=True, methods=['get'], renderer_classes=[PNGRenderer, SVGRenderer])
+    def barcode(self, request, pk=None, format=None):
+        """
+        Code128 image of the book's barcode: ``barcode.png`` or
+        ``barcode.svg`` (or the Accept header). Images are rendered once per
+        code and served from the content-hash cache in
+        services.barcode_service; the hash is the ETag. The URL is not
+        content-addressed (the value falls back to the ISBN until a catalog
+        copy exists, and a catalog barcode can change), so clients must
+        revalidate every time, which costs a 304 while the image is unchanged.
+        """
+        book = self.get_object()
+        value = barcode_service.barcode_value(book)
+        image_format = request.accepted_renderer.format
+        cache = barcode_service.image_cache
+        etag = quote_etag(cache.key(value, image_format))
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            _, image = cache.render(value, image_format)
+            response = Response(image)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+    @action(detail=False, methods=['get'], renderer_classes=[PDFRenderer])
+    def labels(self, request, format=None):
+        """
+        Printable A4 label sheets (PDF) for the books matching the usual
+        list filters: barcode, title and location of each title's catalog
+        copy record. ``?per_copy=1`` prints one label per copy. Sheets are
+        rendered in this process and streamed a page at a time; large runs
+        belong in manage.py print_labels, which uses a process pool.
+        """
+        limit = getattr(settings, 'LABELS_MAX_PER_REQUEST', 3000)
+        per_copy = request.query_params.get('per_copy') in ('1', 'true')
+        books = self.filter_queryset(self.get_queryset())
+        labels = list(islice(label_service.book_labels(books, per_copy=per_copy), limit + 1))
+        if not labels:
+            raise NotFound('No catalog copies match these books.')
+        if len(labels) > limit:
+            raise ValidationError(f'At most {limit} labels per request; narrow the filters or use manage.py print_labels.')
+
+        response = StreamingHttpResponse(
+            label_service.LabelPrinter(workers=1).stream_pdf(labels),
+            content_type=request.accepted_renderer.media_type,
+        )
+        response['Content-Disposition'] = 'attachment; filename="labels.pdf"'
+        return response
+
+    @action(detail=True, methods=['post'])
+    def checkout(self, request, pk=None):
+        """Lend one copy. Returns the new availability, or 409 if none is left."""
+        return self._adjust_stock(circulation_service.checkout, pk)
+
+    @action(detail=True, methods=['post'], url_path='return')
+    def return_copy(self, request, pk=None):
+        """Take one copy back. Returns the new availability, or 409 if none is out."""
+        return self._adjust_stock(circulation_service.checkin, pk)
+
+    def _adjust_stock(self, change, pk):
+        try:
+            available, quantity = change(Book, int(pk))
+        except (Book.DoesNotExist, ValueError):
+            raise NotFound()
+        except circulation_service.StockError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_409_CONFLICT)
+        return Response({'id': int(pk), 'available': available, 'quantity': quantity})
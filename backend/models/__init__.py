@@ -1,8 +1 @@
-# This file is intentionally empty to make the directory a Python package. 
-
-from .user import User
-from .book import Book
-from .school import School
-from .student import Student
-
-__all__ = ['User', 'Book', 'School', 'Student'] 
\ No newline at end of file
+# This file is intentionally empty to make the directory a Python package. 
\ No newline at end of file
@@ -1,17 +1,20 @@
 from django.contrib import admin
+from .hold import Hold
+from .loan import Loan
+from .stocktake import Stocktake
 from .student import Student
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     list_display = ('student_id', 'first_name', 'last_name', 'grade', 'section', 'is_active')
-    list_filter = ('grade', 'section', 'gender', 'is_active')
+    list_filter = ('grade', 'section', 'school', 'gender', 'is_active')
     search_fields = ('first_name', 'last_name', 'student_id', 'parent_name')
     ordering = ('grade', 'section', 'first_name', 'last_name')
     
     fieldsets = (
         ('Personal Information', {
             'fields': ('first_name', 'last_name', 'student_id', 'date_of_birth',
-                      'gender', 'grade', 'section', 'profile_picture')
+                      'gender', 'grade', 'section', 'school', 'profile_picture')
         }),
         ('Parent Information', {
             'fields': ('parent_name', 'parent_phone', 'parent_email', 'address')
@@ -19,4 +22,28 @@ class StudentAdmin(admin.ModelAdmin):
         ('Status', {
             'fields': ('is_active', 'admission_date')
         })
-    ) 
\ No newline at end of file
+    ) 
+
+
+@admin.register(Loan)
+class LoanAdmin(admin.ModelAdmin):
+    list_display = ('book', 'student', 'user', 'issued_at', 'due_at', 'returned_at')
+    list_filter = ('returned_at',)
+    # Millions of rows: no full-table dropdowns.
+    raw_id_fields = ('book', 'student', 'user', 'issued_by')
+    date_hierarchy = 'issued_at'
+
+
+
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    list_display = ('book', 'student', 'user', 'status', 'placed_at', 'expires_at')
+    list_filter = ('status',)
+    raw_id_fields = ('book', 'student', 'user')
+
+
+@admin.register(Stocktake)
+class StocktakeAdmin(admin.ModelAdmin):
+    list_display = ('name', 'location_prefix', 'status', 'started_at', 'scans_received', 'reconciled_at')
+    list_filter = ('status',)
+    readonly_fields = ('scans_received', 'reconciled_at', 'summary')
@@ -0,0 +1,42 @@
+import re
+
+from django.db.models import Q
+from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+
+from .student import Student
+
+
+def parse_classes(value):
+    """``'5A, 6-b'`` -> ``[(5, 'A'), (6, 'B')]``, sorted and without repeats."""
+    classes = set()
+    for token in value.split(','):
+        match = re.fullmatch(r'\s*(\d{1,2})\s*-?\s*([A-Za-z])\s*', token)
+        if match is None:
+            raise ValidationError({'sections': [f'{token.strip()!r} is not a class like 5A.']})
+        classes.add((int(match.group(1)), match.group(2).upper()))
+    return sorted(classes)
+
+
+class StudentFilter(filters.FilterSet):
+    """
+    Query filters for StudentViewSet. Sections are stored upper case, so
+    ``?section=`` is upper-cased here instead of matched case-insensitively,
+    which keeps the (grade, section, ...) indexes usable. ``?sections=5A,5B``
+    selects several classes at once.
+    """
+    section = filters.CharFilter(method='filter_section')
+    sections = filters.CharFilter(method='filter_sections')
+
+    class Meta:
+        model = Student
+        fields = ['grade', 'section', 'school', 'gender', 'is_active']
+
+    def filter_section(self, queryset, name, value):
+        return queryset.filter(section=value.upper())
+
+    def filter_sections(self, queryset, name, value):
+        classes = Q()
+        for grade, section in parse_classes(value):
+            classes |= Q(grade=grade, section=section)
+        return queryset.filter(classes)
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+
+from .student import Student
+
+
+class Hold(models.Model):
+    WAITING = 'waiting'
+    READY = 'ready'
+    FULFILLED = 'fulfilled'
+    CANCELLED = 'cancelled'
+    EXPIRED = 'expired'
+    STATUS_CHOICES = (
+        (WAITING, 'Waiting'),
+        (READY, 'Ready for pickup'),
+        (FULFILLED, 'Fulfilled'),
+        (CANCELLED, 'Cancelled'),
+        (EXPIRED, 'Expired'),
+    )
+    ACTIVE = (WAITING, READY)
+
+    book = models.ForeignKey('models_new.Book', on_delete=models.PROTECT, related_name='holds')
+    student = models.ForeignKey(Student, on_delete=models.PROTECT, null=True, blank=True, related_name='holds')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, null=True, blank=True,
+                             related_name='holds')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=WAITING)
+    placed_at = models.DateTimeField(auto_now_add=True)
+    ready_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['placed_at', 'id']
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(student__isnull=False) ^ Q(user__isnull=False),
+                name='hold_one_borrower',
+            ),
+            # One active hold per borrower and title.
+            models.UniqueConstraint(fields=['book', 'student'], condition=Q(status__in=['waiting', 'ready']),
+                                    name='hold_active_student'),
+            models.UniqueConstraint(fields=['book', 'user'], condition=Q(status__in=['waiting', 'ready']),
+                                    name='hold_active_user'),
+        ]
+        indexes = [
+            # The queue: next hold for a title is the first entry of this
+            # partial index, found in O(log n) however long the queue is.
+            models.Index(fields=['book', 'placed_at', 'id'], condition=Q(status='waiting'), name='hold_queue'),
+            # Pickup deadlines for expire_holds.
+            models.Index(fields=['expires_at', 'id'], condition=Q(status='ready'), name='hold_ready_expiry'),
+        ]
+
+    def __str__(self):
+        return f"{self.book_id} <- {self.student_id or self.user_id} ({self.status})"
@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from .student import Student
+
+# Loans still out; every circulation lookup is limited to these.
+OPEN = Q(returned_at__isnull=True)
+
+
+class Loan(models.Model):
+    book = models.ForeignKey('models_new.Book', on_delete=models.PROTECT, related_name='loans')
+    student = models.ForeignKey(Student, on_delete=models.PROTECT, null=True, blank=True, related_name='loans')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, null=True, blank=True,
+                             related_name='loans')
+    issued_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='+')
+    issued_at = models.DateTimeField(default=timezone.now)
+    due_at = models.DateTimeField()
+    returned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-issued_at', '-id']
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(student__isnull=False) ^ Q(user__isnull=False),
+                name='loan_one_borrower',
+            ),
+        ]
+        indexes = [
+            # Partial indexes over open loans only, so they stay small no
+            # matter how much history piles up. Each lookup below is a
+            # single index range scan returning rows in due_at order.
+            models.Index(fields=['student', 'due_at', 'id'], condition=OPEN, name='loan_open_student'),
+            models.Index(fields=['user', 'due_at', 'id'], condition=OPEN, name='loan_open_user'),
+            models.Index(fields=['book', 'due_at', 'id'], condition=OPEN, name='loan_open_book'),
+            # Overdue scans: WHERE returned_at IS NULL AND due_at < now().
+            models.Index(fields=['due_at', 'id'], condition=OPEN, name='loan_open_due'),
+            # Full history, newest first (default ordering / keyset pagination).
+            models.Index(fields=['-issued_at', '-id'], name='loan_issued'),
+            # Returns by time, for the circulation roll-up; see services.report_service.
+            models.Index(fields=['returned_at'], condition=~OPEN, name='loan_returned'),
+        ]
+
+    def __str__(self):
+        return f"{self.book_id} -> {self.student_id or self.user_id} (due {self.due_at:%Y-%m-%d})"
+
+    @property
+    def is_overdue(self):
+        return self.returned_at is None and self.due_at < timezone.now()
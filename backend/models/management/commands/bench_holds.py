@@ -0,0 +1,98 @@
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from models.models import Hold, Student
+from models_new.models import Book
+from services import circulation_service
+
+
+class Command(BaseCommand):
+    help = (
+        'Queue --holds waiting holds on one title, then time allocations '
+        'one by one and from --workers parallel threads (one database '
+        'connection each), checking every copy went to a different hold in '
+        'queue order. The test title and its holds are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--holds', type=int, default=10000)
+        parser.add_argument('--sequential', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--per-worker', type=int, default=100)
+
+    def handle(self, *args, **options):
+        students = list(Student.objects.order_by('id').values_list('id', flat=True)[:options['holds']])
+        if len(students) < options['holds']:
+            raise CommandError('Need at least {} students to queue distinct holds.'.format(options['holds']))
+        book = Book.objects.create(
+            title='Hold benchmark', author='-', isbn='9' + str(time.time_ns())[-12:], book_type='other',
+            publisher='-', publication_year=2000, price=Decimal('0'), quantity=1, available_quantity=0,
+            condition='new', location='-',
+        )
+        try:
+            Hold.objects.bulk_create([Hold(book=book, student_id=student) for student in students])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE {}'.format(Hold._meta.db_table))
+            queue = list(Hold.objects.filter(book=book).order_by('placed_at', 'id').values_list('id', flat=True))
+            self._explain(book)
+
+            timings = []
+            allocated = []
+            for _ in range(options['sequential']):
+                start = time.perf_counter()
+                allocated.append(circulation_service.allocate_hold(book.pk))
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            self.stdout.write('sequential: {} allocations, p50 {:.3f} ms, p95 {:.3f} ms'.format(
+                len(timings), statistics.median(timings), timings[int(len(timings) * 0.95) - 1]))
+
+            lock = threading.Lock()
+            gate = threading.Barrier(options['workers'])
+
+            def worker():
+                mine = []
+                gate.wait()
+                try:
+                    for _ in range(options['per_worker']):
+                        mine.append(circulation_service.allocate_hold(book.pk))
+                finally:
+                    connection.close()
+                with lock:
+                    allocated.extend(mine)
+
+            threads = [threading.Thread(target=worker) for _ in range(options['workers'])]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            parallel = options['workers'] * options['per_worker']
+            self.stdout.write('parallel: {} allocations from {} workers in {:.2f}s ({:.0f}/s)'.format(
+                parallel, options['workers'], elapsed, parallel / elapsed))
+
+            allocated = [hold_id for hold_id in allocated if hold_id is not None]
+            if len(set(allocated)) != len(allocated):
+                raise CommandError('A hold was allocated twice.')
+            if set(allocated) != set(queue[:len(allocated)]):
+                raise CommandError('Allocation skipped ahead of the queue.')
+            self.stdout.write(self.style.SUCCESS(
+                '{} distinct holds allocated, exactly the first {} in the queue.'.format(len(allocated), len(allocated))))
+        finally:
+            Hold.objects.filter(book=book).delete()
+            book.delete()
+
+    def _explain(self, book):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN SELECT id FROM {} WHERE book_id = %s AND status = %s '
+                'ORDER BY placed_at, id LIMIT 1 FOR UPDATE SKIP LOCKED'.format(Hold._meta.db_table),
+                [book.pk, Hold.WAITING],
+            )
+            plan = [row[0].strip() for row in cursor.fetchall()]
+        self.stdout.write('queue head: {}'.format(next(line for line in plan if 'Index' in line)))
@@ -0,0 +1,99 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from models.loan import OPEN, Loan
+
+SEED_SQL = [
+    """
+    INSERT INTO models_new_book
+        (title, author, isbn, barcode, book_type, publisher, publication_year,
+         edition, price, quantity, available_quantity, condition, location,
+         description, created_at, updated_at)
+    SELECT 'Bench ' || g, 'Author ' || g, (9780000000000 + g)::text, 'LB' || g, 'novel',
+           'Press', 2000, '', 10, 5, 5, 'good', 'A1', '', now(), now()
+    FROM generate_series(1, %(books)s) AS g
+    """,
+    """
+    INSERT INTO models_student
+        (first_name, last_name, student_id, date_of_birth, gender, grade, section,
+         admission_date, parent_name, parent_phone, parent_email, address,
+         is_active, created_at, updated_at)
+    SELECT 'First' || g, 'Last' || g, 'LOAN' || g, date '2012-01-01', 'M', 1 + g %% 12,
+           'A', date '2020-09-01', 'Parent', '555', '', '', true, now(), now()
+    FROM generate_series(1, %(students)s) AS g
+    """,
+    # History spread over ten years; the newest ~%(open_pct)s%% are still
+    # out, a slice of those past due.
+    """
+    INSERT INTO models_loan (book_id, student_id, issued_at, due_at, returned_at)
+    SELECT b.ids[1 + (g::bigint * 7919) %% array_length(b.ids, 1)],
+           s.ids[1 + (g::bigint * 104729) %% array_length(s.ids, 1)],
+           issued, issued + interval '14 days',
+           CASE WHEN g > %(loans)s * (100 - %(open_pct)s) / 100 THEN NULL
+                ELSE issued + interval '10 days' END
+    FROM generate_series(1, %(loans)s) AS g,
+         LATERAL (SELECT now() - interval '3650 days' * (1 - g::float / %(loans)s)
+                                 - interval '20 days' AS issued) AS t,
+         (SELECT array_agg(id) AS ids FROM models_new_book WHERE barcode LIKE 'LB%%') AS b,
+         (SELECT array_agg(id) AS ids FROM models_student WHERE student_id LIKE 'LOAN%%') AS s
+    """,
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the open-by-student, open-by-book and overdue loan lookups '
+        'against a large synthetic loan history. Seeds inside a transaction '
+        'that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=5000000)
+        parser.add_argument('--books', type=int, default=50000)
+        parser.add_argument('--students', type=int, default=20000)
+        parser.add_argument('--open-pct', type=int, default=2)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                for sql in SEED_SQL:
+                    cursor.execute(sql, {key: options[key] for key in ('loans', 'books', 'students', 'open_pct')})
+                cursor.execute('ANALYZE models_loan')
+            self.stdout.write('Seeded {} loans in {:.0f}s'.format(options['loans'], time.perf_counter() - started))
+
+            students = list(Loan.objects.filter(OPEN).values_list('student_id', flat=True).distinct()[:1000])
+            books = list(Loan.objects.filter(OPEN).values_list('book_id', flat=True).distinct()[:1000])
+            rng = random.Random(1)
+            size = options['page_size']
+            cases = [
+                ('open by student', lambda: Loan.objects.filter(OPEN, student_id=rng.choice(students))
+                    .order_by('due_at', 'id')[:size]),
+                ('open by book', lambda: Loan.objects.filter(OPEN, book_id=rng.choice(books))
+                    .order_by('due_at', 'id')[:size]),
+                ('overdue', lambda: Loan.objects.filter(OPEN, due_at__lt=timezone.now())
+                    .order_by('due_at', 'id')[:size]),
+            ]
+
+            self.stdout.write('{:<16} {:>9} {:>9}  plan'.format('lookup', 'p50 ms', 'p95 ms'))
+            for name, make in cases:
+                timings = []
+                for _ in range(options['queries']):
+                    queryset = make()
+                    start = time.perf_counter()
+                    list(queryset)
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                plan = make().explain().splitlines()
+                index = next((line.strip() for line in plan if 'Index' in line), plan[0].strip())
+                self.stdout.write('{:<16} {:>9.2f} {:>9.2f}  {}'.format(
+                    name, statistics.median(timings), timings[int(len(timings) * 0.95) - 1], index,
+                ))
+            transaction.set_rollback(True)
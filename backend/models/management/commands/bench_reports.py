@@ -0,0 +1,133 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.utils import timezone
+
+from models.models import Loan
+from models_new.models import School
+from services import report_service
+from users.models import User
+
+SEED_SQL = [
+    """
+    INSERT INTO models_new_school
+        (name, code, address, phone, email, website, principal_name, established_date,
+         is_active, created_at, updated_at)
+    SELECT 'Bench School ' || g, 'RB' || g, '', '555', 'school@example.com', '', 'Principal',
+           date '1990-01-01', true, now(), now()
+    FROM generate_series(1, %(schools)s) AS g
+    """,
+    """
+    INSERT INTO models_new_book
+        (title, author, isbn, barcode, book_type, publisher, publication_year,
+         edition, price, quantity, available_quantity, condition, location,
+         description, created_at, updated_at)
+    SELECT 'Bench ' || g, 'Author ' || g, (9790000000000 + g)::text, 'RB' || g,
+           (ARRAY['textbook', 'reference', 'magazine', 'novel', 'other'])[1 + g %% 5],
+           'Press', 2000, '', 10, 5, 5, 'good', 'A1', '', now(), now()
+    FROM generate_series(1, %(books)s) AS g
+    """,
+    """
+    INSERT INTO models_student
+        (first_name, last_name, student_id, date_of_birth, gender, grade, section, school_id,
+         admission_date, parent_name, parent_phone, parent_email, address,
+         is_active, created_at, updated_at)
+    SELECT 'First' || g, 'Last' || g, 'RPT' || g, date '2012-01-01', 'M', 1 + g %% 12, 'A',
+           s.ids[1 + g %% array_length(s.ids, 1)],
+           date '2020-09-01', 'Parent', '555', '', '', true, now(), now()
+    FROM generate_series(1, %(students)s) AS g,
+         (SELECT array_agg(id) AS ids FROM models_new_school WHERE code LIKE 'RB%%') AS s
+    """,
+    # Ten years of history, issued evenly, each returned after 3-20 days.
+    """
+    INSERT INTO models_loan (book_id, student_id, issued_at, due_at, returned_at)
+    SELECT b.ids[1 + (g::bigint * 7919) %% array_length(b.ids, 1)],
+           s.ids[1 + (g::bigint * 104729) %% array_length(s.ids, 1)],
+           issued, issued + interval '14 days', issued + interval '1 day' * (3 + g %% 18)
+    FROM generate_series(1, %(loans)s) AS g,
+         LATERAL (SELECT now() - interval '3650 days' * (1 - g::float / %(loans)s)
+                                 - interval '30 days' AS issued) AS t,
+         (SELECT array_agg(id) AS ids FROM models_new_book WHERE barcode LIKE 'RB%%') AS b,
+         (SELECT array_agg(id) AS ids FROM models_student WHERE student_id LIKE 'RPT%%') AS s
+    """,
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the circulation roll-up over a large synthetic loan history '
+        'and time year-long reports through /api/reports/circulation/. '
+        'Seeds inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loans', type=int, default=5000000)
+        parser.add_argument('--books', type=int, default=50000)
+        parser.add_argument('--students', type=int, default=20000)
+        parser.add_argument('--schools', type=int, default=10)
+        parser.add_argument('--queries', type=int, default=30)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM models_circulationrollup')
+                cursor.execute('DELETE FROM models_rollupwatermark')
+                for sql in SEED_SQL:
+                    cursor.execute(sql, {key: options[key] for key in ('loans', 'books', 'students', 'schools')})
+                cursor.execute('ANALYZE models_loan')
+            self.stdout.write('Seeded {} loans in {:.0f}s'.format(options['loans'], time.perf_counter() - started))
+
+            started = time.perf_counter()
+            batches = report_service.roll_up()
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE models_circulationrollup')
+                cursor.execute('SELECT count(*) FROM models_circulationrollup')
+                rows, = cursor.fetchone()
+            self.stdout.write('Full roll-up: {} batches, {} rows in {:.1f}s'.format(
+                batches, rows, time.perf_counter() - started,
+            ))
+            started = time.perf_counter()
+            report_service.roll_up()
+            self.stdout.write('Incremental run with nothing new: {:.1f} ms'.format(
+                (time.perf_counter() - started) * 1000,
+            ))
+
+            user = User.objects.create_user('bench-reports', password='bench', is_staff=True)
+            client = Client()
+            client.force_login(user)
+            end = timezone.localdate() - timedelta(days=30)
+            start = end - timedelta(days=364)
+            cases = [
+                ('year by month', 'period=month'),
+                ('year by month and school', 'period=month&by=school'),
+                ('year by week, type, grade', 'period=week&by=book_type,grade'),
+                ('year total by all three', 'period=total&by=school,book_type,grade'),
+                ('year by day, one school', 'period=day&school={}'.format(
+                    School.objects.filter(code__startswith='RB').order_by('id').values_list('id', flat=True).first(),
+                )),
+            ]
+            self.stdout.write('{:<28} {:>6} {:>9} {:>9}'.format('report', 'rows', 'p50 ms', 'p95 ms'))
+            for name, query in cases:
+                url = '/api/reports/circulation/?start={}&end={}&{}'.format(start, end, query)
+                timings = []
+                for _ in range(options['queries']):
+                    begin = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - begin) * 1000)
+                assert response.status_code == 200, response.content
+                timings.sort()
+                self.stdout.write('{:<28} {:>6} {:>9.1f} {:>9.1f}'.format(
+                    name, len(response.json()['rows']), statistics.median(timings),
+                    timings[int(len(timings) * 0.95) - 1],
+                ))
+
+            # The roll-up must agree with the raw history it replaces.
+            expected = Loan.objects.filter(issued_at__date__range=(start, end)).count()
+            total = report_service.circulation(start, end, None)[0]['issues']
+            self.stdout.write('Issues {} .. {}: roll-up {}, loans {}'.format(start, end, total, expected))
+            transaction.set_rollback(True)
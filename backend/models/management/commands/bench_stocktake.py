@@ -0,0 +1,91 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from models.models import Stocktake, StocktakeDiscrepancy
+from services import stocktake_service
+
+SEED_SQL = """
+INSERT INTO models_new_book
+    (title, author, isbn, barcode, book_type, publisher, publication_year,
+     edition, price, quantity, available_quantity, condition, location,
+     description, created_at, updated_at)
+SELECT 'Stock ' || g, 'Author', (9771000000000 + g)::text, 'STK' || g, 'novel',
+       'Press', 2000, '', 10, 1, 1, 'good', 'STK-' || lpad((g %% %(shelves)s)::text, 4, '0'), '', now(), now()
+FROM generate_series(1, %(books)s) AS g
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed --books catalog books over --shelves shelves, stream scans for '
+        'all but 2% (with 2% of books on the wrong shelf, 5% repeat scans '
+        'and --unknown foreign barcodes) into a stocktake, then time '
+        'reconciliation and check its counts. Runs in a transaction that is '
+        'rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=200000)
+        parser.add_argument('--shelves', type=int, default=2000)
+        parser.add_argument('--unknown', type=int, default=1000)
+        parser.add_argument('--batch', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        books, shelves = options['books'], options['shelves']
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(SEED_SQL, {'books': books, 'shelves': shelves})
+                cursor.execute('ANALYZE models_new_book')
+            session = Stocktake.objects.create(name='bench', location_prefix='STK-')
+
+            rng = random.Random(1)
+            scans = []
+            for number in range(1, books + 1):
+                if number % 50 == 0:
+                    continue  # missing
+                shelf = number % shelves
+                if number % 50 == 1:
+                    shelf = (shelf + 1) % shelves  # misplaced
+                scans.append(('STK-{:04d}'.format(shelf), 'STK{}'.format(number)))
+            scans += [('STK-{:04d}'.format(rng.randrange(shelves)), 'FOREIGN{}'.format(n))
+                      for n in range(options['unknown'])]
+            scans += rng.sample(scans, len(scans) // 20)
+            rng.shuffle(scans)
+
+            started = time.perf_counter()
+            stored = 0
+            for start in range(0, len(scans), options['batch']):
+                by_shelf = {}
+                for location, barcode in scans[start:start + options['batch']]:
+                    by_shelf.setdefault(location, []).append(barcode)
+                stored += stocktake_service.ingest(session, list(by_shelf.items()))['stored']
+            ingest = time.perf_counter() - started
+            self.stdout.write('Ingested {} scans in batches of {}: {:.2f} s ({:.0f} scans/s), {} rows stored'.format(
+                len(scans), options['batch'], ingest, len(scans) / ingest, stored,
+            ))
+
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE models_stocktakescan')
+            started = time.perf_counter()
+            summary = stocktake_service.reconcile(session)
+            elapsed = time.perf_counter() - started
+            totals = summary['totals']
+            self.stdout.write('Reconciled {} expected against {} scanned in {:.2f} s: {}'.format(
+                totals['expected'], totals['scanned'], elapsed,
+                ', '.join('{} {}'.format(totals[key], key) for key in ('found', 'missing', 'misplaced', 'unexpected')),
+            ))
+            self.stdout.write('{} locations in the summary'.format(len(summary['locations'])))
+
+            expected = {
+                'missing': books // 50,
+                'misplaced': len(range(1, books + 1, 50)),
+                'unexpected': options['unknown'],
+            }
+            actual = {kind: StocktakeDiscrepancy.objects.filter(session=session, kind=kind).count() for kind in expected}
+            transaction.set_rollback(True)
+        if actual != expected:
+            raise CommandError('Expected {}, got {}'.format(expected, actual))
+        self.stdout.write(self.style.SUCCESS('Discrepancy counts match: {}'.format(actual)))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from services.circulation_service import expire_holds
+
+
+class Command(BaseCommand):
+    help = (
+        'Expire holds whose pickup window has passed and hand each copy to '
+        'the next hold in the queue, or back to the shelf. Safe to run from '
+        'several workers at once; run it from cron.'
+    )
+
+    def handle(self, *args, **options):
+        expired = expire_holds()
+        self.stdout.write(self.style.SUCCESS('Expired {} holds'.format(expired)))
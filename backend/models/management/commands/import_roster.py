@@ -0,0 +1,61 @@
+import csv
+import sys
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from models_new.models import School
+from services.roster_import import FORMATS, RosterImporter, read_roster
+
+
+class Command(BaseCommand):
+    help = (
+        'Upsert a student roster from a CSV or XLSX file with a header row, '
+        'merged on student_id. Rows are validated as a batch and written '
+        'with bulk upserts; bad rows are reported and skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX roster with a header row')
+        parser.add_argument('--format', choices=FORMATS, help='Default: guessed from the file extension')
+        parser.add_argument('--school', metavar='CODE', help='School for rows without a school column')
+        parser.add_argument('--chunk-size', type=int)
+        parser.add_argument('--rejects', help='Write rejected rows (line, field, message) to this CSV file')
+
+    def handle(self, *args, **options):
+        school = None
+        if options['school']:
+            school = School.objects.filter(code=options['school']).first()
+            if school is None:
+                raise CommandError('No school with code {!r}.'.format(options['school']))
+
+        def on_progress(stats):
+            self.stdout.write('{read} rows read, {inserted} inserted, {updated} updated, '
+                              '{rejected} rejected - {rate:.0f} rows/s'.format(rate=importer.rows_per_second(), **stats))
+            sys.stdout.flush()
+
+        importer = RosterImporter(school=school, chunk_size=options['chunk_size'], on_progress=on_progress)
+        try:
+            stats = importer.run(read_roster(options['path'], options['format']))
+        except (OSError, ValueError, csv.Error, zipfile.BadZipFile) as error:
+            raise CommandError('Unreadable roster {}: {}'.format(options['path'], error))
+
+        errors = sorted(importer.errors, key=lambda error: error['line'])
+        messages = [(error['line'], field, message)
+                    for error in errors for field, field_messages in error['errors'].items()
+                    for message in field_messages]
+        if options['rejects']:
+            try:
+                with open(options['rejects'], 'w', newline='') as handle:
+                    csv.writer(handle).writerows(messages)
+            except OSError as error:
+                raise CommandError('Cannot write {}: {}'.format(options['rejects'], error.strerror))
+        else:
+            for line, field, message in messages[:20]:
+                self.stderr.write('Row {}: {}: {}'.format(line, field, message))
+        self.stdout.write(self.style.SUCCESS(
+            'Imported {} rows ({} new, {} updated, {} rejected) at {:.0f} rows/s'.format(
+                stats['inserted'] + stats['updated'], stats['inserted'], stats['updated'],
+                stats['rejected'], importer.rows_per_second(),
+            )
+        ))
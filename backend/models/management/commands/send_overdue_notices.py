@@ -0,0 +1,76 @@
+import os
+import sys
+from datetime import datetime, time as dt_time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from services.notice_service import DELIVERY_BACKENDS, NoticeState, OverdueNoticeJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Send one overdue-books notice per parent email, covering all of '
+        'their children. Loans are read in keyset chunks and each chunk is '
+        'handed to the delivery backend in one call. Progress is '
+        'checkpointed, so re-running the command the same day resumes, and '
+        'once the day is done it sends nothing more unless --restart is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Date (YYYY-MM-DD) loans must be due before. Default: now')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Students per chunk')
+        parser.add_argument('--backend', help='{} or a dotted email backend path. Default: NOTICE_EMAIL_BACKEND'.format(
+            ', '.join(sorted(DELIVERY_BACKENDS))))
+        parser.add_argument('--file-path', help='Output directory for --backend file')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore saved progress for this day and send every notice again')
+
+    def handle(self, *args, **options):
+        if options['as_of']:
+            try:
+                day = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--as-of must look like 2025-01-31.')
+            as_of = timezone.make_aware(datetime.combine(day, dt_time.min))
+        else:
+            as_of = timezone.now()
+
+        backend_options = {}
+        if options['file_path']:
+            backend_options['file_path'] = options['file_path']
+
+        state = NoticeState(
+            os.path.join(settings.NOTICE_STATE_DIR, 'overdue-notices-{}.state'.format(as_of.date().isoformat())),
+            as_of,
+        )
+        if options['restart']:
+            state.clear()
+        elif state.load():
+            if state.completed:
+                self.stdout.write(self.style.WARNING(
+                    'Notices for {} were already sent ({notices} notices). Use --restart to send them again.'.format(
+                        state.day, **state.stats)))
+                return
+            self.stdout.write('Resuming after {} ({notices} notices already sent)'.format(
+                state.position[0], **state.stats))
+
+        def on_progress(stats):
+            self.stdout.write('{chunks} chunks, {students} students, {loans} loans, {notices} notices '
+                              '- {rate:.0f} notices/s'.format(rate=stats['notices'] / (stats['seconds'] or 1), **stats))
+            sys.stdout.flush()
+
+        job = OverdueNoticeJob(
+            as_of,
+            chunk_size=options['chunk_size'],
+            backend=options['backend'],
+            state=state,
+            on_progress=on_progress,
+            **backend_options
+        )
+        stats = job.run()
+        self.stdout.write(self.style.SUCCESS(
+            'Sent {notices} notices for {loans} overdue loans of {students} students '
+            'in {seconds:.1f}s ({rate:.0f} notices/s)'.format(rate=stats['notices'] / (stats['seconds'] or 1), **stats)
+        ))
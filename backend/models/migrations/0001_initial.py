@@ -0,0 +1,79 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:58
+
+import django.core.validators
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Student",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("first_name", models.CharField(max_length=100)),
+                ("last_name", models.CharField(max_length=100)),
+                ("student_id", models.CharField(max_length=20, unique=True)),
+                ("date_of_birth", models.DateField()),
+                (
+                    "gender",
+                    models.CharField(
+                        choices=[("M", "Male"), ("F", "Female"), ("O", "Other")],
+                        max_length=1,
+                    ),
+                ),
+                (
+                    "grade",
+                    models.IntegerField(
+                        validators=[
+                            django.core.validators.MinValueValidator(1),
+                            django.core.validators.MaxValueValidator(12),
+                        ]
+                    ),
+                ),
+                ("section", models.CharField(max_length=1)),
+                ("admission_date", models.DateField(default=django.utils.timezone.now)),
+                ("parent_name", models.CharField(max_length=200)),
+                ("parent_phone", models.CharField(max_length=15)),
+                ("parent_email", models.EmailField(blank=True, max_length=254)),
+                ("address", models.TextField()),
+                (
+                    "profile_picture",
+                    models.ImageField(
+                        blank=True, null=True, upload_to="student_profiles/"
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["grade", "section", "first_name", "last_name"],
+                "indexes": [
+                    models.Index(
+                        fields=["student_id"], name="models_stud_student_030037_idx"
+                    ),
+                    models.Index(
+                        fields=["grade", "section"], name="models_stud_grade_23db50_idx"
+                    ),
+                    models.Index(
+                        fields=["grade", "section", "first_name", "last_name", "id"],
+                        name="models_stud_grade_cdcf5d_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:06
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="student",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["first_name"],
+                name="student_first_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="student",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["last_name"],
+                name="student_last_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="student",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["parent_name"],
+                name="student_parent_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "0002_trigram_indexes"),
+        ("models_new", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Loan",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("issued_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("due_at", models.DateTimeField()),
+                ("returned_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="loans",
+                        to="models_new.book",
+                    ),
+                ),
+                (
+                    "issued_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="loans",
+                        to="models.student",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="loans",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-issued_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("returned_at__isnull", True)),
+                        fields=["student", "due_at", "id"],
+                        name="loan_open_student",
+                    ),
+                    models.Index(
+                        condition=models.Q(("returned_at__isnull", True)),
+                        fields=["user", "due_at", "id"],
+                        name="loan_open_user",
+                    ),
+                    models.Index(
+                        condition=models.Q(("returned_at__isnull", True)),
+                        fields=["book", "due_at", "id"],
+                        name="loan_open_book",
+                    ),
+                    models.Index(
+                        condition=models.Q(("returned_at__isnull", True)),
+                        fields=["due_at", "id"],
+                        name="loan_open_due",
+                    ),
+                    models.Index(fields=["-issued_at", "-id"], name="loan_issued"),
+                ],
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(
+                            ("student__isnull", False),
+                            ("user__isnull", False),
+                            _connector="XOR",
+                        ),
+                        name="loan_one_borrower",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "0003_loan"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="student",
+            index=models.Index(
+                fields=["parent_email", "id"], name="models_stud_parent__300213_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,168 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "0005_hold"),
+        ("models_new", "0002_code_sequences"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Stocktake",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=200)),
+                ("location_prefix", models.CharField(blank=True, max_length=100)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("open", "Open"), ("closed", "Closed")],
+                        default="open",
+                        max_length=10,
+                    ),
+                ),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("closed_at", models.DateTimeField(blank=True, null=True)),
+                ("scans_received", models.PositiveBigIntegerField(default=0)),
+                ("reconciled_at", models.DateTimeField(blank=True, null=True)),
+                ("summary", models.JSONField(blank=True, editable=False, null=True)),
+                (
+                    "started_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-started_at", "-id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="StocktakeDiscrepancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("missing", "Missing"),
+                            ("misplaced", "Misplaced"),
+                            ("unexpected", "Unexpected"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("barcode", models.CharField(max_length=50)),
+                ("location", models.CharField(max_length=100)),
+                ("expected_location", models.CharField(blank=True, max_length=100)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="models_new.book",
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="discrepancies",
+                        to="models.stocktake",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["location", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["session", "location", "id"],
+                        name="stocktake_disc_location",
+                    ),
+                    models.Index(
+                        fields=["session", "kind", "location", "id"],
+                        name="stocktake_disc_kind",
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="StocktakeScan",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("location", models.CharField(max_length=100)),
+                ("barcode", models.CharField(blank=True, max_length=50)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="models_new.book",
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scans",
+                        to="models.stocktake",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("book__isnull", False)),
+                        fields=("session", "book", "location"),
+                        name="stocktakescan_book",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("book__isnull", True)),
+                        fields=("session", "barcode", "location"),
+                        name="stocktakescan_unknown",
+                    ),
+                ],
+            },
+        ),
+    ]
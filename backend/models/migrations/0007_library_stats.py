@@ -0,0 +1,148 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:45
+
+from django.db import migrations, models
+
+# Counter column -> aggregate over the rows of each source table. The same
+# definitions are recounted by services.stats_service.reconcile.
+COUNTERS = {
+    "books_book": {
+        "titles": "count(*)",
+        "copies": "sum(quantity)",
+        "available": "sum(available)",
+    },
+    "models_student": {"students": "count(*) FILTER (WHERE is_active)"},
+    "users_user": {
+        "staff": "count(*) FILTER (WHERE is_active AND user_type IN ('admin', 'staff'))"
+    },
+    "models_loan": {"open_loans": "count(*) FILTER (WHERE returned_at IS NULL)"},
+}
+
+# Statement-level triggers with transition tables: a bulk write of N rows
+# costs one aggregate over the changed rows and at most one UPDATE of the
+# counter row, and statements that change no counter (a title edit, a
+# renewal) do not touch it at all.
+FUNCTION = """
+CREATE FUNCTION models_librarystats_%(table)s() RETURNS trigger AS $$
+DECLARE
+    %(declare)s
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT %(added)s INTO %(names)s FROM new_rows;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT %(removed)s INTO %(names)s FROM old_rows;
+    END IF;
+    IF %(changed)s THEN
+        UPDATE models_librarystats SET %(apply)s WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGER = """
+CREATE TRIGGER models_librarystats_%(table)s_%(event)s
+    AFTER %(operation)s ON %(table)s REFERENCING %(transition)s
+    FOR EACH STATEMENT EXECUTE FUNCTION models_librarystats_%(table)s();
+"""
+
+TRANSITIONS = {
+    "insert": "NEW TABLE AS new_rows",
+    "update": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "delete": "OLD TABLE AS old_rows",
+}
+
+
+def create_sql():
+    statements = []
+    for table, counters in COUNTERS.items():
+        statements.append(
+            FUNCTION
+            % {
+                "table": table,
+                "declare": "\n    ".join(
+                    "d_%s bigint := 0;" % name for name in counters
+                ),
+                "names": ", ".join("d_%s" % name for name in counters),
+                "added": ", ".join(
+                    "coalesce(%s, 0)" % expression for expression in counters.values()
+                ),
+                "removed": ", ".join(
+                    "d_%s - coalesce(%s, 0)" % item for item in counters.items()
+                ),
+                "changed": " OR ".join("d_%s <> 0" % name for name in counters),
+                "apply": ", ".join(
+                    "%s = %s + d_%s" % (name, name, name) for name in counters
+                ),
+            }
+        )
+        for event, transition in TRANSITIONS.items():
+            statements.append(
+                TRIGGER
+                % {
+                    "table": table,
+                    "event": event,
+                    "operation": event.upper(),
+                    "transition": transition,
+                }
+            )
+    recount = ", ".join(
+        "(SELECT coalesce(%s, 0) FROM %s)" % (expression, table)
+        for table, counters in COUNTERS.items()
+        for expression in counters.values()
+    )
+    names = ", ".join(name for counters in COUNTERS.values() for name in counters)
+    statements.append(
+        "INSERT INTO models_librarystats (id, %s, reconciled_at) SELECT 1, %s, now();"
+        % (names, recount)
+    )
+    return "".join(statements)
+
+
+def drop_sql():
+    statements = []
+    for table in COUNTERS:
+        for event in TRANSITIONS:
+            statements.append(
+                "DROP TRIGGER IF EXISTS models_librarystats_%s_%s ON %s;\n"
+                % (table, event, table)
+            )
+        statements.append("DROP FUNCTION IF EXISTS models_librarystats_%s();\n" % table)
+    return "".join(statements)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "0006_stocktake"),
+        ("books", "0005_updated_at_index"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LibraryStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("titles", models.BigIntegerField(default=0)),
+                ("copies", models.BigIntegerField(default=0)),
+                ("available", models.BigIntegerField(default=0)),
+                ("students", models.BigIntegerField(default=0)),
+                ("staff", models.BigIntegerField(default=0)),
+                ("open_loans", models.BigIntegerField(default=0)),
+                ("reconciled_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name_plural": "Library stats",
+            },
+        ),
+        migrations.RunSQL(create_sql(), drop_sql()),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "0007_library_stats"),
+        ("models_new", "0002_code_sequences"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CirculationRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "grain",
+                    models.CharField(
+                        choices=[("day", "Day"), ("week", "Week"), ("month", "Month")],
+                        max_length=5,
+                    ),
+                ),
+                ("starts_on", models.DateField()),
+                ("book_type", models.CharField(max_length=20)),
+                ("grade", models.SmallIntegerField(blank=True, null=True)),
+                ("issues", models.IntegerField(default=0)),
+                ("returns", models.IntegerField(default=0)),
+                ("late_returns", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["grain", "starts_on", "school", "book_type", "grade"],
+            },
+        ),
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("position", models.DateTimeField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="student",
+            name="school",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="students",
+                to="models_new.school",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="loan",
+            index=models.Index(
+                condition=models.Q(("returned_at__isnull", True), _negated=True),
+                fields=["returned_at"],
+                name="loan_returned",
+            ),
+        ),
+        migrations.AddField(
+            model_name="circulationrollup",
+            name="school",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="models_new.school",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="circulationrollup",
+            constraint=models.UniqueConstraint(
+                fields=("grain", "starts_on", "school", "book_type", "grade"),
+                name="circulationrollup_key",
+                nulls_distinct=False,
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "0008_circulation_rollup"),
+        ("models_new", "0002_code_sequences"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="student",
+            name="models_stud_grade_cdcf5d_idx",
+        ),
+        migrations.AddIndex(
+            model_name="student",
+            index=models.Index(
+                fields=["grade", "section", "first_name", "last_name", "id"],
+                include=("student_id", "school", "is_active"),
+                name="student_roster",
+            ),
+        ),
+    ]
@@ -0,0 +1,170 @@
+# Generated by Django 5.1.15 on 2026-10-18 18:10
+
+from django.db import migrations
+
+# Rows of models_librarystats the triggers spread their updates over; the
+# totals are the sum of all of them. Must match models.LibraryStats.SHARDS.
+SHARDS = 8
+
+# Counter column -> aggregate over the rows of each source table. The book
+# counters come from the catalogue that loans, holds and stocktakes move
+# copies in (models_new_book), so ``available`` changes on every loan. The
+# same definitions are recounted by services.stats_service.reconcile.
+COUNTERS = {
+    "models_new_book": {
+        "titles": "count(*)",
+        "copies": "sum(quantity)",
+        "available": "sum(available_quantity)",
+    },
+    "models_student": {"students": "count(*) FILTER (WHERE is_active)"},
+    "users_user": {
+        "staff": "count(*) FILTER (WHERE is_active AND user_type IN ('admin', 'staff'))"
+    },
+    "models_loan": {"open_loans": "count(*) FILTER (WHERE returned_at IS NULL)"},
+}
+
+# What 0007 installed, restored when this migration is reversed.
+OLD_COUNTERS = dict(COUNTERS)
+OLD_COUNTERS["books_book"] = {
+    "titles": "count(*)",
+    "copies": "sum(quantity)",
+    "available": "sum(available)",
+}
+del OLD_COUNTERS["models_new_book"]
+
+# Each backend adds to its own shard row, picked by its process id, so
+# concurrent writers to any of the source tables take different row locks
+# instead of all queueing on one, while a single transaction that touches
+# several tables (a loan moves a copy and inserts a loan row) still locks
+# only one row.
+FUNCTION = """
+CREATE FUNCTION models_librarystats_%(table)s() RETURNS trigger AS $$
+DECLARE
+    %(declare)s
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT %(added)s INTO %(names)s FROM new_rows;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT %(removed)s INTO %(names)s FROM old_rows;
+    END IF;
+    IF %(changed)s THEN
+        UPDATE models_librarystats SET %(apply)s WHERE id = %(row)s;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGER = """
+CREATE TRIGGER models_librarystats_%(table)s_%(event)s
+    AFTER %(operation)s ON %(table)s REFERENCING %(transition)s
+    FOR EACH STATEMENT EXECUTE FUNCTION models_librarystats_%(table)s();
+"""
+
+TRANSITIONS = {
+    "insert": "NEW TABLE AS new_rows",
+    "update": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "delete": "OLD TABLE AS old_rows",
+}
+
+
+def names(counters):
+    return [name for columns in counters.values() for name in columns]
+
+
+def triggers_sql(counters, row):
+    statements = []
+    for table, columns in counters.items():
+        statements.append(
+            FUNCTION
+            % {
+                "table": table,
+                "declare": "\n    ".join("d_%s bigint := 0;" % name for name in columns),
+                "names": ", ".join("d_%s" % name for name in columns),
+                "added": ", ".join(
+                    "coalesce(%s, 0)" % expression for expression in columns.values()
+                ),
+                "removed": ", ".join(
+                    "d_%s - coalesce(%s, 0)" % item for item in columns.items()
+                ),
+                "changed": " OR ".join("d_%s <> 0" % name for name in columns),
+                "apply": ", ".join(
+                    "%s = %s + d_%s" % (name, name, name) for name in columns
+                ),
+                "row": row,
+            }
+        )
+        for event, transition in TRANSITIONS.items():
+            statements.append(
+                TRIGGER
+                % {
+                    "table": table,
+                    "event": event,
+                    "operation": event.upper(),
+                    "transition": transition,
+                }
+            )
+    return "".join(statements)
+
+
+def drop_sql(counters):
+    statements = []
+    for table in counters:
+        for event in TRANSITIONS:
+            statements.append(
+                "DROP TRIGGER IF EXISTS models_librarystats_%s_%s ON %s;\n"
+                % (table, event, table)
+            )
+        statements.append("DROP FUNCTION IF EXISTS models_librarystats_%s();\n" % table)
+    return "".join(statements)
+
+
+def recount_sql(counters):
+    """Store a full recount in row 1 and zero every other row."""
+    recount = ", ".join(
+        "%s = (SELECT coalesce(%s, 0) FROM %s)" % (name, expression, table)
+        for table, columns in counters.items()
+        for name, expression in columns.items()
+    )
+    zero = ", ".join("%s = 0" % name for name in names(counters))
+    return (
+        "UPDATE models_librarystats SET %s, reconciled_at = now() WHERE id = 1;\n"
+        "UPDATE models_librarystats SET %s WHERE id <> 1;\n" % (recount, zero)
+    )
+
+
+def forward_sql():
+    return "".join(
+        [
+            drop_sql(OLD_COUNTERS),
+            "INSERT INTO models_librarystats (id, %s) SELECT id, %s FROM "
+            "generate_series(1, %d) AS id ON CONFLICT (id) DO NOTHING;\n"
+            % (", ".join(names(COUNTERS)), ", ".join("0" for _ in names(COUNTERS)), SHARDS),
+            recount_sql(COUNTERS),
+            triggers_sql(COUNTERS, "1 + pg_backend_pid() %% %d" % SHARDS),
+        ]
+    )
+
+
+def reverse_sql():
+    return "".join(
+        [
+            drop_sql(COUNTERS),
+            "DELETE FROM models_librarystats WHERE id <> 1;\n",
+            recount_sql(OLD_COUNTERS),
+            triggers_sql(OLD_COUNTERS, "1"),
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "0009_student_roster_index"),
+        ("models_new", "0002_code_sequences"),
+    ]
+
+    operations = [
+        migrations.RunSQL(forward_sql(), reverse_sql()),
+    ]
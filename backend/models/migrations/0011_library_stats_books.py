@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:39
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+shards = import_module("models.migrations.0010_library_stats_shards")
+
+# books.Book rows, the records /api/books/ and the Books tab manage; the
+# other book counters follow the circulation catalogue (models_new_book).
+COUNTERS = {"books_book": {"books": "count(*)"}}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models", "0010_library_stats_shards"),
+        ("books", "0005_updated_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="librarystats",
+            name="books",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            "UPDATE models_librarystats SET books = (SELECT count(*) FROM books_book) WHERE id = 1;\n"
+            + shards.triggers_sql(COUNTERS, "1 + pg_backend_pid() %% %d" % shards.SHARDS),
+            shards.drop_sql(COUNTERS),
+        ),
+    ]
@@ -0,0 +1,11 @@
+from .hold import Hold
+from .loan import Loan
+from .rollup import CirculationRollup, RollupWatermark
+from .stats import LibraryStats
+from .stocktake import Stocktake, StocktakeDiscrepancy, StocktakeScan
+from .student import Student
+
+__all__ = [
+    'CirculationRollup', 'Hold', 'LibraryStats', 'Loan', 'RollupWatermark', 'Stocktake',
+    'StocktakeDiscrepancy', 'StocktakeScan', 'Student',
+]
\ No newline at end of file
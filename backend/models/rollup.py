@@ -0,0 +1,55 @@
+from django.db import models
+
+
+class CirculationRollup(models.Model):
+    """
+    Circulation totals for one day, week (starting Monday) or month, school,
+    book type and grade, built from models.Loan by
+    services.report_service.roll_up. ``school`` and ``grade`` are null for
+    loans to staff (and students without a school). Reports read only
+    these rows, never the loan history, and take whole weeks and months
+    from the coarser grains so a long range adds up few rows.
+    """
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+    GRAIN_CHOICES = (
+        (DAY, 'Day'),
+        (WEEK, 'Week'),
+        (MONTH, 'Month'),
+    )
+
+    grain = models.CharField(max_length=5, choices=GRAIN_CHOICES)
+    starts_on = models.DateField()
+    school = models.ForeignKey('models_new.School', on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='+', db_index=False)
+    book_type = models.CharField(max_length=20)
+    grade = models.SmallIntegerField(null=True, blank=True)
+    issues = models.IntegerField(default=0)
+    returns = models.IntegerField(default=0)
+    late_returns = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['grain', 'starts_on', 'school', 'book_type', 'grade']
+        constraints = [
+            # Also the target of the roll-up's ON CONFLICT and the index
+            # behind date-range reports.
+            models.UniqueConstraint(fields=['grain', 'starts_on', 'school', 'book_type', 'grade'],
+                                    nulls_distinct=False, name='circulationrollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.grain} {self.starts_on} {self.school_id} {self.book_type} {self.grade}: {self.issues} out"
+
+
+class RollupWatermark(models.Model):
+    """
+    How far a roll-up has read its source: every event timestamped before
+    ``position`` is included. One row per roll-up, locked while it runs.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    position = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position:%Y-%m-%d %H:%M:%S}"
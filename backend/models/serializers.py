@@ -1,4 +1,11 @@
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
+from .hold import Hold
+from .loan import Loan
+from .stats import LibraryStats
+from .stocktake import Stocktake, StocktakeDiscrepancy
 from .student import Student
 
 class StudentSerializer(serializers.ModelSerializer):
@@ -8,11 +15,13 @@ class StudentSerializer(serializers.ModelSerializer):
         model = Student
         fields = [
             'id', 'first_name', 'last_name', 'student_id', 'date_of_birth',
-            'gender', 'grade', 'section', 'admission_date', 'parent_name',
+            'gender', 'grade', 'section', 'school', 'admission_date', 'parent_name',
             'parent_phone', 'parent_email', 'address', 'profile_picture',
             'is_active', 'created_at', 'updated_at', 'age'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        # Columns behind computed fields, for ?fields= deferral (utils.fields).
+        field_dependencies = {'age': ['date_of_birth']}
 
     def validate_student_id(self, value):
         """
@@ -32,4 +41,133 @@ class StudentSerializer(serializers.ModelSerializer):
         if 'section' in data and not data['section'].isalpha():
             raise serializers.ValidationError("Section must be a letter")
         
-        return data 
\ No newline at end of file
+        return data 
+
+
+class StudentRosterSerializer(StudentSerializer):
+    """
+    Row validation for roster imports. ``student_id`` uniqueness and the
+    school codes are checked for the whole batch at once
+    (services.roster_import) instead of with queries per row.
+    """
+    class Meta(StudentSerializer.Meta):
+        fields = [
+            'student_id', 'first_name', 'last_name', 'date_of_birth', 'gender', 'grade', 'section',
+            'admission_date', 'parent_name', 'parent_phone', 'parent_email', 'address', 'is_active'
+        ]
+        extra_kwargs = {'student_id': {'validators': []}}
+
+    def validate_student_id(self, value):
+        return value
+
+
+class LoanSerializer(serializers.ModelSerializer):
+    is_overdue = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Loan
+        fields = [
+            'id', 'book', 'student', 'user', 'issued_by', 'issued_at', 'due_at',
+            'returned_at', 'is_overdue'
+        ]
+        read_only_fields = ['id', 'issued_by', 'issued_at', 'returned_at']
+        extra_kwargs = {'due_at': {'required': False}}
+        field_dependencies = {'is_overdue': ['returned_at', 'due_at']}
+
+    def validate(self, data):
+        """
+        Check that the loan goes to exactly one borrower
+        """
+        if bool(data.get('student')) == bool(data.get('user')):
+            raise serializers.ValidationError("A loan needs exactly one borrower: a student or a user.")
+        return data
+
+
+class HoldSerializer(serializers.ModelSerializer):
+    DUPLICATE = "This borrower already has an active hold on this book."
+
+    class Meta:
+        model = Hold
+        fields = [
+            'id', 'book', 'student', 'user', 'status', 'placed_at', 'ready_at',
+            'expires_at'
+        ]
+        read_only_fields = ['id', 'status', 'placed_at', 'ready_at', 'expires_at']
+        # validate() checks the active-hold constraints with its own message.
+        validators = []
+
+    def validate(self, data):
+        """
+        Check that the hold has exactly one borrower who isn't already queued
+        """
+        if bool(data.get('student')) == bool(data.get('user')):
+            raise serializers.ValidationError("A hold needs exactly one borrower: a student or a user.")
+        active = Hold.objects.filter(book=data['book'], student=data.get('student'), user=data.get('user'),
+                                     status__in=Hold.ACTIVE)
+        if active.exists():
+            raise serializers.ValidationError(self.DUPLICATE)
+        return data
+
+
+class StocktakeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Stocktake
+        fields = [
+            'id', 'name', 'location_prefix', 'status', 'started_by', 'started_at',
+            'closed_at', 'scans_received', 'reconciled_at'
+        ]
+        read_only_fields = ['id', 'status', 'started_by', 'started_at', 'closed_at', 'scans_received',
+                            'reconciled_at']
+
+
+class StocktakeDiscrepancySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StocktakeDiscrepancy
+        fields = ['id', 'kind', 'book', 'barcode', 'location', 'expected_location']
+        read_only_fields = fields
+
+
+class StocktakeScanBatchSerializer(serializers.Serializer):
+    """One shelf's worth of scans: ``{"location": ..., "barcodes": [...]}``."""
+    location = serializers.CharField(max_length=100)
+    barcodes = serializers.ListField(child=serializers.CharField(max_length=50), allow_empty=False)
+
+
+class LibraryStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LibraryStats
+        fields = ['books', 'titles', 'copies', 'available', 'students', 'staff', 'open_loans', 'reconciled_at']
+        read_only_fields = fields
+
+
+class CirculationReportQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of /api/reports/circulation/. Dates are inclusive and
+    default to the last 30 days; ``by`` is a comma-separated list of
+    school, book_type and grade.
+    """
+    DIMENSIONS = ('school', 'book_type', 'grade')
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    period = serializers.ChoiceField(choices=['day', 'week', 'month', 'quarter', 'year', 'total'], default='day')
+    by = serializers.CharField(required=False, allow_blank=True, default='')
+    school = serializers.IntegerField(required=False)
+    book_type = serializers.CharField(required=False, max_length=20)
+    grade = serializers.IntegerField(required=False, min_value=1, max_value=12)
+
+    def validate_by(self, value):
+        dimensions = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = sorted(set(dimensions) - set(self.DIMENSIONS))
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown dimension(s): {', '.join(unknown)}. Use {', '.join(self.DIMENSIONS)}."
+            )
+        return list(dict.fromkeys(dimensions))
+
+    def validate(self, data):
+        data.setdefault('end', timezone.localdate())
+        data.setdefault('start', data['end'] - timedelta(days=29))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("start must not be after end")
+        return data
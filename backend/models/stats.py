@@ -0,0 +1,35 @@
+from django.db import models
+
+
+class LibraryStats(models.Model):
+    """
+    Running totals for the dashboard, kept as ``SHARDS`` rows (ids 1 to
+    SHARDS) whose sum is the total. Database triggers on the source tables
+    (see migrations 0007 and 0010) apply every INSERT, UPDATE and DELETE in
+    the same transaction to the row picked by the writing backend, so
+    concurrent writers do not queue on one row lock and bulk SQL writes are
+    counted too; services.stats_service.reconcile recounts from scratch
+    into row 1 to repair anything the triggers cannot see (TRUNCATE,
+    manual trigger disabling).
+
+    ``titles``, ``copies`` and ``available`` count the circulation
+    catalogue (models_new.Book, the copies loans move); ``books`` counts
+    the books.Book records that /api/books/ and the Books tab manage.
+    """
+    ROW = 1
+    SHARDS = 8
+
+    books = models.BigIntegerField(default=0)
+    titles = models.BigIntegerField(default=0)
+    copies = models.BigIntegerField(default=0)
+    available = models.BigIntegerField(default=0)
+    students = models.BigIntegerField(default=0)
+    staff = models.BigIntegerField(default=0)
+    open_loans = models.BigIntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Library stats'
+
+    def __str__(self):
+        return f"{self.titles} titles, {self.students} students, {self.open_loans} open loans"
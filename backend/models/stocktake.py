@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+
+
+class Stocktake(models.Model):
+    """
+    One inventory count of the shelves whose location starts with
+    ``location_prefix`` (blank: the whole library). Scans stream in while
+    the session is open; ``summary`` holds the per-location result of the
+    last reconciliation.
+    """
+    OPEN = 'open'
+    CLOSED = 'closed'
+    STATUS_CHOICES = (
+        (OPEN, 'Open'),
+        (CLOSED, 'Closed'),
+    )
+
+    name = models.CharField(max_length=200)
+    location_prefix = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=OPEN)
+    started_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='+')
+    started_at = models.DateTimeField(auto_now_add=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    scans_received = models.PositiveBigIntegerField(default=0)
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    summary = models.JSONField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['-started_at', '-id']
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class StocktakeScan(models.Model):
+    """
+    A catalog book seen on a shelf during a stocktake. Repeat scans of the
+    same item on the same shelf collapse into one row, and the barcode is
+    only kept for codes that match no book, so a full-library count stays
+    a few bytes per item.
+    """
+    session = models.ForeignKey(Stocktake, on_delete=models.CASCADE, related_name='scans')
+    location = models.CharField(max_length=100)
+    book = models.ForeignKey('models_new.Book', on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='+', db_index=False)
+    barcode = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'book', 'location'], condition=Q(book__isnull=False),
+                                    name='stocktakescan_book'),
+            models.UniqueConstraint(fields=['session', 'barcode', 'location'], condition=Q(book__isnull=True),
+                                    name='stocktakescan_unknown'),
+        ]
+
+    def __str__(self):
+        return f"{self.book_id or self.barcode} @ {self.location}"
+
+
+class StocktakeDiscrepancy(models.Model):
+    """
+    One line of a reconciliation: a book expected on ``expected_location``
+    but never scanned (missing), a book scanned on ``location`` that belongs
+    elsewhere (misplaced), or a barcode no catalog book carries (unexpected).
+    """
+    MISSING = 'missing'
+    MISPLACED = 'misplaced'
+    UNEXPECTED = 'unexpected'
+    KIND_CHOICES = (
+        (MISSING, 'Missing'),
+        (MISPLACED, 'Misplaced'),
+        (UNEXPECTED, 'Unexpected'),
+    )
+
+    session = models.ForeignKey(Stocktake, on_delete=models.CASCADE, related_name='discrepancies')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    book = models.ForeignKey('models_new.Book', on_delete=models.CASCADE, null=True, blank=True,
+                             related_name='+', db_index=False)
+    barcode = models.CharField(max_length=50)
+    location = models.CharField(max_length=100)
+    expected_location = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        ordering = ['location', 'id']
+        indexes = [
+            # Report pages: one session, optionally one kind, shelf by shelf.
+            models.Index(fields=['session', 'location', 'id'], name='stocktake_disc_location'),
+            models.Index(fields=['session', 'kind', 'location', 'id'], name='stocktake_disc_kind'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.barcode} @ {self.location}"
@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from django.contrib.postgres.indexes import GinIndex
 
 class Student(models.Model):
     GENDER_CHOICES = (
@@ -16,6 +17,8 @@ class Student(models.Model):
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES)
     grade = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(12)])
     section = models.CharField(max_length=1)
+    school = models.ForeignKey('models_new.School', on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='students')
     admission_date = models.DateField(default=timezone.now)
     parent_name = models.CharField(max_length=200)
     parent_phone = models.CharField(max_length=15)
@@ -31,6 +34,17 @@ class Student(models.Model):
         indexes = [
             models.Index(fields=['student_id']),
             models.Index(fields=['grade', 'section']),
+            # Keyset pagination seeks on the full ordering; see utils.pagination.
+            # The included columns let class rosters (StudentViewSet.roster)
+            # come from the index alone, without touching the address text.
+            models.Index(fields=['grade', 'section', 'first_name', 'last_name', 'id'],
+                         include=['student_id', 'school', 'is_active'], name='student_roster'),
+            # Overdue notices walk students family by family; see services.notice_service.
+            models.Index(fields=['parent_email', 'id']),
+            # Trigram indexes behind ?search_mode=fuzzy; see utils.search.
+            GinIndex(fields=['first_name'], opclasses=['gin_trgm_ops'], name='student_first_name_trgm'),
+            GinIndex(fields=['last_name'], opclasses=['gin_trgm_ops'], name='student_last_name_trgm'),
+            GinIndex(fields=['parent_name'], opclasses=['gin_trgm_ops'], name='student_parent_name_trgm'),
         ]
 
     def __str__(self):
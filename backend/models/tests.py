@@ -0,0 +1,359 @@
+import io
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from books.models import Book
+from models_new.models import Book as CatalogBook, School
+from services import circulation_service, stats_service, stocktake_service
+from services.notice_service import NoticeState, OverdueNoticeJob
+from services.roster_import import RosterImporter
+from users.models import User
+from .hold import Hold
+from .loan import Loan
+from .serializers import HoldSerializer
+from .stats import LibraryStats
+from .stocktake import Stocktake, StocktakeDiscrepancy
+from .student import Student
+from .views import StudentViewSet
+
+
+def make_book(barcode='T0001', **fields):
+    defaults = {
+        'title': 'Test Book', 'author': 'Author', 'isbn': barcode.rjust(13, '0'), 'barcode': barcode,
+        'book_type': 'novel', 'publisher': 'Press', 'publication_year': 2000, 'price': 10,
+        'quantity': 2, 'available_quantity': 2, 'condition': 'good', 'location': 'A1',
+    }
+    defaults.update(fields)
+    return CatalogBook.objects.create(**defaults)
+
+
+def make_student(student_id='S0001', **fields):
+    defaults = {
+        'first_name': 'First', 'last_name': 'Last', 'student_id': student_id,
+        'date_of_birth': date(2012, 1, 1), 'gender': 'M', 'grade': 5, 'section': 'A',
+        'parent_name': 'Parent', 'parent_phone': '555', 'parent_email': 'parent@example.com',
+        'address': 'Street 1',
+    }
+    defaults.update(fields)
+    return Student.objects.create(**defaults)
+
+
+class OverdueNoticeTests(TestCase):
+    def test_notice_text_is_not_html_escaped(self):
+        book = make_book(title='Salt & Pepper')
+        student = make_student(first_name='Seán', last_name="O'Brien", parent_name="Mary O'Brien")
+        Loan.objects.create(book=book, student=student, due_at=timezone.now() - timedelta(days=3))
+
+        stats = OverdueNoticeJob(timezone.now(), backend='locmem').run()
+
+        self.assertEqual(stats['notices'], 1)
+        body = mail.outbox[0].body
+        self.assertIn("Dear Mary O'Brien,", body)
+        self.assertIn("Seán O'Brien:", body)
+        self.assertIn('- Salt & Pepper (T0001)', body)
+        self.assertNotIn('&amp;', body)
+        self.assertNotIn('&#x27;', body)
+
+
+class SendOverdueNoticesTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(self.settings(NOTICE_STATE_DIR=directory.name))
+        self.now = timezone.now()
+        self.state_path = os.path.join(directory.name, f'overdue-notices-{self.now.date().isoformat()}.state')
+
+    def send(self, *args):
+        output = io.StringIO()
+        call_command('send_overdue_notices', '--backend', 'locmem', *args, stdout=output)
+        return output.getvalue()
+
+    def test_finished_day_is_not_sent_again(self):
+        Loan.objects.create(book=make_book(), student=make_student(), due_at=self.now - timedelta(days=3))
+        self.send()
+        self.assertEqual(len(mail.outbox), 1)
+
+        self.assertIn('already sent', self.send())
+        self.assertEqual(len(mail.outbox), 1)
+
+        self.send('--restart')
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_resume_keeps_the_saved_cutoff(self):
+        first = make_student('S0001', parent_email='a@example.com')
+        Loan.objects.create(book=make_book('T0001'), student=first, due_at=self.now - timedelta(days=3))
+        # Came due after the interrupted run started.
+        Loan.objects.create(book=make_book('T0002'), student=make_student('S0002', parent_email='b@example.com'),
+                            due_at=self.now - timedelta(minutes=5))
+        state = NoticeState(self.state_path, self.now)
+        state.as_of = self.now - timedelta(hours=1)
+        state.save(('a@example.com', first.pk), {'chunks': 1, 'students': 1, 'loans': 1, 'notices': 1, 'seconds': 1.0})
+
+        self.assertIn('Resuming after a@example.com', self.send())
+        self.assertEqual(mail.outbox, [])
+
+
+class StudentFastListTests(TestCase):
+    """The values_list() fast path must render exactly what StudentSerializer does."""
+    queries = ['', 'grade=3&section=B', 'pagination=cursor&page_size=4', 'is_active=false',
+               'ordering=-admission_date', 'fields=first_name,age,profile_picture', 'search=first1']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='secret')
+        for number in range(24):
+            make_student(
+                f'S{number:04d}', first_name=f'First{number}', grade=1 + number % 4, section='AB'[number % 2],
+                date_of_birth=date(2010, 1, 1) + timedelta(days=97 * number),
+                admission_date=date(2020, 9, 1) + timedelta(days=number), is_active=bool(number % 5),
+                profile_picture=f'student_profiles/{number}.jpg' if number % 3 == 0 else '',
+            )
+
+    def get(self, query, fast):
+        request = APIRequestFactory().get(f'/api/students/?{query}')
+        force_authenticate(request, self.user)
+        return StudentViewSet.as_view({'get': 'list'}, fast_list=fast)(request).render()
+
+    def test_fast_list_matches_serializer(self):
+        for query in self.queries:
+            with self.subTest(query=query):
+                slow, fast = self.get(query, False), self.get(query, True)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.content, slow.content)
+
+    def test_file_urls_are_absolute(self):
+        response = self.get('fields=profile_picture&pagination=cursor&page_size=24', True)
+        pictures = [row['profile_picture'] for row in response.data['results'] if row['profile_picture']]
+        self.assertTrue(pictures)
+        self.assertTrue(all(url.startswith('http://testserver/') for url in pictures))
+
+
+class LibraryStatsTests(TestCase):
+    def setUp(self):
+        stats_service.reconcile()
+        self.before = stats_service.current()
+
+    def change(self, name):
+        return getattr(stats_service.current(), name) - getattr(self.before, name)
+
+    def test_loans_move_the_available_total(self):
+        book = make_book(quantity=3, available_quantity=3)
+        loan = circulation_service.issue_loan(book, student=make_student())
+        self.assertEqual((self.change('copies'), self.change('available'), self.change('open_loans')), (3, 2, 1))
+
+        circulation_service.return_loan(loan.pk)
+        self.assertEqual((self.change('available'), self.change('open_loans')), (3, 0))
+        self.assertEqual(stats_service.reconcile(), {})
+
+    def test_books_counts_the_api_book_records(self):
+        Book.objects.create(title='Listed', author='Author', isbn='9780000000001', publication_year=2000,
+                            publisher='Press')
+        self.assertEqual((self.change('books'), self.change('titles')), (1, 0))
+        self.assertEqual(stats_service.reconcile(), {})
+
+    def test_totals_are_summed_over_the_shard_rows(self):
+        self.assertEqual(LibraryStats.objects.count(), LibraryStats.SHARDS)
+        LibraryStats.objects.filter(pk=LibraryStats.SHARDS).update(students=5)
+        self.assertEqual(self.change('students'), 5)
+
+        self.assertEqual(stats_service.reconcile(), {'students': -5})
+        self.assertEqual(self.change('students'), 0)
+        self.assertFalse(LibraryStats.objects.exclude(pk=LibraryStats.ROW).exclude(students=0).exists())
+
+
+class RosterImportTests(TestCase):
+    def row(self, student_id, **fields):
+        row = {
+            'student_id': student_id, 'first_name': 'New', 'last_name': 'Name', 'date_of_birth': '2012-01-01',
+            'gender': 'F', 'grade': '6', 'section': 'b', 'parent_name': 'Parent', 'parent_phone': '555',
+            'address': 'Street 2',
+        }
+        row.update(fields)
+        return row
+
+    def run_import(self, *rows):
+        importer = RosterImporter()
+        stats = importer.run(enumerate(rows, start=1))
+        return stats, importer.errors
+
+    def test_missing_keys_keep_stored_values(self):
+        make_student('S0001', parent_email='keep@example.com')
+        stats, errors = self.run_import(
+            self.row('S0002', parent_email='new@example.com'),
+            self.row('S0001', first_name='Renamed'),
+        )
+        self.assertEqual((stats['inserted'], stats['updated'], errors), (1, 1, []))
+        student = Student.objects.get(student_id='S0001')
+        self.assertEqual((student.first_name, student.parent_email), ('Renamed', 'keep@example.com'))
+        self.assertEqual(Student.objects.get(student_id='S0002').parent_email, 'new@example.com')
+
+    def test_blank_defaulted_cells_only_default_on_insert(self):
+        make_student('S0001', is_active=False)
+        stats, errors = self.run_import(self.row('S0001', is_active=''), self.row('S0002', is_active=''))
+        self.assertEqual((stats['inserted'], stats['updated'], errors), (1, 1, []))
+        self.assertFalse(Student.objects.get(student_id='S0001').is_active)
+        self.assertTrue(Student.objects.get(student_id='S0002').is_active)
+
+    def test_rejected_row_does_not_claim_its_student_id(self):
+        school = School.objects.create(
+            name='North', code='N1', address='Road 1', phone='555', email='north@example.com',
+            principal_name='Head', established_date=date(1990, 1, 1),
+        )
+        stats, errors = self.run_import(self.row('S0001', school='NOPE'), self.row('S0001', school='N1'))
+        self.assertEqual((stats['inserted'], stats['rejected']), (1, 1))
+        self.assertEqual(errors, [{'line': 1, 'errors': {'school': ["No school with code 'NOPE'."]}}])
+        self.assertEqual(Student.objects.get(student_id='S0001').school, school)
+
+        stats, errors = self.run_import(self.row('S0003'), self.row('S0003'))
+        self.assertEqual((stats['inserted'], stats['rejected']), (1, 1))
+        self.assertEqual(errors[0]['errors'], {'student_id': ['Duplicate student ID in this roster.']})
+
+
+class ImportRosterCommandTests(TestCase):
+    def test_unreadable_rosters_are_command_errors(self):
+        with tempfile.TemporaryDirectory() as directory:
+            latin1 = os.path.join(directory, 'roster.csv')
+            with open(latin1, 'wb') as handle:
+                handle.write('student_id,first_name\nS0001,Se\xe1n\n'.encode('latin-1'))
+            not_a_zip = os.path.join(directory, 'roster.xlsx')
+            with open(not_a_zip, 'w') as handle:
+                handle.write('student_id\n')
+
+            for path, reason in [(os.path.join(directory, 'missing.csv'), 'No such file or directory'),
+                                 (latin1, "can't decode"), (not_a_zip, 'not a zip file')]:
+                with self.subTest(path=path), self.assertRaisesMessage(CommandError, reason):
+                    call_command('import_roster', path, stdout=io.StringIO())
+
+
+class IssueLoanTests(TestCase):
+    def test_failed_loan_keeps_the_copy_on_the_shelf(self):
+        book = make_book(quantity=1, available_quantity=1)
+        with mock.patch('services.circulation_service.Loan.objects.create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                circulation_service.issue_loan(book, student=make_student())
+        book.refresh_from_db()
+        self.assertEqual(book.available_quantity, 1)
+
+
+class ReturnLoanTests(TestCase):
+    def test_return_closes_the_loan_when_stock_is_already_full(self):
+        book = make_book(quantity=1, available_quantity=1)
+        loan = Loan.objects.create(book=book, student=make_student(), due_at=timezone.now())
+
+        with self.assertLogs('services.circulation_service', 'WARNING'):
+            returned = circulation_service.return_loan(loan.pk)
+
+        self.assertIsNotNone(returned.returned_at)
+        book.refresh_from_db()
+        self.assertEqual(book.available_quantity, 1)
+        with self.assertRaises(circulation_service.StockError):
+            circulation_service.return_loan(loan.pk)
+
+
+class HoldTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('desk', password='secret'))
+        self.book = make_book(quantity=1, available_quantity=0)
+        self.student = make_student()
+
+    def place(self):
+        return self.client.post('/api/holds/', {'book': self.book.pk, 'student': self.student.pk}, format='json')
+
+    def test_duplicate_hold_is_a_400(self):
+        self.assertEqual(self.place().status_code, 201)
+        duplicate = self.place()
+        self.assertEqual(duplicate.status_code, 400)
+        self.assertEqual(duplicate.json(), {'non_field_errors': [HoldSerializer.DUPLICATE]})
+
+        # A concurrent duplicate gets past validate() and hits the unique constraint.
+        with mock.patch.object(HoldSerializer, 'validate', lambda serializer, data: data):
+            raced = self.place()
+        self.assertEqual(raced.status_code, 400)
+        self.assertEqual(raced.json(), duplicate.json())
+        self.assertEqual(Hold.objects.count(), 1)
+
+    def test_return_allocates_the_oldest_waiting_hold(self):
+        first = circulation_service.place_hold(self.book, student=self.student)
+        second = circulation_service.place_hold(self.book, student=make_student('S0002'))
+        loan = Loan.objects.create(book=self.book, student=make_student('S0003'), due_at=timezone.now())
+
+        circulation_service.return_loan(loan.pk)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), (Hold.READY, Hold.WAITING))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_quantity, 0)
+
+
+class HoldAllocationTests(TransactionTestCase):
+    def test_allocation_skips_a_locked_hold(self):
+        book = make_book(quantity=2, available_quantity=0)
+        first = circulation_service.place_hold(book, student=make_student('S0001'))
+        second = circulation_service.place_hold(book, student=make_student('S0002'))
+
+        # Another worker is allocating the head of the queue.
+        other = connections.create_connection('default')
+        try:
+            other.set_autocommit(False)
+            with other.cursor() as cursor:
+                cursor.execute('SELECT id FROM models_hold WHERE id = %s FOR UPDATE', [first.pk])
+            with connections['default'].cursor() as cursor:
+                cursor.execute("SET lock_timeout = '2s'")
+            self.assertEqual(circulation_service.allocate_hold(book.pk), second.pk)
+        finally:
+            with connections['default'].cursor() as cursor:
+                cursor.execute('RESET lock_timeout')
+            other.rollback()
+            other.close()
+        self.assertEqual(circulation_service.allocate_hold(book.pk), first.pk)
+
+
+class StocktakeReconcileTests(TestCase):
+    def setUp(self):
+        make_book('A1-1', location='A1')
+        make_book('A1-2', location='A1')
+        make_book('A2-1', location='A2')
+        make_book('A2-L', location='A2', available_quantity=0)
+        make_book('B1-1', location='B1')
+        self.session = Stocktake.objects.create(name='Wing A', location_prefix='A')
+        stocktake_service.ingest(self.session, [('A1', ['A1-1', 'A2-1', 'UNKNOWN', 'A1-1'])])
+
+    def test_summary_counts(self):
+        summary = stocktake_service.reconcile(self.session)
+
+        self.assertEqual(summary['locations'], [
+            {'location': 'A1', 'expected': 2, 'scanned': 3, 'found': 1, 'missing': 1, 'misplaced': 1,
+             'unexpected': 1},
+            {'location': 'A2', 'expected': 1, 'scanned': 0, 'found': 0, 'missing': 0, 'misplaced': 0,
+             'unexpected': 0},
+        ])
+        self.assertEqual(summary['totals'], {'expected': 3, 'scanned': 3, 'found': 1, 'missing': 1,
+                                             'misplaced': 1, 'unexpected': 1})
+        discrepancies = StocktakeDiscrepancy.objects.filter(session=self.session)
+        self.assertEqual(
+            sorted(discrepancies.values_list('kind', 'barcode', 'location', 'expected_location')),
+            [('misplaced', 'A2-1', 'A1', 'A2'), ('missing', 'A1-2', 'A1', 'A1'),
+             ('unexpected', 'UNKNOWN', 'A1', '')],
+        )
+
+        self.assertEqual(stocktake_service.reconcile(self.session), summary)
+        self.assertEqual(discrepancies.count(), 3)
+
+    def test_session_row_is_locked_first(self):
+        with CaptureQueriesContext(connection) as queries:
+            stocktake_service.reconcile(self.session)
+        statements = [query['sql'] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+        self.assertIn('FROM "models_stocktake"', statements[0])
+        self.assertTrue(statements[0].endswith('FOR UPDATE'))
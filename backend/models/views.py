@@ -1,22 +1,55 @@
-from rest_framework import viewsets, permissions, filters
+import csv
+import zipfile
+from itertools import islice
+
+from rest_framework import viewsets, permissions, filters, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from django.db import IntegrityError
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from models_new.models import School
+from services import circulation_service, report_service, roster_import, stats_service, stocktake_service
+from utils.export import ExportMixin, stream_grouped_json
+from utils.fast_list import FastListMixin
+from utils.fields import SparseFieldsetMixin
+from utils.pagination import CursorPaginationMixin
+from utils.search import FuzzySearchMixin, TrigramSearchFilter
+from .filters import StudentFilter, parse_classes
+from .hold import Hold
+from .loan import OPEN, Loan
+from .stocktake import Stocktake
 from .student import Student
-from .serializers import StudentSerializer
+from .serializers import (
+    CirculationReportQuerySerializer, HoldSerializer, LibraryStatsSerializer, LoanSerializer,
+    StocktakeDiscrepancySerializer, StocktakeScanBatchSerializer, StocktakeSerializer, StudentSerializer,
+)
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(FuzzySearchMixin, ExportMixin, SparseFieldsetMixin, FastListMixin, CursorPaginationMixin,
+                     viewsets.ModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['grade', 'section', 'gender', 'is_active']
+    # Search runs last so its relevance ordering wins over the default ordering.
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, TrigramSearchFilter]
+    filterset_class = StudentFilter
     search_fields = ['first_name', 'last_name', 'student_id', 'parent_name']
+    fuzzy_search_fields = ['first_name', 'last_name', 'parent_name']
     ordering_fields = ['grade', 'section', 'first_name', 'last_name', 'admission_date']
     ordering = ['grade', 'section', 'first_name']
+    cursor_ordering = ['grade', 'section', 'first_name', 'last_name', 'id']
+    # Serializer fields minus the computed age.
+    export_fields = [field for field in StudentSerializer.Meta.fields if field != 'age']
+    fast_list = True
 
     def get_permissions(self):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'export', 'roster']:
             permission_classes = [permissions.IsAuthenticated]
         else:
             # Only staff and admin can create, update, or delete students
@@ -26,26 +59,308 @@ class StudentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save()
 
-    def get_queryset(self):
-        """
-        Optionally restricts the returned students by filtering against
-        query parameters in the URL.
-        """
-        queryset = Student.objects.all()
-        
-        # Filter by active status
-        is_active = self.request.query_params.get('is_active', None)
-        if is_active is not None:
-            queryset = queryset.filter(is_active=is_active.lower() == 'true')
-        
-        # Filter by grade
-        grade = self.request.query_params.get('grade', None)
-        if grade is not None:
-            queryset = queryset.filter(grade=grade)
-        
-        # Filter by section
-        section = self.request.query_params.get('section', None)
-        if section is not None:
-            queryset = queryset.filter(section=section.upper())
-        
-        return queryset 
\ No newline at end of file
+    @action(detail=False, methods=['get'], pagination_class=None)
+    def roster(self, request):
+        """
+        Every student in the classes matching the list filters (usually
+        ``?grade=5&section=A`` or ``?sections=5A,5B``), grouped by grade and
+        section and sorted by name, streamed as one JSON document. Only
+        active students unless ``?is_active=`` says otherwise. Rows come
+        from an index-only scan of the student_roster index.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        if 'is_active' not in request.query_params:
+            queryset = queryset.filter(is_active=True)
+        queryset = queryset.order_by('grade', 'section', 'first_name', 'last_name', 'id').values_list(
+            'grade', 'section', 'id', 'student_id', 'first_name', 'last_name',
+        )
+        # One ordered index range per class: an OR over several classes
+        # would be planned as a bitmap heap scan plus a sort instead.
+        classes = parse_classes(request.query_params['sections']) if request.query_params.get('sections') else []
+        chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+        def rows():
+            if not classes:
+                yield from queryset.iterator(chunk_size=chunk_size)
+            for grade, section in classes:
+                yield from queryset.filter(grade=grade, section=section).iterator(chunk_size=chunk_size)
+
+        return StreamingHttpResponse(
+            stream_grouped_json(
+                rows(), ['grade', 'section'], ['id', 'student_id', 'first_name', 'last_name'], 'sections', 'students',
+            ),
+            content_type='application/json',
+        )
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_roster(self, request):
+        """
+        Upsert students on ``student_id``: a CSV or XLSX roster uploaded as
+        ``file`` (header row; ``school`` column holds school codes) or a
+        JSON list of students with the same fields. ``?school=<id>`` assigns
+        rows without a school code. Valid rows are written even when others
+        fail; failures come back in ``errors`` with their line number.
+        """
+        school = None
+        if request.query_params.get('school'):
+            school = School.objects.filter(pk=request.query_params['school']).first()
+            if school is None:
+                raise ValidationError({'school': ['School not found.']})
+        upload = request.FILES.get('file')
+        if upload is not None:
+            rows = roster_import.read_roster(upload)
+        elif isinstance(request.data, list):
+            rows = enumerate(request.data, start=1)
+        else:
+            raise ValidationError('Upload a CSV or XLSX roster as "file", or send a list of students.')
+
+        max_rows = getattr(settings, 'ROSTER_IMPORT_MAX_ROWS', 20000)
+        try:
+            rows = list(islice(rows, max_rows + 1))
+        except (ValueError, csv.Error, zipfile.BadZipFile) as error:
+            raise ValidationError({'file': [f'Unreadable roster: {error}']})
+        if len(rows) > max_rows:
+            raise ValidationError(f'At most {max_rows} rows per request.')
+
+        importer = roster_import.RosterImporter(school=school)
+        stats = importer.run(rows)
+        return Response(dict(stats, errors=sorted(importer.errors, key=lambda error: error['line'])))
+
+
+class LoanViewSet(SparseFieldsetMixin, FastListMixin, CursorPaginationMixin, viewsets.ModelViewSet):
+    """
+    Circulation. POST issues a loan (and takes a copy off the shelf),
+    ``POST /loans/{id}/return/`` closes it. ``open`` and ``overdue`` only
+    touch the partial open-loan indexes on Loan.
+    """
+    queryset = Loan.objects.all()
+    serializer_class = LoanSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['book', 'student', 'user']
+    http_method_names = ['get', 'post', 'head', 'options']
+    cursor_ordering = ['-issued_at', '-id']
+    fast_list = True
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            loan = circulation_service.issue_loan(issued_by=request.user, **serializer.validated_data)
+        except circulation_service.StockError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(loan).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='return')
+    def return_loan(self, request, pk=None):
+        try:
+            loan = circulation_service.return_loan(int(pk))
+        except (Loan.DoesNotExist, ValueError):
+            raise NotFound()
+        except circulation_service.StockError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(loan).data)
+
+    @action(detail=False, methods=['get'])
+    def open(self, request):
+        """
+        Loans still out for one ``?student=``, ``?user=`` or ``?book=``,
+        soonest due first.
+        """
+        borrower = {name: request.query_params[name] for name in self.filterset_fields
+                    if request.query_params.get(name)}
+        if len(borrower) != 1:
+            raise ValidationError('Pass exactly one of student, user or book.')
+        self.cursor_ordering = ['due_at', 'id']
+        queryset = self.filter_queryset(self.get_queryset()).filter(OPEN).order_by('due_at', 'id')
+        return self._loan_page(queryset)
+
+    @action(detail=False, methods=['get'])
+    def overdue(self, request):
+        """Open loans past their due date, most overdue first."""
+        self.cursor_ordering = ['due_at', 'id']
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .filter(OPEN, due_at__lt=timezone.now())
+            .order_by('due_at', 'id')
+        )
+        return self._loan_page(queryset)
+
+    def _loan_page(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+
+class HoldViewSet(SparseFieldsetMixin, FastListMixin, CursorPaginationMixin, viewsets.ModelViewSet):
+    """
+    Reservations. POST queues a borrower for a title; DELETE cancels (a copy
+    already set aside moves on to the next in line). Returned copies are
+    allocated in services.circulation_service.return_loan.
+    """
+    queryset = Hold.objects.all()
+    serializer_class = HoldSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['book', 'student', 'user', 'status']
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    cursor_ordering = ['placed_at', 'id']
+    fast_list = True
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            hold = circulation_service.place_hold(**serializer.validated_data)
+        except IntegrityError:
+            # A concurrent request queued the same borrower after validate().
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [HoldSerializer.DUPLICATE]})
+        return Response(self.get_serializer(hold).data, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, *args, **kwargs):
+        try:
+            hold = circulation_service.cancel_hold(int(kwargs['pk']))
+        except (Hold.DoesNotExist, ValueError):
+            raise NotFound()
+        except circulation_service.StockError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(hold).data)
+
+    @action(detail=False, methods=['get'])
+    def queue(self, request):
+        """Waiting holds for ``?book=`` in the order copies will be handed out."""
+        if not request.query_params.get('book'):
+            raise ValidationError('Pass book.')
+        queryset = self.filter_queryset(self.get_queryset()).filter(status=Hold.WAITING)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+
+class StocktakeViewSet(CursorPaginationMixin, viewsets.ModelViewSet):
+    """
+    Inventory counts. Create a session (optionally limited to a
+    ``location_prefix``), POST scans to ``/stocktakes/{id}/scans/`` as the
+    shelves are walked, then POST ``reconcile`` (or ``close``) to compare
+    them with the catalog. The work is done in SQL by
+    services.stocktake_service.
+    """
+    queryset = Stocktake.objects.defer('summary')
+    serializer_class = StocktakeSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['status']
+    http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+    cursor_ordering = ['-started_at', '-id']
+
+    def perform_create(self, serializer):
+        serializer.save(started_by=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def scans(self, request, pk=None):
+        """
+        Ingest scanned barcodes: one ``{"location", "barcodes"}`` shelf or a
+        list of them, up to STOCKTAKE_MAX_SCANS barcodes per request.
+        """
+        session = self.get_object()
+        rows = request.data if isinstance(request.data, list) else [request.data]
+        serializer = StocktakeScanBatchSerializer(data=rows, many=True)
+        serializer.is_valid(raise_exception=True)
+        batches = [(batch['location'], batch['barcodes']) for batch in serializer.validated_data]
+        max_scans = getattr(settings, 'STOCKTAKE_MAX_SCANS', 20000)
+        if sum(len(barcodes) for _, barcodes in batches) > max_scans:
+            raise ValidationError(f'At most {max_scans} barcodes per request.')
+        try:
+            counts = stocktake_service.ingest(session, batches)
+        except stocktake_service.StocktakeClosed as error:
+            return Response({'detail': str(error)}, status=status.HTTP_409_CONFLICT)
+        return Response(counts, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get', 'post'])
+    def reconcile(self, request, pk=None):
+        """
+        POST compares the scans so far with the catalog and stores the
+        result; GET returns the last stored per-location summary.
+        """
+        session = self.get_object()
+        if request.method == 'POST':
+            summary = stocktake_service.reconcile(session)
+        else:
+            summary = Stocktake.objects.values_list('summary', flat=True).get(pk=session.pk)
+            if summary is None:
+                raise NotFound('This stocktake has not been reconciled yet.')
+        return Response(summary)
+
+    @action(detail=True, methods=['post'])
+    def close(self, request, pk=None):
+        """Stop accepting scans and run the final reconciliation."""
+        session = self.get_object()
+        try:
+            stocktake_service.close(session)
+        except stocktake_service.StocktakeClosed as error:
+            return Response({'detail': str(error)}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(session).data)
+
+    @action(detail=True, methods=['get'])
+    def discrepancies(self, request, pk=None):
+        """
+        Items from the last reconciliation, shelf by shelf. Filter with
+        ``?kind=missing|misplaced|unexpected`` and ``?location=``.
+        """
+        session = self.get_object()
+        queryset = session.discrepancies.order_by('location', 'id')
+        for name in ('kind', 'location'):
+            if request.query_params.get(name):
+                queryset = queryset.filter(**{name: request.query_params[name]})
+        self.cursor_ordering = ['location', 'id']
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(StocktakeDiscrepancySerializer(page, many=True).data)
+        return Response(StocktakeDiscrepancySerializer(queryset, many=True).data)
+
+
+class StatsViewSet(viewsets.ViewSet):
+    """
+    Dashboard totals from the trigger-maintained counter rows, so the cost
+    is one aggregate over LibraryStats.SHARDS rows however large the tables
+    grow. ``books`` counts the /api/books/ records; ``titles``, ``copies``
+    and ``available`` count the circulation catalogue (models_new.Book),
+    whose copies loans and holds move. Then students, staff and open loans.
+    """
+
+    def list(self, request):
+        return Response(LibraryStatsSerializer(stats_service.current()).data)
+
+
+class ReportViewSet(viewsets.ViewSet):
+    """
+    Circulation reports. Every figure comes from the CirculationRollup
+    table (refreshed by ``manage.py rollup_circulation``), so a report's
+    cost depends on the days and groups asked for, not on the size of the
+    loan history; ``rolled_up_to`` says how current it is.
+    """
+
+    def list(self, request):
+        return Response({'circulation': request.build_absolute_uri('circulation/')})
+
+    @action(detail=False, methods=['get'])
+    def circulation(self, request):
+        """
+        Issues, returns and late returns between ``?start=`` and ``?end=``
+        per ``?period=day|week|month|quarter|year|total``, split
+        ``?by=school,book_type,grade`` and filtered by ``?school=``,
+        ``?book_type=`` and ``?grade=``.
+        """
+        query = CirculationReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        filters = {name: params[name] for name in ('school', 'book_type', 'grade') if name in params}
+        period = None if params['period'] == 'total' else params['period']
+        rows = report_service.circulation(params['start'], params['end'], period, params['by'], **filters)
+        return Response({
+            'start': params['start'],
+            'end': params['end'],
+            'period': params['period'],
+            'by': params['by'],
+            'rolled_up_to': report_service.rolled_up_to(),
+            'rows': rows,
+        })
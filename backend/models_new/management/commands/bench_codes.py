@@ -0,0 +1,97 @@
+import math
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from services.code_service import CodeAllocator, book_barcodes
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the sequential barcode allocator: single codes, one bulk '
+        'request, and --workers threads each acting as a separate worker '
+        'process with its own block cache. Every code handed out is checked '
+        'for uniqueness and a valid check digit. Numbers used by the run are '
+        'simply skipped by later allocations.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--single', type=int, default=5000)
+        parser.add_argument('--bulk', type=int, default=10000)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--per-worker', type=int, default=2000)
+        parser.add_argument('--catalog-size', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        codes = []
+
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(options['single']):
+                started = time.perf_counter()
+                codes.append(book_barcodes.allocate())
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write('{} single codes: {} queries, p50 {:.4f} ms, p99 {:.3f} ms, max {:.3f} ms'.format(
+            options['single'], len(queries), statistics.median(timings),
+            timings[int(len(timings) * 0.99)], timings[-1],
+        ))
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            codes += book_barcodes.allocate_many(options['bulk'])
+            elapsed = time.perf_counter() - started
+        self.stdout.write('allocate_many({}): {} query, {:.1f} ms'.format(
+            options['bulk'], len(queries), elapsed * 1000,
+        ))
+
+        results = [[] for _ in range(options['workers'])]
+
+        def worker(index):
+            # A fresh allocator has its own block cache, like another process.
+            allocator = CodeAllocator(
+                book_barcodes.sequence, book_barcodes.prefix, book_barcodes.width, book_barcodes.block_size,
+            )
+            try:
+                for count in range(options['per_worker']):
+                    if count % 10:
+                        results[index].append(allocator.allocate())
+                    else:
+                        results[index] += allocator.allocate_many(7)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(options['workers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        parallel = sum(len(result) for result in results)
+        self.stdout.write('{} workers: {} codes in {:.2f} s ({:.0f}/s)'.format(
+            options['workers'], parallel, elapsed, parallel / elapsed,
+        ))
+        for result in results:
+            codes += result
+
+        duplicates = len(codes) - len(set(codes))
+        invalid = sum(not book_barcodes.is_valid(code) for code in codes)
+        self.stdout.write('{} codes, {} duplicates, {} bad check digits, e.g. {} .. {}'.format(
+            len(codes), duplicates, invalid, min(codes), max(codes),
+        ))
+
+        # Birthday bound for the old str(uuid4())[:8] barcodes: 32 random bits.
+        size = options['catalog_size']
+        collision = 1 - math.exp(-size * (size - 1) / (2 * 16 ** 8))
+        self.stdout.write('Old 8-hex-digit barcodes: {:.0%} chance of a collision among {} books'.format(
+            collision, size,
+        ))
+        if duplicates or invalid:
+            self.stderr.write(self.style.ERROR('FAILED'))
+        else:
+            self.stdout.write(self.style.SUCCESS('OK'))
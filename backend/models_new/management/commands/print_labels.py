@@ -0,0 +1,70 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from models_new.models import Book
+from services.label_service import LabelPrinter, catalog_labels
+
+
+class Command(BaseCommand):
+    help = (
+        'Lay out Code128 spine labels (title, barcode, location) for '
+        'models_new.Book records onto printable A4 sheets of 3 x 8 labels, '
+        'as one PDF or a directory of PNG sheets. Sheets are rendered in a '
+        'process pool and label images are cached per barcode.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='PDF file, or a directory for PNG sheets')
+        parser.add_argument('--format', choices=['pdf', 'png'], help='Default: pdf if output ends in .pdf, else png')
+        parser.add_argument('--barcode', action='append', default=[], help='Only these barcodes (repeatable)')
+        parser.add_argument('--location', help='Only books whose location starts with this')
+        parser.add_argument('--book-type', choices=[choice for choice, _ in Book.BOOK_TYPE_CHOICES])
+        parser.add_argument('--since', help='Only books added on or after this date (YYYY-MM-DD), e.g. a new shipment')
+        parser.add_argument('--per-copy', action='store_true', help='One label per copy (quantity) instead of per record')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: LABEL_RENDER_WORKERS or CPU count)')
+
+    def handle(self, *args, **options):
+        queryset = Book.objects.all()
+        if options['barcode']:
+            queryset = queryset.filter(barcode__in=options['barcode'])
+        if options['location']:
+            queryset = queryset.filter(location__startswith=options['location'])
+        if options['book_type']:
+            queryset = queryset.filter(book_type=options['book_type'])
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date like 2025-09-01.')
+            queryset = queryset.filter(created_at__date__gte=since)
+
+        labels = list(catalog_labels(queryset, per_copy=options['per_copy']))
+        if not labels:
+            raise CommandError('No books match.')
+
+        output = options['output']
+        output_format = options['format'] or ('pdf' if output.lower().endswith('.pdf') else 'png')
+        started = time.perf_counter()
+
+        def on_progress(sheets, done):
+            if sheets % 25 == 0 or done == len(labels):
+                self.stdout.write('{} sheets, {} of {} labels - {:.0f} labels/s'.format(
+                    sheets, done, len(labels), done / (time.perf_counter() - started),
+                ))
+                sys.stdout.flush()
+
+        printer = LabelPrinter(workers=options['workers'], on_progress=on_progress)
+        if output_format == 'pdf':
+            with open(output, 'wb') as handle:
+                sheets = printer.write_pdf(labels, handle)
+        else:
+            sheets = len(printer.write_png(labels, output))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            'Wrote {} labels on {} sheets to {} in {:.1f} s ({:.0f} labels/s, {} workers)'.format(
+                len(labels), sheets, output, elapsed, len(labels) / elapsed, printer.workers,
+            )
+        ))
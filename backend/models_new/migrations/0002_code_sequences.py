@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:31
+
+from django.db import migrations
+
+# Each nextval() reserves a block of INCREMENT BY numbers for one worker
+# (services.code_service); keep the block sizes there in step with these.
+CREATE_SEQUENCES = """
+CREATE SEQUENCE models_new_book_barcode_seq START WITH 1 INCREMENT BY 100;
+CREATE SEQUENCE models_new_school_code_seq START WITH 1 INCREMENT BY 10;
+"""
+
+DROP_SEQUENCES = """
+DROP SEQUENCE IF EXISTS models_new_book_barcode_seq;
+DROP SEQUENCE IF EXISTS models_new_school_code_seq;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("models_new", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SEQUENCES, DROP_SEQUENCES),
+    ]
@@ -51,9 +51,9 @@ class Book(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.barcode:
-            # Generate barcode if not provided
-            from uuid import uuid4
-            self.barcode = str(uuid4())[:8].upper()
+            # Allocate the next sequential barcode if not provided
+            from services.code_service import book_barcodes
+            self.barcode = book_barcodes.allocate()
         super().save(*args, **kwargs)
 
     @property
@@ -85,7 +85,7 @@ class School(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.code:
-            # Generate school code if not provided
-            from uuid import uuid4
-            self.code = str(uuid4())[:6].upper()
+            # Allocate the next sequential school code if not provided
+            from services.code_service import school_codes
+            self.code = school_codes.allocate()
         super().save(*args, **kwargs) 
\ No newline at end of file
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+import barcode
+from django.conf import settings
+
+from models_new.models import Book as CatalogBook
+
+# Bump when the drawing code changes so cached images are re-rendered.
+RENDER_VERSION = 1
+
+MODULE_WIDTH = 2    # pixels per narrow bar
+BAR_HEIGHT = 80
+QUIET_ZONE = 10     # blank modules either side, as Code128 requires
+TEXT_HEIGHT = 20
+
+
+def code128_modules(data):
+    """The Code128 bar pattern for ``data`` as a string of '1' (bar) and '0' (space)."""
+    return barcode.get('code128', data).build()[0]
+
+
+def bars(modules):
+    """Yield ``(start, width)`` in modules for each run of bars."""
+    start = None
+    for position, module in enumerate(modules + '0'):
+        if module == '1' and start is None:
+            start = position
+        elif module == '0' and start is not None:
+            yield start, position - start
+            start = None
+
+
+def render_svg(data):
+    """
+    Code128 as SVG, built directly from the bar pattern: one ``<path>`` for
+    all bars plus the human-readable text. No PIL and no DOM.
+    """
+    modules = code128_modules(data)
+    width = (len(modules) + 2 * QUIET_ZONE) * MODULE_WIDTH
+    height = BAR_HEIGHT + TEXT_HEIGHT
+    path = ''.join(
+        'M{} 0h{}v{}h-{}z'.format((QUIET_ZONE + start) * MODULE_WIDTH, run * MODULE_WIDTH, BAR_HEIGHT, run * MODULE_WIDTH)
+        for start, run in bars(modules)
+    )
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" viewBox="0 0 {w} {h}" '
+        'shape-rendering="crispEdges">'
+        '<rect width="{w}" height="{h}" fill="#fff"/>'
+        '<path d="{path}" fill="#000"/>'
+        '<text x="{x}" y="{y}" font-family="monospace" font-size="14" text-anchor="middle">{text}</text>'
+        '</svg>'
+    ).format(w=width, h=height, path=path, x=width // 2, y=height - 5, text=escape(data)).encode()
+
+
+def render_png(data):
+    """Code128 as a greyscale PNG drawn with PIL straight from the bar pattern."""
+    from PIL import Image, ImageDraw
+
+    modules = code128_modules(data)
+    width = (len(modules) + 2 * QUIET_ZONE) * MODULE_WIDTH
+    image = Image.new('L', (width, BAR_HEIGHT + TEXT_HEIGHT), 255)
+    draw = ImageDraw.Draw(image)
+    for start, run in bars(modules):
+        left = (QUIET_ZONE + start) * MODULE_WIDTH
+        draw.rectangle([left, 0, left + run * MODULE_WIDTH - 1, BAR_HEIGHT - 1], fill=0)
+    draw.text((width // 2, BAR_HEIGHT + TEXT_HEIGHT // 2), data, fill=0, font=font(), anchor='mm')
+    buffer = BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+fonts = {}
+
+
+def font(size=14):
+    if size not in fonts:
+        from PIL import ImageFont
+        fonts[size] = ImageFont.load_default(size=size)
+    return fonts[size]
+
+
+RENDERERS = {'png': render_png, 'svg': render_svg}
+
+
+class ImageCache:
+    """
+    Rendered images on disk under ``BARCODE_CACHE_DIR``, named by the
+    SHA-256 of what was drawn (renderer version, format, data). The same
+    code is rendered once per format no matter how many books, processes
+    or label sheets ask for it, and the key doubles as the HTTP ETag.
+    """
+
+    def __init__(self, directory=None):
+        self._directory = directory
+
+    @property
+    def directory(self):
+        return self._directory or getattr(settings, 'BARCODE_CACHE_DIR', os.path.join(settings.BASE_DIR, 'var', 'barcodes'))
+
+    def key(self, data, image_format, *extra):
+        parts = [str(RENDER_VERSION), image_format, data] + [str(part) for part in extra]
+        return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+    def path(self, key, image_format):
+        return os.path.join(self.directory, key[:2], '{}.{}'.format(key, image_format))
+
+    def get(self, key, image_format, render):
+        """Return the cached image for ``key``, calling ``render()`` to create it if missing."""
+        path = self.path(key, image_format)
+        try:
+            with open(path, 'rb') as handle:
+                return handle.read()
+        except FileNotFoundError:
+            pass
+        content = render()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a private file and rename, so concurrent renders of the
+        # same key never expose a half-written image.
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(handle, 'wb') as output:
+            output.write(content)
+        os.replace(temporary, path)
+        return content
+
+    def render(self, data, image_format):
+        """Return ``(key, image bytes)`` for a barcode image, rendering only on a cache miss."""
+        key = self.key(data, image_format)
+        return key, self.get(key, image_format, lambda: RENDERERS[image_format](data))
+
+
+image_cache = ImageCache()
+
+
+def barcode_value(book):
+    """
+    What to encode for a books.Book: the barcode of its catalog copy record
+    (models_new.Book, matched on ISBN) so scans resolve to the shelf copy,
+    falling back to the ISBN for titles not in the catalog.
+    """
+    catalog_barcode = CatalogBook.objects.filter(isbn=book.isbn).values_list('barcode', flat=True).first()
+    return catalog_barcode or book.isbn
@@ -1 +1,176 @@
-
\ No newline at end of file
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from books.cache import book_cache
+from books.models import Book
+from books.serializers import BookBulkSerializer
+
+
+def _batch_size():
+    return getattr(settings, 'BULK_BATCH_SIZE', 500)
+
+
+def _row_error(index, errors):
+    return {'index': index, 'errors': errors}
+
+
+def _conflict_errors(indexes):
+    """Row errors for a write that clashed with other requests twice running."""
+    return [
+        _row_error(index, {'non_field_errors': ['Conflicted with a concurrent change; retry this row.']})
+        for index in sorted(indexes)
+    ]
+
+
+def _book_id(value):
+    """``value`` as a book id (an int or a string of digits), or None."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _claim_isbns(rows, errors):
+    """
+    Reject rows whose ISBN repeats inside the batch or is already taken.
+    ``rows`` is a list of ``(index, isbn, book_id)``; ``book_id`` is None
+    for new books. Ownership is resolved with one ``isbn IN (...)`` query.
+    Returns the indexes that passed.
+    """
+    owners = dict(
+        Book.objects.filter(isbn__in={isbn for _, isbn, _ in rows}).values_list('isbn', 'id')
+    )
+    seen = set()
+    accepted = set()
+    for index, isbn, book_id in rows:
+        if isbn in seen:
+            errors.append(_row_error(index, {'isbn': ['Duplicate ISBN in this batch.']}))
+        elif isbn in owners and owners[isbn] != book_id:
+            errors.append(_row_error(index, {'isbn': ['book with this isbn already exists.']}))
+        else:
+            accepted.add(index)
+        seen.add(isbn)
+    return accepted
+
+
+def bulk_create_books(rows):
+    """
+    Validate and insert many books at once. Field validation runs per row,
+    ISBN uniqueness for the whole batch in one query, and inserts go out
+    through ``bulk_create`` in batches. Invalid rows are reported, not
+    fatal. Returns ``(created_books, errors)``.
+    """
+    errors = []
+    candidates = []
+    for index, row in enumerate(rows):
+        serializer = BookBulkSerializer(data=row)
+        if serializer.is_valid():
+            candidates.append((index, serializer.validated_data))
+        else:
+            errors.append(_row_error(index, serializer.errors))
+
+    for attempt in range(2):
+        isbn_errors = []
+        accepted = _claim_isbns([(index, data['isbn'], None) for index, data in candidates], isbn_errors)
+        books = [Book(**data) for index, data in candidates if index in accepted]
+        try:
+            with transaction.atomic():
+                created = Book.objects.bulk_create(books, batch_size=_batch_size())
+            break
+        except IntegrityError:
+            # Another request took one of these ISBNs after we checked;
+            # check again so the loser is reported as a row error. If it
+            # happens twice, give up on the batch rather than answer 500.
+            if attempt:
+                created = []
+                isbn_errors += _conflict_errors(accepted)
+    if created:
+        book_cache.invalidate()
+    errors = sorted(errors + isbn_errors, key=lambda error: error['index'])
+    return created, errors
+
+
+def bulk_update_books(rows):
+    """
+    Partially update many books, each row carrying its ``id``. Books are
+    fetched with one ``id IN (...)`` query and written back with
+    ``bulk_update``. Returns ``(updated_books, errors)``.
+    """
+    errors = []
+    ids = [_book_id(row.get('id')) for row in rows if isinstance(row, dict)]
+    books = Book.objects.defer('search_vector').in_bulk([i for i in ids if i is not None])
+
+    candidates = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append(_row_error(index, {'non_field_errors': ['Expected an object.']}))
+            continue
+        book_id = _book_id(row.get('id'))
+        if book_id is None:
+            errors.append(_row_error(index, {'id': ['A valid integer is required.']}))
+            continue
+        book = books.get(book_id)
+        if book is None:
+            errors.append(_row_error(index, {'id': ['Book not found.']}))
+            continue
+        serializer = BookBulkSerializer(book, data=row, partial=True)
+        if serializer.is_valid():
+            candidates.append((index, book, serializer.validated_data))
+        else:
+            errors.append(_row_error(index, serializer.errors))
+
+    isbn_rows = [(index, data['isbn'], book.pk) for index, book, data in candidates if 'isbn' in data]
+    now = timezone.now()
+    for attempt in range(2):
+        isbn_errors = []
+        accepted = _claim_isbns(isbn_rows, isbn_errors) if isbn_rows else set()
+        rejected = {index for index, _, _ in isbn_rows} - accepted
+
+        fields = {'updated_at'}
+        updated = []
+        for index, book, data in candidates:
+            if index in rejected:
+                continue
+            for attr, value in data.items():
+                setattr(book, attr, value)
+            book.updated_at = now
+            fields.update(data)
+            updated.append(book)
+        try:
+            with transaction.atomic():
+                Book.objects.bulk_update(updated, sorted(fields), batch_size=_batch_size())
+            break
+        except IntegrityError:
+            # Another request took one of these ISBNs after we checked;
+            # check again so the loser is reported as a row error. If it
+            # happens twice, give up on the batch rather than answer 500.
+            if attempt:
+                isbn_errors += _conflict_errors(index for index, _, _ in candidates if index not in rejected)
+                updated = []
+    if updated:
+        book_cache.invalidate()
+    errors = sorted(errors + isbn_errors, key=lambda error: error['index'])
+    return updated, errors
+
+
+def bulk_delete_books(ids):
+    """Delete books by id in one statement. Returns ``(deleted_ids, errors)``."""
+    errors = []
+    wanted = {}
+    for index, value in enumerate(ids):
+        book_id = _book_id(value)
+        if book_id is None:
+            errors.append(_row_error(index, {'id': ['A valid integer is required.']}))
+        else:
+            wanted[index] = book_id
+    existing = set(Book.objects.filter(id__in=set(wanted.values())).values_list('id', flat=True))
+    errors += [
+        _row_error(index, {'id': ['Book not found.']})
+        for index, book_id in wanted.items() if book_id not in existing
+    ]
+    Book.objects.filter(id__in=existing).delete()
+    errors.sort(key=lambda error: error['index'])
+    return sorted(existing), errors
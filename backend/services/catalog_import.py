@@ -0,0 +1,324 @@
+import csv
+import io
+import json
+import os
+import re
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from books.models import Book
+from models_new.models import Book as CatalogBook
+from services.code_service import book_barcodes
+from utils import marc
+
+STAGING_TABLE = 'catalog_import_staging'
+
+
+class RowError(ValueError):
+    pass
+
+
+def _isbn13_check_digit(first12):
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def normalize_isbn(value):
+    """Strip separators, verify the check digit and return an ISBN-13."""
+    isbn = re.sub(r'[\s-]', '', value or '').upper()
+    if re.fullmatch(r'\d{9}[\dX]', isbn):
+        total = sum((10 - position) * (10 if char == 'X' else int(char)) for position, char in enumerate(isbn))
+        if total % 11:
+            raise RowError('Invalid ISBN-10 check digit.')
+        core = '978' + isbn[:9]
+        return core + _isbn13_check_digit(core)
+    if re.fullmatch(r'\d{13}', isbn):
+        if _isbn13_check_digit(isbn[:12]) != isbn[12]:
+            raise RowError('Invalid ISBN-13 check digit.')
+        return isbn
+    raise RowError('ISBN must have 10 or 13 digits.')
+
+
+class ImportTarget:
+    """
+    A table the catalog import can load into. Rows are validated against
+    the model's own field definitions (types, max_length, choices,
+    validators) and merged on ``isbn``; ``update_columns`` are the
+    descriptive fields refreshed when the ISBN already exists. Stock and
+    shelf fields are only set on insert; the available count defaults to
+    the quantity.
+    """
+
+    def __init__(self, model, columns, update_columns, available_column, defaults=None):
+        self.model = model
+        self.table = model._meta.db_table
+        self.columns = columns
+        self.update_columns = update_columns
+        self.available_column = available_column
+        self.defaults = defaults or {}
+
+    def normalize(self, row):
+        row = {key: (value or '').strip() for key, value in row.items() if key}
+        row['isbn'] = normalize_isbn(row.get('isbn'))
+        if not row.get('title'):
+            raise RowError('Title is required.')
+        if not row.get(self.available_column):
+            row[self.available_column] = row.get('quantity', '')
+        values = []
+        for column in self.columns:
+            field = self.model._meta.get_field(column)
+            value = row.get(column) or self.defaults.get(column, '')
+            if value == '' and field.has_default():
+                value = field.get_default()
+            elif value == '' and not field.empty_strings_allowed:
+                value = None
+            if column == 'title':
+                value = value[:field.max_length]
+            try:
+                value = field.to_python(value)
+                if value in (None, '') and not field.empty_strings_allowed:
+                    raise ValidationError('This field is required.')
+                if value not in (None, ''):
+                    if field.choices and value not in dict(field.flatchoices):
+                        raise ValidationError('{!r} is not a valid choice.'.format(value))
+                    field.run_validators(value)
+            except ValidationError as error:
+                raise RowError('{}: {}'.format(column, ' '.join(error.messages)))
+            values.append(value)
+        return tuple(values)
+
+    def prepare(self, cursor):
+        """
+        Hook to drop staged rows that cannot be merged; returns a
+        ``(line, reason)`` pair for each.
+        """
+        return []
+
+
+class CatalogBookTarget(ImportTarget):
+    """
+    models_new.Book also needs a unique barcode for every copy record. Rows
+    without one get a sequential code in ``prepare``, once per chunk and
+    only for ISBNs that will actually be inserted. Supplied barcodes that
+    clash, with the live table or with another ISBN in the same chunk, are
+    rejected row by row instead of failing the whole merge on the unique
+    index.
+    """
+
+    def prepare(self, cursor):
+        # Only the last occurrence of an ISBN is merged; drop the earlier
+        # ones now so their barcodes neither use up codes nor clash.
+        cursor.execute(
+            """
+            DELETE FROM {staging} AS s
+            USING {staging} AS later
+            WHERE later.isbn = s.isbn AND later.line > s.line
+            """.format(staging=STAGING_TABLE)
+        )
+        cursor.execute(
+            """
+            SELECT s.line FROM {staging} AS s
+            WHERE s.barcode = '' AND NOT EXISTS (SELECT 1 FROM {table} AS b WHERE b.isbn = s.isbn)
+            """.format(staging=STAGING_TABLE, table=self.table)
+        )
+        lines = [line for line, in cursor.fetchall()]
+        if lines:
+            cursor.execute(
+                """
+                UPDATE {staging} AS s SET barcode = v.barcode
+                FROM unnest(%s::bigint[], %s::text[]) AS v(line, barcode)
+                WHERE s.line = v.line
+                """.format(staging=STAGING_TABLE),
+                [lines, book_barcodes.allocate_many(len(lines))],
+            )
+        cursor.execute(
+            """
+            DELETE FROM {staging} AS s
+            USING {table} AS b
+            WHERE s.barcode = b.barcode AND s.isbn <> b.isbn
+            RETURNING s.line
+            """.format(staging=STAGING_TABLE, table=self.table)
+        )
+        rejected = [(line, 'Barcode already belongs to another ISBN.') for line, in cursor.fetchall()]
+        # Every remaining ISBN is distinct, so a shared barcode is a clash:
+        # the first row keeps it.
+        cursor.execute(
+            """
+            DELETE FROM {staging} AS s
+            USING (
+                SELECT DISTINCT ON (barcode) barcode, line FROM {staging}
+                WHERE barcode <> '' ORDER BY barcode, line
+            ) AS first
+            WHERE s.barcode = first.barcode AND s.line <> first.line
+            RETURNING s.line
+            """.format(staging=STAGING_TABLE)
+        )
+        rejected += [(line, 'Barcode is used by an earlier row for another ISBN.') for line, in cursor.fetchall()]
+        return sorted(rejected)
+
+
+TARGETS = {
+    'books': ImportTarget(
+        Book,
+        columns=['title', 'author', 'isbn', 'publication_year', 'publisher', 'quantity', 'available'],
+        update_columns=['title', 'author', 'publication_year', 'publisher'],
+        available_column='available',
+    ),
+    'models_new': CatalogBookTarget(
+        CatalogBook,
+        columns=[
+            'title', 'author', 'isbn', 'barcode', 'book_type', 'publisher', 'publication_year',
+            'edition', 'price', 'quantity', 'available_quantity', 'condition', 'location',
+            'description',
+        ],
+        update_columns=['title', 'author', 'publication_year', 'publisher', 'edition', 'book_type', 'description'],
+        available_column='available_quantity',
+        defaults={'book_type': 'other', 'condition': 'good', 'price': '0'},
+    ),
+}
+
+
+def read_csv(path, delimiter=','):
+    """Yield ``(line, row)`` pairs from a CSV file with a header row."""
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        for line, row in enumerate(csv.DictReader(handle, delimiter=delimiter), start=1):
+            yield line, row
+
+
+def read_marc(path):
+    """Yield ``(record number, row)`` pairs from a MARC21 file."""
+    with open(path, 'rb') as handle:
+        for line, record in enumerate(marc.iter_records(handle), start=1):
+            yield line, marc.record_to_book(record)
+
+
+class ImportState:
+    """
+    Checkpoint file recording how many input rows are safely merged, so an
+    interrupted import resumes where it stopped. Merges are upserts, so a
+    chunk replayed after a crash between commit and checkpoint is harmless.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        stat = os.stat(source)
+        self.identity = {'source': os.path.abspath(source), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        self.lines_done = 0
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as handle:
+            state = json.load(handle)
+        if {key: state.get(key) for key in self.identity} != self.identity:
+            raise ValueError('{} belongs to a different or modified input file.'.format(self.path))
+        self.lines_done = state['lines_done']
+        return True
+
+    def save(self, lines_done):
+        self.lines_done = lines_done
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump(dict(self.identity, lines_done=lines_done), handle)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CatalogImporter:
+    """
+    Load rows in chunks: normalise in Python, COPY into a temporary staging
+    table, then merge into the live table with one
+    ``INSERT ... SELECT ... ON CONFLICT (isbn) DO UPDATE`` per chunk. Only
+    one chunk is held in memory at a time.
+    """
+
+    def __init__(self, target, chunk_size=5000, state=None, on_reject=None, on_progress=None):
+        self.target = target
+        self.chunk_size = chunk_size
+        self.state = state
+        self.on_reject = on_reject or (lambda line, message: None)
+        self.on_progress = on_progress or (lambda stats: None)
+        self.stats = {'read': 0, 'inserted': 0, 'updated': 0, 'rejected': 0, 'skipped': 0}
+
+    def run(self, rows):
+        self.started = time.perf_counter()
+        self._create_staging()
+        resume_after = self.state.lines_done if self.state else 0
+        chunk = []
+        last_line = resume_after
+        for line, row in rows:
+            if line <= resume_after:
+                self.stats['skipped'] += 1
+                continue
+            self.stats['read'] += 1
+            last_line = line
+            try:
+                chunk.append((line, self.target.normalize(row)))
+            except RowError as error:
+                self._reject(line, str(error))
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, last_line)
+                chunk = []
+        self._flush(chunk, last_line)
+        return self.stats
+
+    def rows_per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return self.stats['read'] / elapsed if elapsed else 0.0
+
+    def _reject(self, line, message):
+        self.stats['rejected'] += 1
+        self.on_reject(line, message)
+
+    def _create_staging(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS {}'.format(STAGING_TABLE))
+            cursor.execute(
+                'CREATE TEMPORARY TABLE {staging} AS '
+                'SELECT 0::bigint AS line, {columns} FROM {table} WITH NO DATA'.format(
+                    staging=STAGING_TABLE, columns=', '.join(self.target.columns), table=self.target.table,
+                )
+            )
+
+    def _flush(self, chunk, last_line):
+        if chunk:
+            self._merge(chunk)
+        if self.state and last_line > self.state.lines_done:
+            self.state.save(last_line)
+        self.on_progress(self.stats)
+
+    def _merge(self, chunk):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+        for line, values in chunk:
+            writer.writerow((line,) + values)
+        buffer.seek(0)
+
+        columns = ', '.join(self.target.columns)
+        updates = ', '.join('{0} = EXCLUDED.{0}'.format(column) for column in self.target.update_columns)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('TRUNCATE {}'.format(STAGING_TABLE))
+            cursor.copy_expert(
+                'COPY {} (line, {}) FROM STDIN WITH (FORMAT csv)'.format(STAGING_TABLE, columns), buffer,
+            )
+            for line, message in self.target.prepare(cursor):
+                self._reject(line, message)
+            # Last occurrence of an ISBN in the chunk wins.
+            cursor.execute(
+                """
+                INSERT INTO {table} ({columns}, created_at, updated_at)
+                SELECT DISTINCT ON (isbn) {columns}, now(), now()
+                FROM {staging}
+                ORDER BY isbn, line DESC
+                ON CONFLICT (isbn) DO UPDATE SET {updates}, updated_at = EXCLUDED.updated_at
+                RETURNING (xmax = 0)
+                """.format(table=self.target.table, columns=columns, staging=STAGING_TABLE, updates=updates)
+            )
+            inserted = [was_insert for was_insert, in cursor.fetchall()]
+        self.stats['inserted'] += sum(inserted)
+        self.stats['updated'] += len(inserted) - sum(inserted)
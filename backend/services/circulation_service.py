@@ -0,0 +1,208 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from books.cache import book_cache
+from books.models import Book
+from models.models import Hold, Loan
+from models_new.models import Book as CatalogBook
+
+logger = logging.getLogger(__name__)
+
+# (available column, total column) per model with copy counts.
+STOCK_FIELDS = {
+    Book: ('available', 'quantity'),
+    CatalogBook: ('available_quantity', 'quantity'),
+}
+
+
+class StockError(Exception):
+    """No copy left to check out, or every copy is already on the shelf."""
+
+
+def _adjust(model, pk, delta):
+    """
+    Move ``delta`` copies out (negative) or back in (positive) with one
+    conditional UPDATE ... RETURNING, so the row lock is held for a single
+    statement and two desks can never both take the last copy:
+
+        UPDATE book SET available = available - 1
+        WHERE id = %s AND available - 1 >= 0 AND available - 1 <= quantity
+
+    Returns ``(available, quantity)`` after the change. Raises
+    ``model.DoesNotExist`` for an unknown id and ``StockError`` when the
+    change would leave the count outside ``0..quantity``.
+    """
+    available, total = (connection.ops.quote_name(name) for name in STOCK_FIELDS[model])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE {table} SET {available} = {available} + %(delta)s, updated_at = now() '
+            'WHERE id = %(pk)s AND {available} + %(delta)s BETWEEN 0 AND {total} '
+            'RETURNING {available}, {total}'.format(
+                table=connection.ops.quote_name(model._meta.db_table), available=available, total=total,
+            ),
+            {'pk': pk, 'delta': delta},
+        )
+        row = cursor.fetchone()
+    if row is None:
+        if not model.objects.filter(pk=pk).exists():
+            raise model.DoesNotExist
+        raise StockError('No copies available.' if delta < 0 else 'All copies are already returned.')
+    if model is Book:
+        # Raw SQL skips the post_save signal that normally does this.
+        book_cache.invalidate()
+    return row
+
+
+def checkout(model, pk, copies=1):
+    return _adjust(model, pk, -copies)
+
+
+def checkin(model, pk, copies=1):
+    return _adjust(model, pk, copies)
+
+
+def issue_loan(book, student=None, user=None, due_at=None, issued_by=None):
+    """
+    Check a copy of ``book`` (a models_new.Book) out to a student or user
+    and record the loan. A borrower with a ready hold on the title takes
+    the copy set aside for them; everyone else takes one off the shelf.
+    The stock change and the loan row commit together; ``StockError``
+    means no copy was free.
+    """
+    if due_at is None:
+        due_at = timezone.now() + timedelta(days=getattr(settings, 'LOAN_PERIOD_DAYS', 14))
+    with transaction.atomic():
+        picked_up = Hold.objects.filter(book=book, student=student, user=user, status=Hold.READY).update(
+            status=Hold.FULFILLED,
+        )
+        if not picked_up:
+            checkout(CatalogBook, book.pk)
+            # Served from the shelf ahead of their turn; leave the queue.
+            Hold.objects.filter(book=book, student=student, user=user, status=Hold.WAITING).update(
+                status=Hold.FULFILLED,
+            )
+        return Loan.objects.create(book=book, student=student, user=user, due_at=due_at, issued_by=issued_by)
+
+
+def return_loan(loan_id):
+    """
+    Close an open loan and pass the copy on: to the oldest waiting hold on
+    the title if there is one, otherwise back to the shelf. The loan is
+    closed with a conditional UPDATE, so a double scan at the desk returns
+    the copy once. Returns the loan; raises ``StockError`` if it was
+    already returned.
+    """
+    with transaction.atomic():
+        closed = Loan.objects.filter(pk=loan_id, returned_at__isnull=True).update(returned_at=timezone.now())
+        loan = Loan.objects.get(pk=loan_id)
+        if not closed:
+            raise StockError('This loan is already returned.')
+        release_copy(loan.book_id)
+    return loan
+
+
+def place_hold(book, student=None, user=None):
+    """
+    Queue a borrower for ``book``. If a copy is on the shelf it is set
+    aside straight away for the oldest waiting hold, which is this one
+    unless others were already queued.
+    """
+    with transaction.atomic():
+        hold = Hold.objects.create(book=book, student=student, user=user)
+        try:
+            checkout(CatalogBook, book.pk)
+        except StockError:
+            pass
+        else:
+            allocate_hold(book.pk)
+    hold.refresh_from_db()
+    return hold
+
+
+def allocate_hold(book_id):
+    """
+    Mark the oldest waiting hold on ``book_id`` ready for pickup and return
+    its id, or None if nobody is waiting. One statement: the subquery is
+    the first entry of the ``hold_queue`` partial index, and
+    ``FOR UPDATE SKIP LOCKED`` makes concurrent returns on other workers
+    take the next hold instead of blocking on, or double-allocating, this
+    one.
+    """
+    table = connection.ops.quote_name(Hold._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE {table} SET status = %(ready)s, ready_at = now(), '
+            'expires_at = now() + make_interval(days => %(days)s) '
+            'WHERE id = ('
+            '  SELECT id FROM {table} WHERE book_id = %(book)s AND status = %(waiting)s '
+            '  ORDER BY placed_at, id LIMIT 1 FOR UPDATE SKIP LOCKED'
+            ') RETURNING id'.format(table=table),
+            {
+                'book': book_id,
+                'ready': Hold.READY,
+                'waiting': Hold.WAITING,
+                'days': getattr(settings, 'HOLD_PICKUP_DAYS', 3),
+            },
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def release_copy(book_id):
+    """
+    Hand a copy that just became free to the hold queue, or shelve it. If
+    every copy is already on the shelf the stock count has drifted (an
+    edit or stocktake while the copy was out); the count stays clamped at
+    ``quantity`` and the drift is logged, so the return still goes through.
+    """
+    hold_id = allocate_hold(book_id)
+    if hold_id is None:
+        try:
+            checkin(CatalogBook, book_id)
+        except StockError:
+            logger.warning('Book %s: copy returned with every copy already on the shelf.', book_id)
+    return hold_id
+
+
+def cancel_hold(hold_id):
+    """
+    Cancel an active hold. A copy already set aside for it moves on to the
+    next hold in the queue. Returns the hold; raises ``StockError`` if it
+    was no longer active.
+    """
+    with transaction.atomic():
+        hold = Hold.objects.select_for_update().get(pk=hold_id)
+        if hold.status not in Hold.ACTIVE:
+            raise StockError('This hold is no longer active.')
+        was_ready = hold.status == Hold.READY
+        hold.status = Hold.CANCELLED
+        hold.save(update_fields=['status'])
+        if was_ready:
+            release_copy(hold.book_id)
+    return hold
+
+
+def expire_holds(now=None):
+    """
+    Expire ready holds nobody picked up in time, passing each copy on.
+    Returns the number of holds expired.
+    """
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            hold = (
+                Hold.objects.select_for_update(skip_locked=True)
+                .filter(status=Hold.READY, expires_at__lt=now)
+                .order_by('expires_at', 'id')
+                .first()
+            )
+            if hold is None:
+                return expired
+            Hold.objects.filter(pk=hold.pk).update(status=Hold.EXPIRED)
+            release_copy(hold.book_id)
+        expired += 1
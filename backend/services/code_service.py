@@ -0,0 +1,82 @@
+import os
+import threading
+
+from django.db import connection
+
+
+def check_digit(digits):
+    """Luhn (mod 10) check digit for a string of digits."""
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit) * (1 if position % 2 else 2)
+        total += value - 9 if value > 9 else value
+    return str((10 - total % 10) % 10)
+
+
+class CodeAllocator:
+    """
+    Hands out sequential codes ``<prefix><number><check digit>`` from a
+    PostgreSQL sequence created with ``INCREMENT BY block_size``. One
+    ``nextval`` reserves a whole block of numbers for this process, so
+    single codes cost a round trip only once per block, and ``allocate_many``
+    reserves every block it needs in one query. Numbers are never reused:
+    a rolled-back insert or a restarted worker leaves a gap, not a duplicate.
+
+    The prefixes contain letters that never appear in the old hex uuid
+    codes, so new codes cannot clash with existing ones.
+    """
+
+    def __init__(self, sequence, prefix, width, block_size):
+        self.sequence = sequence
+        self.prefix = prefix
+        self.width = width
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._next = self._end = 0
+
+    def format(self, number):
+        digits = str(number).zfill(self.width)
+        return self.prefix + digits + check_digit(digits)
+
+    def is_valid(self, code):
+        """True if ``code`` has this allocator's prefix and a correct check digit."""
+        digits = code[len(self.prefix):]
+        return (
+            code.startswith(self.prefix) and len(digits) > 1 and digits.isdigit()
+            and check_digit(digits[:-1]) == digits[-1]
+        )
+
+    def allocate(self):
+        return self.allocate_many(1)[0]
+
+    def allocate_many(self, count):
+        """Return ``count`` new codes; at most one query however large ``count`` is."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked worker must not hand out its parent's block.
+                self._pid = os.getpid()
+                self._next = self._end = 0
+            numbers = list(range(self._next, min(self._end, self._next + count)))
+            self._next += len(numbers)
+            missing = count - len(numbers)
+            if missing:
+                blocks = -(-missing // self.block_size)
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT nextval(%s) FROM generate_series(1, %s)', [self.sequence, blocks],
+                    )
+                    starts = [start for start, in cursor.fetchall()]
+                for start in starts:
+                    numbers.extend(range(start, start + self.block_size))
+                # Whatever the last block has left over is kept for later calls.
+                self._end = starts[-1] + self.block_size
+                self._next = self._end - (len(numbers) - count)
+                del numbers[count:]
+        return [self.format(number) for number in numbers]
+
+
+# Block sizes must match the INCREMENT BY of the sequences
+# (models_new migration 0002).
+book_barcodes = CodeAllocator('models_new_book_barcode_seq', 'BK', width=9, block_size=100)
+school_codes = CodeAllocator('models_new_school_code_seq', 'SC', width=5, block_size=10)
@@ -0,0 +1,222 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import django
+from django.conf import settings
+
+from models_new.models import Book as CatalogBook
+from services import barcode_service
+from utils.pdf import ImagePDFWriter, compress_bitmap
+
+
+class SheetLayout:
+    """
+    A grid of labels on a page, drawn at ``dpi``. The defaults are A4
+    sheets of 3 x 8 labels of 63.5 x 33.9 mm (Avery L7159 and compatibles).
+    """
+
+    def __init__(self, page_mm=(210, 297), label_mm=(63.5, 33.9), columns=3, rows=8,
+                 margin_mm=(7.25, 12.9), gap_mm=(2.5, 0), dpi=300):
+        self.page_mm = page_mm
+        self.label_mm = label_mm
+        self.columns = columns
+        self.rows = rows
+        self.margin_mm = margin_mm
+        self.gap_mm = gap_mm
+        self.dpi = dpi
+
+    @property
+    def per_sheet(self):
+        return self.columns * self.rows
+
+    def px(self, mm):
+        return int(round(mm * self.dpi / 25.4))
+
+    @property
+    def page_size(self):
+        return self.px(self.page_mm[0]), self.px(self.page_mm[1])
+
+    @property
+    def label_size(self):
+        return self.px(self.label_mm[0]), self.px(self.label_mm[1])
+
+    def origin(self, index):
+        """Top-left pixel of the ``index``-th label on a sheet, filled row by row."""
+        row, column = divmod(index, self.columns)
+        return (
+            self.px(self.margin_mm[0] + column * (self.label_mm[0] + self.gap_mm[0])),
+            self.px(self.margin_mm[1] + row * (self.label_mm[1] + self.gap_mm[1])),
+        )
+
+
+def _fit(draw, text, font, width):
+    """``text`` shortened with an ellipsis until it fits in ``width`` pixels."""
+    length = draw.textlength(text, font=font)
+    if length <= width:
+        return text
+    # Start from a proportional guess so only a couple more measurements are needed.
+    cut = int(len(text) * width / length)
+    while cut and draw.textlength(text[:cut].rstrip() + '…', font=font) > width:
+        cut -= 1
+    return text[:cut].rstrip() + '…'
+
+
+def render_label(code, title, location, layout):
+    """One label as a mode '1' image: title, Code128 bars, then code and location."""
+    from PIL import Image, ImageDraw
+
+    width, height = layout.label_size
+    padding = layout.px(2)
+    image = Image.new('1', (width, height), 1)
+    draw = ImageDraw.Draw(image)
+    title_font = barcode_service.font(height // 10)
+    text_font = barcode_service.font(height // 13)
+    inner = width - 2 * padding
+
+    draw.text((padding, padding), _fit(draw, title, title_font, inner), fill=0, font=title_font)
+
+    modules = barcode_service.code128_modules(code)
+    module = max(1, inner // (len(modules) + 2 * barcode_service.QUIET_ZONE))
+    left = padding + (inner - len(modules) * module) // 2
+    top = padding + height // 7
+    bottom = height - padding - height // 8
+    for start, run in barcode_service.bars(modules):
+        draw.rectangle([left + start * module, top, left + (start + run) * module - 1, bottom], fill=0)
+
+    draw.text((padding, height - padding), code, fill=0, font=text_font, anchor='ld')
+    draw.text((width - padding, height - padding), _fit(draw, location, text_font, inner // 2),
+              fill=0, font=text_font, anchor='rd')
+    return image
+
+
+def _label(cache, layout, code, title, location):
+    """A label image, taken from the per-barcode disk cache or rendered into it."""
+    from PIL import Image
+
+    def render():
+        buffer = BytesIO()
+        render_label(code, title, location, layout).save(buffer, format='PNG', compress_level=1)
+        return buffer.getvalue()
+
+    key = cache.key(code, 'png', 'label', title, location, layout.label_size)
+    return Image.open(BytesIO(cache.get(key, 'png', render)))
+
+
+def render_sheet(directory, layout, labels, image_format):
+    """
+    Lay ``labels`` (``(code, title, location)`` tuples, at most one sheet's
+    worth) out on a page. Runs in the pool workers. Returns PNG bytes, or
+    ``(width, height, compressed bits)`` of the 1-bit page for the PDF
+    writer.
+    """
+    from PIL import Image
+
+    cache = barcode_service.ImageCache(directory)
+    sheet = Image.new('1', layout.page_size, 1)
+    for index, (code, title, location) in enumerate(labels):
+        sheet.paste(_label(cache, layout, code, title, location), layout.origin(index))
+    if image_format == 'png':
+        buffer = BytesIO()
+        sheet.save(buffer, format='PNG', dpi=(layout.dpi, layout.dpi))
+        return buffer.getvalue()
+    return sheet.width, sheet.height, compress_bitmap(sheet.tobytes())
+
+
+class _Chunks:
+    """Binary file object that keeps what is written until ``take()`` hands it over."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(data)
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+class LabelPrinter:
+    """
+    Renders label sheets for ``(code, title, location)`` rows. With more
+    than one worker each sheet is one task for a ``ProcessPoolExecutor``
+    (manage.py print_labels); ``workers=1`` renders in the calling process,
+    which is what the API does. Label images are cached on disk per
+    barcode (with the title and location drawn on it), so reprinting a
+    shipment only pastes cached labels. Sheets come back in order and are
+    streamed to the output one at a time.
+    """
+
+    def __init__(self, layout=None, workers=None, on_progress=None):
+        self.layout = layout or SheetLayout()
+        self.workers = workers or getattr(settings, 'LABEL_RENDER_WORKERS', None) or os.cpu_count()
+        self.on_progress = on_progress or (lambda sheets, labels: None)
+
+    def sheets(self, labels, image_format):
+        """Yield rendered sheets in order; ``image_format`` is 'png' or 'pdf'."""
+        labels = list(labels)
+        per_sheet = self.layout.per_sheet
+        chunks = [labels[start:start + per_sheet] for start in range(0, len(labels), per_sheet)]
+        arguments = (
+            [barcode_service.image_cache.directory] * len(chunks),
+            [self.layout] * len(chunks),
+            chunks,
+            [image_format] * len(chunks),
+        )
+        if self.workers <= 1 or len(chunks) <= 1:
+            results = map(render_sheet, *arguments)
+            yield from self._progress(results, chunks)
+            return
+        with ProcessPoolExecutor(self.workers, initializer=django.setup) as pool:
+            yield from self._progress(pool.map(render_sheet, *arguments), chunks)
+
+    def _progress(self, results, chunks):
+        done = 0
+        for number, (result, chunk) in enumerate(zip(results, chunks), start=1):
+            done += len(chunk)
+            yield result
+            self.on_progress(number, done)
+
+    def write_pdf(self, labels, handle):
+        """Write every sheet as one page of a PDF to the binary file ``handle``."""
+        writer = ImagePDFWriter(handle, self.layout.page_mm)
+        for width, height, data in self.sheets(labels, 'pdf'):
+            writer.add_page(width, height, data)
+        writer.close()
+        return len(writer.pages)
+
+    def stream_pdf(self, labels):
+        """Yield the PDF of every sheet in pieces, one page at a time, for a streaming response."""
+        handle = _Chunks()
+        writer = ImagePDFWriter(handle, self.layout.page_mm)
+        for width, height, data in self.sheets(labels, 'pdf'):
+            writer.add_page(width, height, data)
+            yield handle.take()
+        writer.close()
+        yield handle.take()
+
+    def write_png(self, labels, directory, prefix='labels'):
+        """Write each sheet as ``<prefix>-0001.png`` ... in ``directory``; returns the paths."""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for number, content in enumerate(self.sheets(labels, 'png'), start=1):
+            path = os.path.join(directory, '{}-{:04d}.png'.format(prefix, number))
+            with open(path, 'wb') as handle:
+                handle.write(content)
+            paths.append(path)
+        return paths
+
+
+def catalog_labels(queryset, per_copy=False):
+    """``(barcode, title, location)`` for models_new.Book rows, repeated per copy if asked."""
+    rows = queryset.order_by('location', 'title', 'id').values_list('barcode', 'title', 'location', 'quantity')
+    for code, title, location, quantity in rows.iterator(chunk_size=2000):
+        for _ in range(max(quantity, 1) if per_copy else 1):
+            yield code, title, location
+
+
+def book_labels(books, per_copy=False):
+    """Labels for the catalog copy records (models_new.Book) of a books.Book queryset, matched on ISBN."""
+    return catalog_labels(CatalogBook.objects.filter(isbn__in=books.values('isbn')), per_copy=per_copy)
@@ -0,0 +1,200 @@
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, OuterRef, Q
+from django.template.loader import get_template
+from django.utils import dateformat, timezone
+
+from models.loan import OPEN
+from models.models import Loan, Student
+
+# Short names for --backend; anything else is taken as a dotted path.
+DELIVERY_BACKENDS = {
+    'smtp': 'django.core.mail.backends.smtp.EmailBackend',
+    'file': 'django.core.mail.backends.filebased.EmailBackend',
+    'console': 'django.core.mail.backends.console.EmailBackend',
+    'locmem': 'django.core.mail.backends.locmem.EmailBackend',
+}
+
+
+class NoticeState:
+    """
+    Checkpoint for one day's run: the exact ``as_of`` cutoff, the
+    (parent_email, student id) keyset position of the last chunk handed to
+    the delivery backend, and the running totals. A finished run leaves the
+    file behind marked ``completed``, so a retry the same day sends nothing
+    until it is cleared (``--restart``). Delivery is at-least-once: a crash
+    between sending a chunk and saving the checkpoint re-sends that chunk.
+    """
+
+    def __init__(self, path, as_of):
+        self.path = path
+        self.day = as_of.date().isoformat()
+        self.as_of = as_of
+        self.position = None
+        self.stats = {}
+        self.completed = False
+
+    def load(self):
+        """
+        Read the checkpoint for this day. The saved cutoff replaces
+        ``as_of``: the keyset position is only valid against the cutoff it
+        was walked under.
+        """
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as handle:
+            state = json.load(handle)
+        if state.get('day') != self.day:
+            return False
+        self.as_of = datetime.fromisoformat(state['as_of'])
+        self.position = tuple(state['position']) if state['position'] else None
+        self.stats = state['stats']
+        self.completed = state.get('completed', False)
+        return True
+
+    def save(self, position, stats, completed=False):
+        self.position, self.stats, self.completed = position, stats, completed
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump({'day': self.day, 'as_of': self.as_of.isoformat(), 'position': position, 'stats': stats,
+                       'completed': completed}, handle)
+        os.replace(temporary, self.path)
+
+    def complete(self, stats):
+        self.save(self.position, stats, completed=True)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class OverdueNoticeJob:
+    """
+    One notice per parent email covering every overdue loan of all their
+    children. Students with overdue loans are walked in keyset order on
+    (parent_email, id), so siblings land in the same chunk and a chunk
+    never splits a family. Each chunk costs two indexed queries (students,
+    then their open loans) and one ``send_messages`` call.
+    """
+
+    def __init__(self, as_of, chunk_size=500, backend=None, state=None, on_progress=None, **backend_options):
+        self.as_of = as_of
+        self.chunk_size = chunk_size
+        if backend is None:
+            backend = getattr(settings, 'NOTICE_EMAIL_BACKEND', None)
+        self.connection = get_connection(DELIVERY_BACKENDS.get(backend, backend), **backend_options)
+        self.state = state
+        self.on_progress = on_progress or (lambda stats: None)
+        self.template = get_template('notices/overdue_notice.txt')
+        self.from_email = getattr(settings, 'NOTICE_FROM_EMAIL', None) or settings.DEFAULT_FROM_EMAIL
+        self.stats = {'chunks': 0, 'students': 0, 'loans': 0, 'notices': 0, 'seconds': 0.0}
+        # Dates are formatted once per distinct day rather than in the
+        # template for every loan line.
+        self._dates = {}
+
+    def run(self):
+        """
+        Send the notices, resuming from ``state`` if it holds a checkpoint
+        for the day. Returns the totals; a day already marked completed
+        sends nothing and returns that run's totals.
+        """
+        position = None
+        if self.state and self.state.load():
+            self.stats.update(self.state.stats)
+            if self.state.completed:
+                return self.stats
+            self.as_of = self.state.as_of
+            position = self.state.position
+        started = time.perf_counter() - self.stats['seconds']
+
+        self.connection.open()
+        try:
+            while True:
+                students = self._students(position)
+                if not students:
+                    break
+                loans = self._loans([student[0] for student in students])
+                messages = self._render(students, loans)
+                self.connection.send_messages(messages)
+
+                position = (students[-1][1], students[-1][0])
+                self.stats['chunks'] += 1
+                self.stats['students'] += len(students)
+                self.stats['loans'] += sum(len(rows) for rows in loans.values())
+                self.stats['notices'] += len(messages)
+                self.stats['seconds'] = time.perf_counter() - started
+                if self.state:
+                    self.state.save(position, self.stats)
+                self.on_progress(self.stats)
+        finally:
+            self.connection.close()
+        if self.state:
+            self.state.complete(self.stats)
+        return self.stats
+
+    def _students(self, position):
+        queryset = (
+            Student.objects
+            .filter(Exists(Loan.objects.filter(OPEN, student=OuterRef('pk'), due_at__lt=self.as_of)))
+            .exclude(parent_email='')
+            .order_by('parent_email', 'id')
+        )
+        if position:
+            email, student_id = position
+            queryset = queryset.filter(Q(parent_email__gt=email) | Q(parent_email=email, id__gt=student_id))
+        columns = ('id', 'parent_email', 'parent_name', 'first_name', 'last_name')
+        students = list(queryset.values_list(*columns)[:self.chunk_size])
+        if len(students) == self.chunk_size:
+            # Pull in the rest of the last family so it gets one notice.
+            email, student_id = students[-1][1], students[-1][0]
+            students += queryset.filter(parent_email=email, id__gt=student_id).values_list(*columns)
+        return students
+
+    def _loans(self, student_ids):
+        loans = defaultdict(list)
+        rows = (
+            Loan.objects
+            .filter(OPEN, student_id__in=student_ids, due_at__lt=self.as_of)
+            .order_by('student_id', 'due_at')
+            .values_list('student_id', 'book__title', 'book__barcode', 'due_at')
+        )
+        for student_id, title, barcode, due_at in rows:
+            loans[student_id].append({
+                'title': title,
+                'barcode': barcode,
+                'due': self._format_date(due_at),
+                'days': (self.as_of - due_at).days,
+            })
+        return loans
+
+    def _format_date(self, moment):
+        day = timezone.localdate(moment)
+        if day not in self._dates:
+            self._dates[day] = dateformat.format(day, 'j F Y')
+        return self._dates[day]
+
+    def _render(self, students, loans):
+        families = defaultdict(list)
+        for student_id, email, parent_name, first_name, last_name in students:
+            families[email].append((parent_name, {
+                'name': f'{first_name} {last_name}',
+                'loans': loans.get(student_id, []),
+            }))
+        messages = []
+        for email, children in families.items():
+            count = sum(len(child['loans']) for _, child in children)
+            body = self.template.render({
+                'parent_name': children[0][0],
+                'as_of': self._format_date(self.as_of),
+                'students': [child for _, child in children],
+            })
+            subject = 'Overdue library books: {} item{}'.format(count, '' if count == 1 else 's')
+            messages.append(EmailMessage(subject, body, self.from_email, [email]))
+        return messages
@@ -0,0 +1,192 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min, Q, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from models.models import CirculationRollup, Loan, RollupWatermark, Student
+from models_new.models import Book as CatalogBook
+
+CIRCULATION = 'circulation'
+
+# Issues counted on the day they went out, returns on the day they came
+# back, each attributed to the book's type and the borrower's school and
+# grade, then written at all three grains. Rows are added to what is
+# already stored, so a period can be built up over several runs.
+ROLLUP_SQL = """
+WITH events AS (
+    SELECT e.day, s.school_id, b.book_type, s.grade,
+           sum(e.issues) AS issues, sum(e.returns) AS returns, sum(e.late) AS late
+    FROM (
+        SELECT (issued_at AT TIME ZONE %(tz)s)::date AS day, book_id, student_id,
+               1 AS issues, 0 AS returns, 0 AS late
+        FROM {loans} WHERE issued_at >= %(start)s AND issued_at < %(end)s
+        UNION ALL
+        SELECT (returned_at AT TIME ZONE %(tz)s)::date, book_id, student_id,
+               0, 1, (returned_at > due_at)::int
+        FROM {loans} WHERE returned_at >= %(start)s AND returned_at < %(end)s
+    ) AS e
+    JOIN {books} AS b ON b.id = e.book_id
+    LEFT JOIN {students} AS s ON s.id = e.student_id
+    GROUP BY 1, 2, 3, 4
+)
+INSERT INTO {rollup} AS r (grain, starts_on, school_id, book_type, grade, issues, returns, late_returns)
+SELECT 'day', day, school_id, book_type, grade, issues, returns, late FROM events
+UNION ALL
+SELECT 'week', date_trunc('week', day::timestamp)::date, school_id, book_type, grade,
+       sum(issues), sum(returns), sum(late)
+FROM events GROUP BY 2, 3, 4, 5
+UNION ALL
+SELECT 'month', date_trunc('month', day::timestamp)::date, school_id, book_type, grade,
+       sum(issues), sum(returns), sum(late)
+FROM events GROUP BY 2, 3, 4, 5
+ON CONFLICT ON CONSTRAINT circulationrollup_key DO UPDATE SET
+    issues = r.issues + EXCLUDED.issues,
+    returns = r.returns + EXCLUDED.returns,
+    late_returns = r.late_returns + EXCLUDED.late_returns
+"""
+
+# The week running into a rebuilt month, re-derived from its day rows
+# before the rebuild point (the roll-up re-adds the rest).
+REWEEK_SQL = """
+INSERT INTO {rollup} (grain, starts_on, school_id, book_type, grade, issues, returns, late_returns)
+SELECT 'week', %(week)s, school_id, book_type, grade, sum(issues), sum(returns), sum(late_returns)
+FROM {rollup}
+WHERE grain = 'day' AND starts_on >= %(week)s AND starts_on < %(since)s
+GROUP BY school_id, book_type, grade
+"""
+
+METRICS = ('issues', 'returns', 'late_returns')
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _first_event():
+    first = Loan.objects.aggregate(first=Min('issued_at'))['first']
+    return _start_of_day(timezone.localdate(first)) if first else None
+
+
+def _step(watermark, end):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            ROLLUP_SQL.format(
+                rollup=CirculationRollup._meta.db_table, loans=Loan._meta.db_table,
+                books=CatalogBook._meta.db_table, students=Student._meta.db_table,
+            ),
+            {'tz': settings.TIME_ZONE, 'start': watermark.position, 'end': end},
+        )
+    watermark.position = end
+    watermark.save(update_fields=['position', 'updated_at'])
+
+
+def roll_up(until=None):
+    """
+    Fold loan events between the watermark and ``until`` (default: now
+    minus ROLLUP_LAG_SECONDS, so transactions still in flight are not
+    skipped) into CirculationRollup, at most ROLLUP_BATCH_DAYS per
+    transaction. Each batch adds its rows and advances the watermark
+    atomically, under a row lock, so concurrent or interrupted runs never
+    count an event twice. Returns the number of batches applied.
+    """
+    lag = timedelta(seconds=getattr(settings, 'ROLLUP_LAG_SECONDS', 300))
+    batch = timedelta(days=getattr(settings, 'ROLLUP_BATCH_DAYS', 31))
+    until = until or timezone.now() - lag
+    batches = 0
+    while True:
+        with transaction.atomic():
+            watermark = RollupWatermark.objects.select_for_update().filter(name=CIRCULATION).first()
+            if watermark is None:
+                # First run: start from the day of the oldest loan, then lock it like any other.
+                first = _first_event()
+                if first is None:
+                    return batches
+                RollupWatermark.objects.get_or_create(name=CIRCULATION, defaults={'position': first})
+                continue
+            if watermark.position >= until:
+                return batches
+            _step(watermark, min(watermark.position + batch, until))
+            batches += 1
+
+
+def _week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def rebuild(since=None):
+    """
+    Drop the roll-up from the month of ``since`` on (everything if None)
+    and move the watermark back to match; the next ``roll_up`` recomputes
+    it. For loans written with back-dated timestamps, which the
+    incremental run cannot see.
+    """
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update().filter(name=CIRCULATION).first()
+        if since is None:
+            CirculationRollup.objects.all().delete()
+            RollupWatermark.objects.filter(name=CIRCULATION).delete()
+            return
+        since = _month_start(since)
+        week = _week_start(since)
+        CirculationRollup.objects.filter(
+            Q(starts_on__gte=since) | Q(grain=CirculationRollup.WEEK, starts_on=week),
+        ).delete()
+        if week < since:
+            with connection.cursor() as cursor:
+                cursor.execute(REWEEK_SQL.format(rollup=CirculationRollup._meta.db_table),
+                               {'week': week, 'since': since})
+        if watermark is not None and watermark.position > _start_of_day(since):
+            watermark.position = _start_of_day(since)
+            watermark.save(update_fields=['position', 'updated_at'])
+
+
+def _whole_periods(start, end, grain):
+    """First and one-past-last day of the whole weeks or months inside ``start``..``end``."""
+    if grain == CirculationRollup.WEEK:
+        return start + timedelta(days=-start.weekday() % 7), _week_start(end + timedelta(days=1))
+    first = start if start.day == 1 else _next_month(start)
+    return first, _month_start(end + timedelta(days=1))
+
+
+def rolled_up_to():
+    return RollupWatermark.objects.filter(name=CIRCULATION).values_list('position', flat=True).first()
+
+
+def circulation(start, end, period='day', by=(), **filters):
+    """
+    Issues, returns and late returns per ``period`` (or one total row when
+    ``period`` is None) between the dates ``start`` and ``end`` inclusive,
+    split by any of school, book_type and grade and limited by ``school``, ``book_type`` or
+    ``grade`` filters. Reads CirculationRollup only: whole weeks or months
+    from their own rows, partial ones at either end from day rows.
+    """
+    grain = {'day': CirculationRollup.DAY, 'week': CirculationRollup.WEEK}.get(period, CirculationRollup.MONTH)
+    days = Q(grain=CirculationRollup.DAY, starts_on__range=(start, end))
+    if grain != CirculationRollup.DAY:
+        first, after = _whole_periods(start, end, grain)
+        if first < after:
+            days = (
+                Q(grain=grain, starts_on__gte=first, starts_on__lt=after)
+                | Q(grain=CirculationRollup.DAY, starts_on__gte=start, starts_on__lt=first)
+                | Q(grain=CirculationRollup.DAY, starts_on__gte=after, starts_on__lte=end)
+            )
+    queryset = CirculationRollup.objects.filter(days, **filters)
+    columns = list(by)
+    if period:
+        queryset = queryset.annotate(period=Trunc('starts_on', period))
+        columns.insert(0, 'period')
+    totals = {metric: Sum(metric) for metric in METRICS}
+    if not columns:
+        return [{metric: value or 0 for metric, value in queryset.aggregate(**totals).items()}]
+    return list(queryset.values(*columns).annotate(**totals).order_by(*columns))
@@ -0,0 +1,179 @@
+import csv
+import io
+import time
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from models.models import Student
+from models.serializers import StudentRosterSerializer
+from models_new.models import School
+
+ROSTER_FIELDS = StudentRosterSerializer.Meta.fields
+DEFAULTED_FIELDS = [name for name in ROSTER_FIELDS if Student._meta.get_field(name).has_default()]
+FORMATS = ('csv', 'xlsx')
+
+
+def _header(name):
+    return str(name or '').strip().lower().replace(' ', '_')
+
+
+def guess_format(name):
+    return 'xlsx' if str(name).lower().endswith(('.xlsx', '.xlsm')) else 'csv'
+
+
+def read_csv(source, delimiter=','):
+    """Yield ``(line, row)`` pairs from a CSV path or binary file with a header row."""
+    if isinstance(source, str):
+        handle = open(source, newline='', encoding='utf-8-sig')
+    else:
+        # Uploaded files wrap the real file object in ``.file``.
+        handle = io.TextIOWrapper(getattr(source, 'file', source), encoding='utf-8-sig', newline='')
+    with handle:
+        reader = csv.reader(handle, delimiter=delimiter)
+        header = [_header(name) for name in next(reader, [])]
+        for line, values in enumerate(reader, start=1):
+            if any(values):
+                yield line, dict(zip(header, values))
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return '' if value is None else str(value)
+
+
+def read_xlsx(source):
+    """Yield ``(line, row)`` pairs from the first sheet of an .xlsx path or file, header in row 1."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [_header(name) for name in next(rows, ())]
+        for line, values in enumerate(rows, start=1):
+            if any(value not in (None, '') for value in values):
+                yield line, dict(zip(header, map(_cell, values)))
+    finally:
+        workbook.close()
+
+
+def read_roster(source, file_format=None):
+    file_format = file_format or guess_format(getattr(source, 'name', source))
+    return read_xlsx(source) if file_format == 'xlsx' else read_csv(source)
+
+
+class RosterImporter:
+    """
+    Upsert students from roster rows, merged on ``student_id``. Rows are
+    validated field by field as they are read; the checks that span rows
+    (repeated student IDs anywhere in the input, school codes) run once
+    per chunk with set lookups and one query each, and each chunk is
+    written with one ``bulk_create(update_conflicts=True)`` per set of
+    columns. Existing students only get the columns their own row supplies
+    overwritten: a missing key or a blank cell in a column with a model
+    default (admission date, active) leaves the stored value alone, and the
+    default is used only for new students. Bad rows are reported with their
+    line number and never block the rest.
+    """
+
+    def __init__(self, school=None, chunk_size=None, on_progress=None):
+        self.school = school
+        self.chunk_size = chunk_size or getattr(settings, 'BULK_BATCH_SIZE', 500) * 10
+        self.on_progress = on_progress or (lambda stats: None)
+        self.stats = {'read': 0, 'inserted': 0, 'updated': 0, 'rejected': 0}
+        self.errors = []
+        self.seen = set()
+        # One instance for every row: DRF builds a serializer's fields on
+        # first use, which costs more than validating a row.
+        self.serializer = StudentRosterSerializer()
+
+    def run(self, rows):
+        self.started = time.perf_counter()
+        chunk = []
+        for line, row in rows:
+            self.stats['read'] += 1
+            candidate = self._validate(line, row)
+            if candidate:
+                chunk.append(candidate)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        self._flush(chunk)
+        return self.stats
+
+    def rows_per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return self.stats['read'] / elapsed if elapsed else 0.0
+
+    def _reject(self, line, errors):
+        self.stats['rejected'] += 1
+        self.errors.append({'line': line, 'errors': errors})
+
+    def _validate(self, line, row):
+        if not isinstance(row, dict):
+            self._reject(line, {'non_field_errors': ['Expected an object.']})
+            return None
+        row = {key: value.strip() if isinstance(value, str) else value for key, value in row.items() if key}
+        data = {key: value for key, value in row.items() if key in ROSTER_FIELDS}
+        # Blank cells in columns with a model default (admission date, active)
+        # are left out, so they take the default on insert and keep the
+        # stored value on update.
+        for name in DEFAULTED_FIELDS:
+            if data.get(name) == '':
+                del data[name]
+        if 'section' in data:
+            data['section'] = data['section'].upper()
+        fields = [name for name in ROSTER_FIELDS if name in data and name != 'student_id']
+        if row.get('school') or self.school:
+            fields.append('school')
+        try:
+            validated = self.serializer.run_validation(data)
+        except ValidationError as error:
+            self._reject(line, error.detail)
+            return None
+        return line, validated, str(row.get('school') or ''), tuple(fields)
+
+    def _flush(self, chunk):
+        if chunk:
+            self._merge(chunk)
+        self.on_progress(self.stats)
+
+    def _merge(self, chunk):
+        codes = {code for _, _, code, _ in chunk if code}
+        schools = dict(School.objects.filter(code__in=codes).values_list('code', 'id')) if codes else {}
+
+        # Accepted students grouped by the columns their row supplies.
+        groups = {}
+        for line, data, code, fields in chunk:
+            if data['student_id'] in self.seen:
+                self._reject(line, {'student_id': ['Duplicate student ID in this roster.']})
+                continue
+            if code and code not in schools:
+                self._reject(line, {'school': ['No school with code {!r}.'.format(code)]})
+                continue
+            # Only accepted rows claim their ID, so a corrected row later in
+            # the roster is not rejected as a duplicate of a rejected one.
+            self.seen.add(data['student_id'])
+            school_id = schools[code] if code else getattr(self.school, 'pk', None)
+            groups.setdefault(fields, []).append(Student(school_id=school_id, **data))
+        if not groups:
+            return
+
+        student_ids = [student.student_id for students in groups.values() for student in students]
+        existing = Student.objects.filter(student_id__in=student_ids).count()
+        with transaction.atomic():
+            for fields, students in groups.items():
+                Student.objects.bulk_create(
+                    students, update_conflicts=True, unique_fields=['student_id'],
+                    update_fields=list(fields) + ['updated_at'],
+                    batch_size=getattr(settings, 'BULK_BATCH_SIZE', 500),
+                )
+        self.stats['inserted'] += len(student_ids) - existing
+        self.stats['updated'] += existing
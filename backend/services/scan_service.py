@@ -0,0 +1,183 @@
+import os
+import tarfile
+import time
+import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import django
+from django.conf import settings
+from django.db.models import Q
+
+from models_new.models import Book
+from services.code_service import book_barcodes
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.gif', '.webp')
+
+
+def iter_images(source):
+    """
+    Yield ``(name, path or bytes)`` for every image in a directory (walked
+    recursively), a .zip or a tar archive (any compression). Files inside
+    archives are read here and handed to the workers as bytes.
+    """
+    if os.path.isdir(source):
+        for root, directories, files in os.walk(source):
+            directories.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, source), path
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for member in archive.infolist():
+                if not member.is_dir() and member.filename.lower().endswith(IMAGE_EXTENSIONS):
+                    yield member.filename, archive.read(member)
+    elif tarfile.is_tarfile(source):
+        with tarfile.open(source, 'r:*') as archive:
+            for member in archive:
+                if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield os.path.normpath(member.name), archive.extractfile(member).read()
+    else:
+        raise ValueError('{} is not a directory, zip or tar archive.'.format(source))
+
+
+def decode_image(name, image):
+    """
+    Decode every Code128 and EAN-13 symbol in one image (a path or bytes).
+    Runs in the pool workers. Returns ``(name, size in bytes, [(data,
+    symbology)], error)``; unreadable images are reported, not raised.
+    """
+    from PIL import Image
+    from pyzbar.pyzbar import ZBarSymbol, decode
+
+    try:
+        if isinstance(image, bytes):
+            size, handle = len(image), BytesIO(image)
+        else:
+            size, handle = os.path.getsize(image), image
+        with Image.open(handle) as picture:
+            # zbar scans both axes, so spines photographed sideways decode too.
+            symbols = decode(picture.convert('L'), symbols=[ZBarSymbol.CODE128, ZBarSymbol.EAN13])
+    except Exception as error:
+        return name, 0, [], '{}: {}'.format(type(error).__name__, error)
+    return name, size, [(symbol.data.decode('ascii', 'replace'), symbol.type) for symbol in symbols], None
+
+
+class ShelfScanner:
+    """
+    Extracts barcodes from a batch of shelf photos. Images are decoded
+    across a ``ProcessPoolExecutor`` with a bounded number in flight (so an
+    archive is never loaded into memory whole), then every distinct code is
+    resolved against models_new.Book with one query: Code128 codes by
+    barcode, EAN-13 codes by ISBN.
+    """
+
+    def __init__(self, workers=None, on_progress=None):
+        self.workers = workers or getattr(settings, 'SCAN_DECODE_WORKERS', None) or os.cpu_count()
+        self.on_progress = on_progress or (lambda stats: None)
+        self.stats = {'images': 0, 'bytes': 0, 'symbols': 0, 'empty': 0, 'errors': 0}
+        self.errors = []
+
+    def decode(self, source):
+        """Yield ``(name, [(data, symbology)], error)`` per image in input order, updating ``stats``."""
+        self.started = time.perf_counter()
+        images = iter_images(source)
+        with ProcessPoolExecutor(self.workers, initializer=django.setup) as pool:
+            pending = deque()
+            for name, image in images:
+                pending.append(pool.submit(decode_image, name, image))
+                if len(pending) >= self.workers * 4:
+                    yield self._collect(pending.popleft().result())
+            while pending:
+                yield self._collect(pending.popleft().result())
+
+    def _collect(self, result):
+        name, size, symbols, error = result
+        self.stats['images'] += 1
+        self.stats['bytes'] += size
+        self.stats['symbols'] += len(symbols)
+        if error:
+            self.stats['errors'] += 1
+            self.errors.append((name, error))
+        elif not symbols:
+            self.stats['empty'] += 1
+        self.on_progress(self.stats)
+        return name, symbols, error
+
+    def images_per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return self.stats['images'] / elapsed if elapsed else 0.0
+
+    def run(self, source):
+        """
+        Decode everything under ``source`` and resolve the codes. Returns a
+        report with the matched books, unmatched codes (with the images they
+        were seen in and a likely reason), images without barcodes, errors
+        and throughput.
+        """
+        seen = defaultdict(set)
+        symbologies = {}
+        empty = []
+        for name, symbols, error in self.decode(source):
+            if not symbols and not error:
+                empty.append(name)
+            for data, symbology in symbols:
+                seen[data].add(name)
+                symbologies[data] = symbology
+        decoded = time.perf_counter() - self.started
+
+        found = lookup(seen, symbologies)
+        matched, unmatched = [], []
+        for code in sorted(seen):
+            images = sorted(seen[code])
+            if code in found:
+                matched.append(dict(found[code], code=code, images=images))
+            else:
+                unmatched.append({'code': code, 'symbology': symbologies[code], 'images': images,
+                                  'reason': _unmatched_reason(code, symbologies[code])})
+
+        elapsed = time.perf_counter() - self.started
+        return {
+            'stats': dict(self.stats, codes=len(seen), matched=len(matched), unmatched=len(unmatched)),
+            'timing': {
+                'decode_seconds': round(decoded, 3),
+                'lookup_seconds': round(elapsed - decoded, 3),
+                'images_per_second': round(self.stats['images'] / decoded, 1) if decoded else 0.0,
+                'megabytes_per_second': round(self.stats['bytes'] / 1e6 / decoded, 2) if decoded else 0.0,
+                'workers': self.workers,
+            },
+            'matched': matched,
+            'unmatched': unmatched,
+            'empty_images': empty,
+            'errors': [{'image': name, 'error': error} for name, error in self.errors],
+        }
+
+
+def lookup(codes, symbologies):
+    """
+    Resolve decoded codes to models_new.Book in one query. Returns
+    ``{code: {'id', 'title', 'location'}}`` for the codes that matched.
+    """
+    barcodes = {code for code in codes if symbologies[code] != 'EAN13'}
+    isbns = {code for code in codes if symbologies[code] == 'EAN13'}
+    rows = Book.objects.filter(Q(barcode__in=barcodes) | Q(isbn__in=isbns)).values_list(
+        'id', 'barcode', 'isbn', 'title', 'location',
+    )
+    found = {}
+    for book_id, barcode, isbn, title, location in rows:
+        book = {'id': book_id, 'title': title, 'location': location}
+        if barcode in barcodes:
+            found[barcode] = book
+        if isbn in isbns:
+            found[isbn] = book
+    return found
+
+
+def _unmatched_reason(code, symbology):
+    if symbology == 'EAN13':
+        return 'ISBN not in the catalog'
+    if code.startswith(book_barcodes.prefix) and not book_barcodes.is_valid(code):
+        return 'bad check digit (misread or damaged label)'
+    return 'barcode not in the catalog'
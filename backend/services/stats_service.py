@@ -0,0 +1,66 @@
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+
+from models.models import LibraryStats
+
+COUNTERS = ('books', 'titles', 'copies', 'available', 'students', 'staff', 'open_loans')
+
+# The same definitions the triggers in models migrations 0010 and 0011 maintain.
+RECOUNT_SQL = """
+UPDATE {stats} SET
+    books = (SELECT count(*) FROM books_book),
+    titles = books.titles, copies = books.copies, available = books.available,
+    students = students.n, staff = staff.n, open_loans = loans.n, reconciled_at = now()
+FROM (SELECT count(*) AS titles, coalesce(sum(quantity), 0) AS copies,
+             coalesce(sum(available_quantity), 0) AS available
+      FROM models_new_book) AS books,
+     (SELECT count(*) AS n FROM models_student WHERE is_active) AS students,
+     (SELECT count(*) AS n FROM users_user WHERE is_active AND user_type IN ('admin', 'staff')) AS staff,
+     (SELECT count(*) AS n FROM models_loan WHERE returned_at IS NULL) AS loans
+WHERE {stats}.id = %(row)s
+"""
+
+
+def _totals(queryset):
+    totals = queryset.aggregate(
+        **{name: Sum(name) for name in COUNTERS}, reconciled_at=Max('reconciled_at'),
+    )
+    if totals['titles'] is None:
+        return None
+    return totals
+
+
+def current():
+    """
+    The dashboard totals: one aggregate over the few counter rows, returned
+    as an unsaved LibraryStats.
+    """
+    totals = _totals(LibraryStats.objects.all())
+    if totals is None:
+        reconcile()
+        totals = _totals(LibraryStats.objects.all())
+    return LibraryStats(pk=LibraryStats.ROW, **totals)
+
+
+def reconcile():
+    """
+    Recount every total from the source tables, store it in row ``ROW``
+    and zero the other rows. Returns the drift that was corrected,
+    ``{counter: recounted - stored}``, for the counters that were off.
+
+    Every counter row is locked first, so writers that reach their trigger
+    meanwhile wait and then add their change on top of the recount, and
+    the recount itself (a new statement, so a new snapshot) includes every
+    writer that updated a row before the locks were granted.
+    """
+    with transaction.atomic():
+        LibraryStats.objects.bulk_create(
+            [LibraryStats(pk=row) for row in range(1, LibraryStats.SHARDS + 1)], ignore_conflicts=True,
+        )
+        rows = list(LibraryStats.objects.select_for_update().order_by('pk').values(*COUNTERS))
+        before = {name: sum(row[name] for row in rows) for name in COUNTERS}
+        with connection.cursor() as cursor:
+            cursor.execute(RECOUNT_SQL.format(stats=LibraryStats._meta.db_table), {'row': LibraryStats.ROW})
+        LibraryStats.objects.exclude(pk=LibraryStats.ROW).update(**dict.fromkeys(COUNTERS, 0))
+        after = LibraryStats.objects.values(*COUNTERS).get(pk=LibraryStats.ROW)
+    return {name: after[name] - before[name] for name in COUNTERS if after[name] != before[name]}
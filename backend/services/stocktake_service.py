@@ -0,0 +1,154 @@
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from models.models import Stocktake, StocktakeDiscrepancy, StocktakeScan
+from models_new.models import Book
+
+
+class StocktakeClosed(Exception):
+    pass
+
+
+def ingest(session, batches):
+    """
+    Store scanned barcodes. ``batches`` is a list of ``(location,
+    [barcode, ...])``. Everything goes in with one INSERT: barcodes are
+    resolved to catalog books by a join on the way in, repeats of an item
+    already seen on that shelf are dropped by the unique indexes, and
+    unknown barcodes are kept as text. Returns counts for the request.
+    """
+    locations, barcodes = [], []
+    for location, codes in batches:
+        locations.extend([location] * len(codes))
+        barcodes.extend(codes)
+
+    with transaction.atomic():
+        # Row lock so a scan batch cannot slip in after the session closes.
+        status = Stocktake.objects.select_for_update().filter(pk=session.pk).values_list('status', flat=True).first()
+        if status != Stocktake.OPEN:
+            raise StocktakeClosed('This stocktake is closed.')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO {scans} (session_id, location, book_id, barcode)
+                SELECT %s, u.location, b.id, CASE WHEN b.id IS NULL THEN u.barcode ELSE '' END
+                FROM unnest(%s::text[], %s::text[]) AS u(location, barcode)
+                LEFT JOIN {books} AS b ON b.barcode = u.barcode
+                ON CONFLICT DO NOTHING
+                RETURNING book_id IS NULL
+                """.format(scans=StocktakeScan._meta.db_table, books=Book._meta.db_table),
+                [session.pk, locations, barcodes],
+            )
+            unknown = [is_unknown for is_unknown, in cursor.fetchall()]
+        Stocktake.objects.filter(pk=session.pk).update(scans_received=F('scans_received') + len(barcodes))
+    return {
+        'received': len(barcodes),
+        'stored': len(unknown),
+        'repeats': len(barcodes) - len(unknown),
+        'unknown': sum(unknown),
+    }
+
+
+# Books seen anywhere, books seen on their own shelf, and the expected set
+# (books under the prefix with a copy not out on loan) are compared with
+# EXCEPT; Postgres plans each as a hash set operation, so the cost is linear
+# in scans plus expected books.
+RECONCILE_SQL = """
+WITH seen AS (
+    SELECT DISTINCT book_id, location FROM {scans}
+    WHERE session_id = %(session)s AND book_id IS NOT NULL
+), in_place AS (
+    SELECT seen.book_id FROM seen JOIN {books} AS b ON b.id = seen.book_id AND b.location = seen.location
+), missing AS (
+    SELECT id AS book_id FROM {books} WHERE starts_with(location, %(prefix)s) AND available_quantity > 0
+    EXCEPT
+    SELECT book_id FROM seen
+), misplaced AS (
+    SELECT book_id FROM seen
+    EXCEPT
+    SELECT book_id FROM in_place
+)
+INSERT INTO {discrepancies} (session_id, kind, book_id, barcode, location, expected_location)
+SELECT %(session)s, 'missing', b.id, b.barcode, b.location, b.location
+FROM missing JOIN {books} AS b ON b.id = missing.book_id
+UNION ALL
+SELECT %(session)s, 'misplaced', b.id, b.barcode, seen.location, b.location
+FROM misplaced JOIN seen ON seen.book_id = misplaced.book_id JOIN {books} AS b ON b.id = misplaced.book_id
+UNION ALL
+SELECT %(session)s, 'unexpected', NULL, barcode, location, ''
+FROM {scans} WHERE session_id = %(session)s AND book_id IS NULL
+"""
+
+# Per-shelf counts: books the catalog puts there, items scanned there,
+# scanned items that belong there, and the discrepancies reported there.
+SUMMARY_SQL = """
+WITH expected AS (
+    SELECT location, count(*) AS n FROM {books}
+    WHERE starts_with(location, %(prefix)s) AND available_quantity > 0
+    GROUP BY location
+), scanned AS (
+    SELECT s.location, count(*) AS n, count(*) FILTER (WHERE b.location = s.location) AS in_place
+    FROM {scans} AS s LEFT JOIN {books} AS b ON b.id = s.book_id
+    WHERE s.session_id = %(session)s
+    GROUP BY s.location
+), reported AS (
+    SELECT location,
+           count(*) FILTER (WHERE kind = 'missing') AS missing,
+           count(*) FILTER (WHERE kind = 'misplaced') AS misplaced,
+           count(*) FILTER (WHERE kind = 'unexpected') AS unexpected
+    FROM {discrepancies} WHERE session_id = %(session)s
+    GROUP BY location
+)
+SELECT coalesce(e.location, s.location, r.location) AS location,
+       coalesce(e.n, 0), coalesce(s.n, 0), coalesce(s.in_place, 0),
+       coalesce(r.missing, 0), coalesce(r.misplaced, 0), coalesce(r.unexpected, 0)
+FROM expected AS e
+FULL JOIN scanned AS s ON s.location = e.location
+FULL JOIN reported AS r ON r.location = coalesce(e.location, s.location)
+ORDER BY 1
+"""
+
+SUMMARY_COLUMNS = ('location', 'expected', 'scanned', 'found', 'missing', 'misplaced', 'unexpected')
+
+
+def reconcile(session):
+    """
+    Replace the session's discrepancies with a fresh comparison of its scans
+    against models_new.Book.location, then store and return the per-location
+    summary. Runs entirely in SQL: one DELETE, one INSERT ... SELECT and one
+    grouped query.
+    """
+    tables = {
+        'scans': StocktakeScan._meta.db_table,
+        'books': Book._meta.db_table,
+        'discrepancies': StocktakeDiscrepancy._meta.db_table,
+    }
+    params = {'session': session.pk, 'prefix': session.location_prefix}
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Row lock, as in ingest: no scan batch commits mid-comparison and two
+        # reconciles of one session cannot interleave their DELETE and INSERT.
+        Stocktake.objects.select_for_update().filter(pk=session.pk).values_list('pk', flat=True).first()
+        StocktakeDiscrepancy.objects.filter(session=session).delete()
+        cursor.execute(RECONCILE_SQL.format(**tables), params)
+        cursor.execute(SUMMARY_SQL.format(**tables), params)
+        locations = [dict(zip(SUMMARY_COLUMNS, row)) for row in cursor.fetchall()]
+
+        totals = {column: sum(row[column] for row in locations) for column in SUMMARY_COLUMNS[1:]}
+        session.summary = {'totals': totals, 'locations': locations}
+        session.reconciled_at = timezone.now()
+        Stocktake.objects.filter(pk=session.pk).update(summary=session.summary, reconciled_at=session.reconciled_at)
+    return session.summary
+
+
+def close(session):
+    """Stop accepting scans and run the final reconciliation."""
+    with transaction.atomic():
+        updated = Stocktake.objects.filter(pk=session.pk, status=Stocktake.OPEN).update(
+            status=Stocktake.CLOSED, closed_at=timezone.now(),
+        )
+        if not updated:
+            raise StocktakeClosed('This stocktake is already closed.')
+        session.refresh_from_db()
+        reconcile(session)
+    return session
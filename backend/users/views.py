@@ -1,5 +1,6 @@
 from django.shortcuts import render
 from rest_framework import viewsets, permissions
+from utils.fields import SparseFieldsetMixin
 from .models import User
 from .serializers import UserSerializer
 
@@ -17,7 +18,7 @@ class IsAdminOrSelf(permissions.BasePermission):
         # Allow users to view/edit their own profile
         return obj == request.user
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     
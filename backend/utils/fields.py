@@ -0,0 +1,91 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer
+
+
+class SparseFieldsetMixin:
+    """
+    ``?fields=a,b`` / ``?exclude=c`` on GET list and retrieve.
+
+    The serializer drops the unwanted fields, and the columns behind them
+    are deferred on the queryset so the database never reads them either
+    (``address``, ``profile_picture``, ``description`` and friends). A
+    serializer field maps to the model field named by its ``source``;
+    computed fields list the columns they read in the serializer's
+    ``Meta.field_dependencies``, e.g. ``{'age': ['date_of_birth']}``. If a
+    kept field cannot be mapped, nothing is deferred.
+    """
+    fields_param = 'fields'
+    exclude_param = 'exclude'
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_fields(self):
+        """Names of the serializer fields to render, or None for all of them."""
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+        self._sparse_fields = None
+        if self.request is None or self.action not in self.sparse_actions:
+            return None
+
+        params = self.request.query_params
+        wanted = self._parse_names(params.get(self.fields_param))
+        excluded = self._parse_names(params.get(self.exclude_param))
+        if not wanted and not excluded:
+            return None
+
+        readable = [name for name, field in self.get_serializer_class()().fields.items()
+                    if not field.write_only]
+        unknown = sorted((set(wanted) | set(excluded)) - set(readable))
+        if unknown:
+            raise ValidationError({
+                self.fields_param if set(unknown) & set(wanted) else self.exclude_param:
+                    ['Unknown field(s): {}.'.format(', '.join(unknown))],
+            })
+        self._sparse_fields = [
+            name for name in readable
+            if (not wanted or name in wanted) and name not in excluded
+        ]
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            target = serializer.child if isinstance(serializer, ListSerializer) else serializer
+            for name in set(target.fields) - set(fields):
+                target.fields.pop(name)
+        return serializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        needed = self._needed_columns(queryset.model, fields)
+        if needed is None:
+            return queryset
+        deferred = [
+            field.name for field in queryset.model._meta.concrete_fields
+            if field.name not in needed and not field.primary_key
+        ]
+        return queryset.defer(*deferred)
+
+    def _needed_columns(self, model, fields):
+        serializer_class = self.get_serializer_class()
+        serializer_fields = serializer_class().fields
+        dependencies = getattr(serializer_class.Meta, 'field_dependencies', {})
+        model_fields = {field.name for field in model._meta.concrete_fields}
+        # Keyset pagination reads the ordering values off the last row.
+        needed = {name.lstrip('-') for name in getattr(self, 'cursor_ordering', ())}
+        for name in fields:
+            source = serializer_fields[name].source
+            if name in dependencies:
+                needed.update(dependencies[name])
+            elif source in model_fields:
+                needed.add(source)
+            else:
+                return None
+        return needed
+
+    @staticmethod
+    def _parse_names(value):
+        return [name.strip() for name in (value or '').split(',') if name.strip()]
@@ -1 +1,156 @@
-
\ No newline at end of file
+import json
+
+from django.db import models
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+def _row(*expressions):
+    """SQL row constructor, e.g. ROW(created_at, id)."""
+    return models.Func(*expressions, function='ROW', output_field=models.Field())
+
+
+def _reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination keyed on a composite, unique ordering.
+
+    DRF's CursorPagination only seeks on the first ordering field and walks
+    ties with an OFFSET. Here the whole ordering tuple is the cursor and the
+    seek is a single row comparison, e.g.
+    ``WHERE (created_at, id) < (%s, %s) ORDER BY created_at DESC, id DESC``,
+    which PostgreSQL answers straight from a matching composite index. No
+    COUNT(*) is issued, so page N costs the same as page 1.
+
+    The ordering comes from the view's ``cursor_ordering`` and must end with
+    a unique field (normally ``id``); all fields must sort the same way.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.cursor is not None:
+            queryset = queryset.filter(self._seek(queryset.model, self.cursor))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(getattr(view, 'cursor_ordering', None) or self.ordering)
+        descending = {field.startswith('-') for field in ordering}
+        assert len(descending) == 1, (
+            'Keyset pagination needs every `cursor_ordering` field on {} to '
+            'sort in the same direction.'.format(view.__class__.__name__)
+        )
+        return ordering
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None:
+            return None
+        try:
+            position = json.loads(cursor.position)
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=cursor.reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        position = json.dumps(cursor.position, separators=(',', ':'))
+        return super().encode_cursor(cursor._replace(position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field_name in ordering:
+            field_name = field_name.lstrip('-')
+            if isinstance(instance, dict):
+                attr = instance[field_name]
+            else:
+                attr = getattr(instance, field_name)
+            position.append(attr.isoformat() if hasattr(attr, 'isoformat') else attr)
+        return position
+
+    def _seek(self, model, cursor):
+        field_names = [field.lstrip('-') for field in self.ordering]
+        try:
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(field_names, cursor.position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        # (cursor reversed) XOR (ordering descending) means we seek backwards.
+        if cursor.reverse != self.ordering[0].startswith('-'):
+            lookup = LessThan
+        else:
+            lookup = GreaterThan
+        return lookup(
+            _row(*[models.F(name) for name in field_names]),
+            _row(*[models.Value(value) for value in values]),
+        )
+
+
+class CursorPaginationMixin:
+    """
+    Lets a viewset switch from page-number to keyset pagination per request
+    with ``?pagination=cursor``. Follow-up links carry ``cursor`` so they stay
+    in keyset mode.
+    """
+    cursor_pagination_class = KeysetPagination
+    cursor_ordering = ()
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request is not None else {}
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
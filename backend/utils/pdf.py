@@ -0,0 +1,71 @@
+import zlib
+
+POINTS_PER_MM = 72 / 25.4
+
+
+def compress_bitmap(bits):
+    return zlib.compress(bits, 6)
+
+
+class ImagePDFWriter:
+    """
+    Streams a PDF of full-page 1-bit images to ``handle``, one page at a
+    time, so a long print job never holds more than one page in memory.
+    Pages are bitmaps as produced by ``Image.tobytes()`` on a mode '1'
+    image, zlib-compressed by the caller (see ``compress_bitmap``) so that
+    work can happen in other processes; ``page_mm`` is the physical page
+    size.
+    """
+
+    def __init__(self, handle, page_mm):
+        self.handle = handle
+        self.page_size = (page_mm[0] * POINTS_PER_MM, page_mm[1] * POINTS_PER_MM)
+        self.offsets = {}
+        self.pages = []
+        self.position = 0
+        # Objects 1 and 2 (catalog and page tree) are written last, once
+        # every page is known.
+        self.next_id = 3
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def _write(self, data):
+        self.handle.write(data)
+        self.position += len(data)
+
+    def _object(self, object_id, body, stream=None):
+        self.offsets[object_id] = self.position
+        self._write('{} 0 obj\n'.format(object_id).encode() + body)
+        if stream is not None:
+            self._write(b'\nstream\n' + stream + b'\nendstream')
+        self._write(b'\nendobj\n')
+
+    def _reserve(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+    def add_page(self, width, height, data):
+        """Add a page showing a compressed ``width`` x ``height`` 1-bit bitmap scaled to the page."""
+        image, content, page = self._reserve(), self._reserve(), self._reserve()
+        self._object(image, (
+            '<< /Type /XObject /Subtype /Image /Width {} /Height {} /ColorSpace /DeviceGray '
+            '/BitsPerComponent 1 /Filter /FlateDecode /Length {} >>'.format(width, height, len(data))
+        ).encode(), data)
+        drawing = 'q {:.2f} 0 0 {:.2f} 0 0 cm /Im0 Do Q'.format(*self.page_size).encode()
+        self._object(content, '<< /Length {} >>'.format(len(drawing)).encode(), drawing)
+        self._object(page, (
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {:.2f} {:.2f}] '
+            '/Resources << /XObject << /Im0 {} 0 R >> >> /Contents {} 0 R >>'.format(
+                self.page_size[0], self.page_size[1], image, content,
+            )
+        ).encode())
+        self.pages.append(page)
+
+    def close(self):
+        kids = ' '.join('{} 0 R'.format(page) for page in self.pages)
+        self._object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+        self._object(2, '<< /Type /Pages /Kids [{}] /Count {} >>'.format(kids, len(self.pages)).encode())
+        xref = self.position
+        lines = ['xref', '0 {}'.format(self.next_id), '0000000000 65535 f ']
+        lines += ['{:010d} 00000 n '.format(self.offsets[object_id]) for object_id in range(1, self.next_id)]
+        lines += ['trailer', '<< /Size {} /Root 1 0 R >>'.format(self.next_id), 'startxref', str(xref), '%%EOF', '']
+        self._write('\n'.join(lines).encode())
@@ -0,0 +1,52 @@
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class PrefixIndex:
+    """
+    Compact in-memory prefix index: a sorted list of normalised keys with
+    a parallel ``array('q')`` of integer ids. A lookup is one bisect plus
+    a walk over the matches the caller consumes, O(log n + k).
+
+    Not thread-safe; callers serialise access.
+    """
+
+    def __init__(self, pairs=()):
+        pairs = sorted(pairs)
+        self._keys = [key for key, _ in pairs]
+        self._ids = array('q', [ident for _, ident in pairs])
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key, ident):
+        position = bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._ids.insert(position, ident)
+
+    def remove(self, key, ident):
+        start = bisect_left(self._keys, key)
+        end = bisect_right(self._keys, key, lo=start)
+        for position in range(start, end):
+            if self._ids[position] == ident:
+                del self._keys[position]
+                del self._ids[position]
+                return True
+        return False
+
+    def search(self, prefix):
+        """Lazily yield ``(key, id)`` for keys starting with ``prefix``, in key order."""
+        keys, ids = self._keys, self._ids
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            yield keys[position], ids[position]
+            position += 1
+
+    def memory_usage(self):
+        """Approximate bytes held by the index structures."""
+        return (
+            sys.getsizeof(self._keys)
+            + sum(sys.getsizeof(key) for key in self._keys)
+            + sys.getsizeof(self._ids)
+        )
@@ -0,0 +1,95 @@
+import msgpack
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Anything orjson/msgpack can't encode natively (Decimal, lazy strings,
+# UUIDs...) goes through DRF's own encoder so output matches JSONRenderer.
+_fallback = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    DRF's JSONRenderer with orjson doing the compact encoding. The output
+    parses to the same values and follows JSONRenderer's conventions (no
+    spaces, UTF-8 rather than ``\\u`` escapes, U+2028/U+2029 escaped), but
+    is not byte-identical: floats in exponent form are spelled ``1e16``
+    rather than ``1e+16``, and NaN and infinity come out as ``null`` where
+    STRICT_JSON would raise. Pretty-printed requests (``; indent=N`` in
+    Accept, the browsable API), integers beyond 64 bits and non-default
+    COMPACT_JSON/UNICODE_JSON settings are handed to JSONRenderer itself.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (not self.compact or self.ensure_ascii
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=_fallback, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Valid JSON, but line terminators in JavaScript; JSONRenderer escapes them too.
+        return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Binary MessagePack bodies for clients that send ``Accept: application/msgpack``."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_fallback, use_bin_type=True)
+
+
+class ImageRenderer(BaseRenderer):
+    """Passes pre-rendered bytes (images, PDFs) through; error bodies go out as JSON."""
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+        return orjson.dumps(data, default=_fallback)
+
+
+class PNGRenderer(ImageRenderer):
+    media_type = 'image/png'
+    format = 'png'
+
+
+class SVGRenderer(ImageRenderer):
+    media_type = 'image/svg+xml'
+    format = 'svg'
+
+
+class PDFRenderer(ImageRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class ORJSONParser(BaseParser):
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % exc)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % exc)
@@ -0,0 +1,184 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+# Response headers replayed on a cache hit.
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+STAT_NAMES = ('hits', 'misses', 'hit_us', 'miss_us')
+
+
+class ResponseCache:
+    """
+    Rendered responses in a Django cache, namespaced by a generation
+    counter. Every key embeds the current generation, so ``invalidate()``
+    retires all entries at once with a single ``incr``; old entries simply
+    age out. The backend must be shared by every worker process (file-based,
+    memcached, redis), or the other workers keep serving entries from the
+    old generation; see ``check_shared_cache``.
+
+    Hit/miss counts and cumulative latency are kept in the same cache so
+    every worker reports into one set of counters. On backends without an
+    atomic ``incr`` (local-memory across processes, file-based) they are
+    approximate.
+    """
+
+    def __init__(self, namespace, alias=None):
+        self.namespace = namespace
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias or getattr(settings, 'RESPONSE_CACHE_ALIAS', 'responses')]
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+    def _key(self, *parts):
+        return ':'.join((self.namespace,) + parts)
+
+    def generation(self):
+        generation = self.cache.get(self._key('generation'))
+        if generation is None:
+            # Start from the clock, not 1, so entries written before the
+            # counter was evicted can never match again.
+            self.cache.add(self._key('generation'), time.time_ns(), None)
+            generation = self.cache.get(self._key('generation'))
+        return generation
+
+    def invalidate(self):
+        try:
+            self.cache.incr(self._key('generation'))
+        except ValueError:
+            self.cache.set(self._key('generation'), time.time_ns(), None)
+
+    def request_key(self, request):
+        """Path, negotiated media type and query parameters with order and blanks normalised away."""
+        params = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values if value != ''
+        )
+        raw = repr((request.path, request.accepted_media_type, params))
+        return self._key(str(self.generation()), hashlib.sha1(raw.encode()).hexdigest())
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, response):
+        self.cache.set(key, {
+            'status': response.status_code,
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'headers': {name: response[name] for name in CACHED_HEADERS if response.has_header(name)},
+        }, self.timeout)
+
+    def record(self, hit, seconds):
+        if hit:
+            self._incr('hits', 1)
+            self._incr('hit_us', int(seconds * 1e6))
+        else:
+            self._incr('misses', 1)
+            self._incr('miss_us', int(seconds * 1e6))
+
+    def _incr(self, name, delta):
+        key = self._key('stats', name)
+        self.cache.add(key, 0, None)
+        try:
+            self.cache.incr(key, delta)
+        except ValueError:
+            self.cache.set(key, delta, None)
+
+    def stats(self):
+        values = self.cache.get_many([self._key('stats', name) for name in STAT_NAMES])
+        hits, misses, hit_us, miss_us = (values.get(self._key('stats', name), 0) for name in STAT_NAMES)
+        requests = hits + misses
+        return {
+            'backend': self.cache.__class__.__name__,
+            'generation': self.generation(),
+            'requests': requests,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / requests, 4) if requests else None,
+            'avg_hit_ms': round(hit_us / hits / 1000, 3) if hits else None,
+            'avg_miss_ms': round(miss_us / misses / 1000, 3) if misses else None,
+        }
+
+    def reset_stats(self):
+        self.cache.delete_many([self._key('stats', name) for name in STAT_NAMES])
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """
+    System check: a local-memory response cache is private to one worker
+    process, so invalidations would not reach the others. Only allowed
+    with DEBUG on.
+    """
+    alias = getattr(settings, 'RESPONSE_CACHE_ALIAS', 'responses')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    if settings.DEBUG or not backend.endswith('.LocMemCache'):
+        return []
+    return [checks.Error(
+        f'The {alias!r} cache uses LocMemCache, which is not shared between worker processes.',
+        hint='Set RESPONSE_CACHE_BACKEND to a file-based, memcached or redis cache.',
+        obj=f'CACHES[{alias!r}]',
+        id='shelftrack.E001',
+    )]
+
+
+class CachedResponseMixin:
+    """
+    Serve anonymous ``list`` and ``retrieve`` requests from ``response_cache``.
+
+    A hit replays the stored body and validators without touching the
+    database; ``If-None-Match`` / ``If-Modified-Since`` are answered from the
+    stored validators too. Misses run the normal view and store the rendered
+    200 response. Authenticated requests always bypass the cache.
+    """
+    response_cache = None
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+    def _cached(self, request, respond):
+        cache = self.response_cache
+        if cache is None or request.user.is_authenticated:
+            return respond()
+
+        started = time.perf_counter()
+        key = cache.request_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            headers = entry['headers']
+            response = get_conditional_response(
+                request,
+                etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+            )
+            if response is None:
+                response = HttpResponse(entry['content'], status=entry['status'],
+                                        content_type=entry['content_type'])
+            for name, value in headers.items():
+                response[name] = value
+            response['X-Cache'] = 'HIT'
+            cache.record(True, time.perf_counter() - started)
+            return response
+
+        response = respond()
+        if isinstance(response, Response) and response.status_code == 200:
+            def store(rendered):
+                cache.set(key, rendered)
+                cache.record(False, time.perf_counter() - started)
+            response.add_post_render_callback(store)
+            response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,163 @@
+import math
+import operator
+import re
+from functools import reduce
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from rest_framework.filters import SearchFilter
+
+SEARCH_CONFIG = 'simple'
+
+_LEXEME_RE = re.compile(r'\w+')
+_ISBN_RE = re.compile(r'^[\dXx-]+$')
+
+
+def build_prefix_query(terms, config=SEARCH_CONFIG):
+    """
+    Turn free-text search terms into a prefix tsquery, e.g.
+    ``['harry', 'pot']`` -> ``'harry':* & 'pot':*``.
+
+    Terms are reduced to word characters first, so user input can never
+    inject tsquery operators. ISBN-like terms lose their hyphens so that
+    "978-0-306" matches the stored "9780306...".
+    """
+    lexemes = []
+    for term in terms:
+        if _ISBN_RE.match(term):
+            term = term.replace('-', '')
+        lexemes.extend(_LEXEME_RE.findall(term.lower()))
+    if not lexemes:
+        return None
+    raw = ' & '.join("'{}':*".format(lexeme) for lexeme in lexemes)
+    return SearchQuery(raw, search_type='raw', config=config)
+
+
+def full_text_search(queryset, terms, vector_field='search_vector', config=SEARCH_CONFIG):
+    """
+    Filter ``queryset`` to rows whose tsvector matches every term as a
+    prefix, best ``ts_rank`` first. The match is answered by the GIN index
+    on ``vector_field``.
+    """
+    query = build_prefix_query(terms, config=config)
+    if query is None:
+        return queryset.none()
+    return queryset.filter(**{vector_field: query}).annotate(
+        search_rank=SearchRank(F(vector_field), query),
+    ).order_by('-search_rank', *queryset.query.order_by or queryset.model._meta.ordering)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Drop-in replacement for DRF's SearchFilter that reads the same
+    ``?search=`` parameter but matches against a precomputed tsvector
+    column (the view's ``search_vector_field``) instead of emitting one
+    ``ILIKE '%term%'`` per search field.
+
+    Views without ``search_vector_field`` fall back to SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        vector_field = getattr(view, 'search_vector_field', None)
+        if not vector_field:
+            return super().filter_queryset(request, queryset, view)
+
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        return full_text_search(queryset, search_terms, vector_field=vector_field)
+
+
+def fuzzy_search(queryset, terms, fields, threshold):
+    """
+    Typo-tolerant match: every term must be word-similar (pg_trgm) to at
+    least one of ``fields`` by at least ``threshold``. Candidates come back
+    best match first.
+
+    The cut-off is a query parameter, so the result never depends on
+    session state. Inside a transaction the ``%>`` operator is added too,
+    which lets the ``gin_trgm_ops`` indexes on ``fields`` pick the
+    candidates; it reads ``pg_trgm.word_similarity_threshold``, so that is
+    set to the same value for the current transaction only and cannot
+    leak into later requests on a persistent connection. FuzzySearchMixin
+    runs list requests in a transaction for this.
+    """
+    connection = connections[queryset.db]
+    indexed = connection.in_atomic_block
+    if indexed:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(threshold)],
+            )
+
+    similarities = {}
+    conditions = []
+    for position, term in enumerate(terms):
+        matches = []
+        for field in fields:
+            alias = 'similarity_{}_{}'.format(position, field)
+            similarities[alias] = TrigramWordSimilarity(term, field)
+            match = Q(**{alias + '__gte': threshold})
+            if indexed:
+                match &= Q(**{field + '__trigram_word_similar': term})
+            matches.append(match)
+        conditions.append(reduce(operator.or_, matches))
+    scores = [
+        Greatest(*[F('similarity_{}_{}'.format(position, field)) for field in fields])
+        if len(fields) > 1 else F('similarity_{}_{}'.format(position, fields[0]))
+        for position in range(len(terms))
+    ]
+    return queryset.alias(**similarities).filter(reduce(operator.and_, conditions)).annotate(
+        similarity=reduce(operator.add, scores),
+    ).order_by('-similarity', *queryset.query.order_by or queryset.model._meta.ordering)
+
+
+class FuzzySearchMixin:
+    """
+    Runs ``list`` in a transaction when ``?search_mode=fuzzy`` is given,
+    so fuzzy_search can use the trigram indexes (see above).
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(TrigramSearchFilter.search_mode_param) != 'fuzzy':
+            return super().list(request, *args, **kwargs)
+        with transaction.atomic(using=self.get_queryset().db):
+            return super().list(request, *args, **kwargs)
+
+
+class TrigramSearchFilter(FullTextSearchFilter):
+    """
+    Adds a typo-tolerant mode to the regular ``?search=`` parameter:
+    ``?search=rowlng&search_mode=fuzzy`` matches the view's
+    ``fuzzy_search_fields`` by trigram word similarity.
+
+    The cut-off defaults to ``settings.FUZZY_SEARCH_THRESHOLD`` and can be
+    overridden per request with ``?similarity=0.4``. Without
+    ``search_mode=fuzzy`` the request is handled by FullTextSearchFilter.
+    """
+    search_mode_param = 'search_mode'
+    similarity_param = 'similarity'
+
+    def get_threshold(self, request):
+        default = getattr(settings, 'FUZZY_SEARCH_THRESHOLD', 0.5)
+        try:
+            threshold = float(request.query_params.get(self.similarity_param, default))
+        except ValueError:
+            threshold = default
+        if not math.isfinite(threshold):
+            threshold = default
+        return min(max(threshold, 0.1), 1.0)
+
+    def filter_queryset(self, request, queryset, view):
+        fields = getattr(view, 'fuzzy_search_fields', None)
+        if not fields or request.query_params.get(self.search_mode_param) != 'fuzzy':
+            return super().filter_queryset(request, queryset, view)
+
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        return fuzzy_search(queryset, search_terms, fields, self.get_threshold(request))
@@ -1,8 +1,8 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QTableWidget, QTableWidgetItem, QLabel, QLineEdit,
                                QComboBox, QFormLayout, QDialog, QMessageBox,
-                               QHeaderView)
-from PySide6.QtCore import Qt
+                               QHeaderView, QCompleter)
+from PySide6.QtCore import Qt, QTimer, QStringListModel
 import requests
 from .add_book_dialog import AddBookDialog
 from .login_dialog import LoginDialog
@@ -11,6 +11,7 @@ class BooksView(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.token = None
+        self.books_etag = None  # ETag of the list currently in the table
         self.setup_ui()
         
     def setup_ui(self):
@@ -92,6 +93,21 @@ class BooksView(QWidget):
             }
         """)
         search_btn.clicked.connect(self.search_books)
+        self.search_input.returnPressed.connect(self.search_books)
+
+        # Search-as-you-type suggestions from /api/books/suggest/
+        self.suggestion_model = QStringListModel(self)
+        completer = QCompleter(self.suggestion_model, self)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        completer.setFilterMode(Qt.MatchFlag.MatchContains)
+        completer.activated.connect(lambda _: self.search_books())
+        self.search_input.setCompleter(completer)
+
+        self.suggest_timer = QTimer(self)
+        self.suggest_timer.setSingleShot(True)
+        self.suggest_timer.setInterval(150)  # Debounce keystrokes
+        self.suggest_timer.timeout.connect(self.load_suggestions)
+        self.search_input.textEdited.connect(lambda _: self.suggest_timer.start())
         
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(search_btn)
@@ -219,9 +235,15 @@ class BooksView(QWidget):
             headers = {}
             if self.token:
                 headers['Authorization'] = f'Bearer {self.token}'
+            if self.books_etag and self.table.rowCount():
+                headers['If-None-Match'] = self.books_etag
                 
             response = requests.get('http://127.0.0.1:8000/api/books/', headers=headers)
+            if response.status_code == 304:
+                # Nothing changed since the last load; keep the table as is.
+                return
             if response.status_code == 200:
+                self.books_etag = response.headers.get('ETag')
                 try:
                     data = response.json()
                     # Handle both list response and paginated response
@@ -302,6 +324,32 @@ class BooksView(QWidget):
             for col in range(6):
                 self.table.setItem(row, col, QTableWidgetItem("Error"))
 
+    def load_suggestions(self):
+        """Fetch completions for the current search text."""
+        query = self.search_input.text().strip()
+        if len(query) < 2:
+            return
+        try:
+            response = requests.get(
+                'http://127.0.0.1:8000/api/books/suggest/',
+                params={'q': query},
+                timeout=2
+            )
+            if response.status_code != 200:
+                return
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return  # Suggestions are best-effort; the Search button still works
+
+        suggestions = []
+        for field in ('title', 'author', 'isbn'):
+            for value in data.get(field, []):
+                if value not in suggestions:
+                    suggestions.append(value)
+        self.suggestion_model.setStringList(suggestions)
+        if suggestions and self.search_input.hasFocus():
+            self.search_input.completer().complete()
+
     def search_books(self):
         search_term = self.search_input.text().strip()
         if not search_term:
@@ -324,6 +372,7 @@ class BooksView(QWidget):
                     books = data['results'] if isinstance(data, dict) and 'results' in data else data
                     
                     self.table.setRowCount(0)  # Clear existing rows
+                    self.books_etag = None  # Table no longer shows the full list
                     for book in books:
                         row = self.table.rowCount()
                         self.table.insertRow(row)
@@ -183,34 +183,20 @@ class HomeView(QWidget):
             self.update_stats()  # Refresh stats after adding a student
             
     def update_stats(self):
+        # One request for every total; the server keeps them as counters.
+        headers = {'Authorization': f'Bearer {self.token}'} if self.token else {}
         try:
-            # Get total books count
-            response = requests.get('http://localhost:8000/api/books/')
+            response = requests.get('http://localhost:8000/api/stats/', headers=headers)
             if response.status_code == 200:
-                data = response.json()
-                books_count = len(data['results']) if isinstance(data, dict) and 'results' in data else len(data)
-                self.books_card.setValue(books_count)
+                stats = response.json()
+                self.books_card.setValue(stats['books'])
+                self.students_card.setValue(stats['students'])
+                self.staff_card.setValue(stats['staff'])
             else:
                 self.books_card.setValue(0)  # Set to 0 if there's an error
+                self.students_card.setValue(0)
+                self.staff_card.setValue(0)
 
-            # Get total students count
-            response = requests.get('http://localhost:8000/api/students/')
-            if response.status_code == 200:
-                data = response.json()
-                students_count = len(data['results']) if isinstance(data, dict) and 'results' in data else len(data)
-                self.students_card.setValue(students_count)
-            else:
-                self.students_card.setValue(0)  # Set to 0 if there's an error
-
-            # Get total staff count
-            response = requests.get('http://localhost:8000/api/staff/')
-            if response.status_code == 200:
-                data = response.json()
-                staff_count = len(data['results']) if isinstance(data, dict) and 'results' in data else len(data)
-                self.staff_card.setValue(staff_count)
-            else:
-                self.staff_card.setValue(0)  # Set to 0 if there's an error
-                
         except requests.exceptions.RequestException as e:
             self.books_card.setValue(0)  # Set to 0 on error
             self.students_card.setValue(0)  # Set to 0 on error